@@ -0,0 +1,33 @@
+# Offline stand-ins for the things mixxx-bisect talks to, shared with the tests:
+# a synthetic Mixxx repository and a local server mimicking the GitHub releases
+# API, the mixxx.org snapshot listing and the snapshot downloads.
+
+import sys
+import pathlib
+
+ROOT = pathlib.Path(__file__).parent.parent
+sys.path.insert(1, str(ROOT))
+sys.path.insert(1, str(ROOT / 'tests'))
+
+from fakes import make_repo
+from server import SnapshotServer
+from mixxx_bisect.options import Options
+
+def make_options(root: pathlib.Path, mixxx_dir: pathlib.Path) -> Options:
+    return Options(
+        quiet=True,
+        verbose=False,
+        os='Linux',
+        arch='x86_64',
+        mixxx_args=[],
+        root_dir=root,
+        mixxx_dir=mixxx_dir,
+        mixxx_remote='',
+        clone_filter=None,
+        installs_dir=root / 'installs',
+        log_dir=root / 'log',
+        index_dir=root / 'index',
+        cache_dir=root / 'cache',
+        cache_max_size=1 << 40,
+        max_installs=5,
+    )
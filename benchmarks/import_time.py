@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+# Checks the cold-start cost of the CLI against a budget, using `python -X importtime`,
+# and that heavy dependencies are not imported for --help/--version.
+# Usage: python3 benchmarks/import_time.py [<budget in ms>]
+
+import os
+import subprocess
+import sys
+import time
+import pathlib
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+# Modules that should only be imported once a search actually starts
+DEFERRED_MODULES = ['requests', 'urllib3', 'tqdm', 'socketserver', 'mixxx_bisect.daemon', 'mixxx_bisect.repository.m1xxx', 'mixxx_bisect.repository.combined', 'mixxx_bisect.repository.mixxx_org', 'mixxx_bisect.utils.request']
+
+RUNS = 5
+
+def import_times(args: list[str]) -> dict[str, int]:
+    '''Runs Python with the given args and returns the cumulative import time (in microseconds) of every imported module.'''
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ROOT, env=env, capture_output=True, encoding='utf8', check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # Lines look like 'import time:  <self> | <cumulative> | <indented module>'
+        fields = line.removeprefix('import time:').split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+
+    # The first run populates the bytecode cache, so we take the best of the following ones
+    import_ms = min(import_times(['-c', 'import mixxx_bisect'])['mixxx_bisect'] for _ in range(RUNS + 1)) / 1000
+
+    version_ms = float('inf')
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'mixxx_bisect', '--version'], cwd=ROOT, env=env, capture_output=True, check=True)
+        version_ms = min(version_ms, (time.perf_counter() - start) * 1000)
+
+    imported = import_times(['-m', 'mixxx_bisect', '--help'])
+    deferred = [module for module in DEFERRED_MODULES if module in imported]
+
+    print(f'import mixxx_bisect:    {import_ms:.1f} ms (budget {budget_ms:.0f} ms)')
+    print(f'mixxx-bisect --version: {version_ms:.1f} ms (including interpreter startup)')
+    if deferred:
+        print(f"Imported by --help, but should be deferred: {', '.join(deferred)}")
+    if import_ms > budget_ms or deferred:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# Compares ordering snapshot commits with one `git rev-list --no-walk` over
+# abbreviated hashes (and a re-sort per order query) against CommitOrder.
+# Usage: python3 benchmarks/order_commits.py [<commits> [<snapshot every n commits>]]
+
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import pathlib
+
+from fixtures import make_options, make_repo
+
+from mixxx_bisect.options import Options
+from mixxx_bisect.utils.git import CommitOrder
+
+QUERIES = 20
+
+def sort_by_date(commits: list[str], opts: Options) -> list[str]:
+    '''The previous approach, passing (truncated) commits as arguments.'''
+    args = [commit[:8] for commit in commits]
+    lines = subprocess.run(['git', 'rev-list', '--no-walk'] + args, cwd=opts.mixxx_dir, capture_output=True, encoding='utf8', check=True).stdout.splitlines()
+    return lines[::-1]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    every = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        mixxx_dir = root / 'mixxx.git'
+        commits = make_repo(mixxx_dir, count)
+        # Like clones made by mixxx-bisect
+        subprocess.run(['git', 'commit-graph', 'write', '--reachable'], cwd=mixxx_dir, check=True)
+        opts = make_options(root, mixxx_dir)
+        snapshots = commits[::every]
+        shuffled = random.sample(snapshots, len(snapshots))
+        pairs = [tuple(random.sample(snapshots, 2)) for _ in range(QUERIES)]
+
+        start = time.perf_counter()
+        by_date = sort_by_date(shuffled, opts)
+        argv_sort_time = time.perf_counter() - start
+        argv_length = sum(len(commit[:8]) + 1 for commit in shuffled)
+
+        start = time.perf_counter()
+        for a, b in pairs:
+            sort_by_date([a, b], opts) == [a, b]
+        argv_query_time = (time.perf_counter() - start) / QUERIES
+
+        start = time.perf_counter()
+        order = CommitOrder(shuffled, opts)
+        topological = order.sort(shuffled)
+        order_sort_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for a, b in pairs * 1000:
+            order.precedes(a, b)
+        order_query_time = (time.perf_counter() - start) / (QUERIES * 1000)
+
+        assert by_date == topological == snapshots
+        print(f'{count} commits, {len(snapshots)} snapshots')
+        print(f'rev-list --no-walk: sort {argv_sort_time:.3f} s ({argv_length / 1024:.0f} KiB of arguments), {argv_query_time * 1e3:.2f} ms per order query')
+        print(f'CommitOrder:        sort {order_sort_time:.3f} s (via stdin), {order_query_time * 1e6:.2f} µs per order query')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Compares extracting the links from a synthetic mixxx.org-style directory listing
+# with BeautifulSoup (parsing the whole document) against the streaming extractor.
+# The comparison requires beautifulsoup4, which mixxx-bisect itself no longer depends on,
+# and is skipped if it is not installed. Usage: python3 benchmarks/parse_listing.py [<entries>]
+
+import sys
+import time
+import tracemalloc
+import pathlib
+
+from typing import Callable, Iterator
+
+ROOT = pathlib.Path(__file__).parent.parent
+sys.path.insert(1, str(ROOT))
+
+from mixxx_bisect.utils.links import iter_links
+from mixxx_bisect.utils.request import CHUNK_SIZE
+
+def listing_chunks(count: int) -> Iterator[bytes]:
+    '''Generates an nginx-style autoindex listing in chunks, like a streamed response would arrive.'''
+    yield b'<html>\r\n<head><title>Index of /snapshots/main/</title></head>\r\n<body>\r\n<h1>Index of /snapshots/main/</h1><hr><pre><a href="../">../</a>\r\n'
+    buf = bytearray()
+    for i in range(count):
+        name = f'mixxx-2.4-alpha-{i}-g{i * 2654435761 % (1 << 40):010x}-macos{"intel" if i % 2 else "arm"}.dmg'
+        buf += f'<a href="{name}">{name[:50]}&gt;</a> 07-Mar-2023 12:{i % 60:02d}    {100000000 + i}\r\n'.encode()
+        if len(buf) >= CHUNK_SIZE:
+            yield bytes(buf)
+            buf.clear()
+    yield bytes(buf) + b'</pre><hr></body>\r\n</html>\r\n'
+
+def with_soup(count: int) -> list[str]:
+    from bs4 import BeautifulSoup
+    raw = b''.join(listing_chunks(count))
+    soup = BeautifulSoup(raw, 'html.parser')
+    return [str(a.get('href')) for a in soup.select('a')]
+
+def with_stream(count: int) -> list[str]:
+    return [link for link in iter_links(listing_chunks(count)) if link.endswith('.dmg')]
+
+def measure(name: str, extract: Callable[[int], list[str]], count: int) -> list[str]:
+    start = time.perf_counter()
+    links = extract(count)
+    elapsed = time.perf_counter() - start
+
+    # Tracing allocations slows everything down considerably, so memory is measured in a separate run
+    tracemalloc.start()
+    extract(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name}: {elapsed:.3f} s, peak memory {peak / (1024 * 1024):.1f} MiB')
+    return links
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f'{count} entries')
+    stream_links = measure('streaming', with_stream, count)
+    try:
+        import bs4
+    except ImportError:
+        print('bs4      : skipped, install beautifulsoup4 to compare against it')
+        return
+    soup_links = measure('bs4      ', with_soup, count)
+    assert soup_links[1:] == stream_links
+
+if __name__ == '__main__':
+    main()
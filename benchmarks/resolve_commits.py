@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+# Compares batched commit resolution against one `git rev-parse` per commit
+# on a synthetic repository. Usage: python3 benchmarks/resolve_commits.py [<commits>]
+
+import subprocess
+import sys
+import tempfile
+import time
+import pathlib
+
+from fixtures import make_options, make_repo
+
+from mixxx_bisect.utils.git import try_parse_commit, try_parse_commits
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        mixxx_dir = root / 'mixxx.git'
+        make_repo(mixxx_dir, count)
+        opts = make_options(root, mixxx_dir)
+        revs = [line[:10] for line in subprocess.run(['git', 'rev-list', 'main'], cwd=mixxx_dir, capture_output=True, encoding='utf8', check=True).stdout.splitlines()]
+
+        start = time.perf_counter()
+        single = [try_parse_commit(rev, opts) for rev in revs]
+        single_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = try_parse_commits(list(revs), opts)
+        batched_time = time.perf_counter() - start
+
+        assert single == batched
+        print(f'{count} commits')
+        print(f'per-commit: {single_time:.3f} s')
+        print(f'batched:    {batched_time:.3f} s ({single_time / batched_time:.1f}x)')
+
+if __name__ == '__main__':
+    main()
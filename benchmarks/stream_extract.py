@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# Compares downloading a tar.gz snapshot and extracting it afterwards against
+# extracting it while downloading, using a local (optionally throttled) server.
+# Usage: python3 benchmarks/stream_extract.py [<size in MB> [<server rate in MB/s>]]
+
+import http.server
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import pathlib
+
+ROOT = pathlib.Path(__file__).parent.parent
+sys.path.insert(1, str(ROOT))
+
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.utils.snapshot import SnapshotCache
+
+def make_tarball(size: int) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz', compresslevel=1) as tar:
+        for i in range(size // (1024 * 1024)):
+            # Half random, half zeros to get a realistic compression ratio
+            data = os.urandom(512 * 1024) + bytes(512 * 1024)
+            info = tarfile.TarInfo(f'mixxx/lib/lib{i}.so')
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+def serve(data: bytes, rate: float) -> http.server.ThreadingHTTPServer:
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            chunk_size = 256 * 1024
+            for i in range(0, len(data), chunk_size):
+                self.wfile.write(data[i:i + chunk_size])
+                if rate > 0:
+                    time.sleep(chunk_size / rate)
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    data = make_tarball(size * 1024 * 1024)
+    server = serve(data, rate * 1024 * 1024)
+    snapshot = Snapshot(url=f'http://127.0.0.1:{server.server_port}/mixxx.tar.gz', name='mixxx.tar.gz', size=len(data))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+
+        cache = SnapshotCache(root / 'two-phase-cache', max_size=1 << 40)
+        start = time.perf_counter()
+        path = cache.fetch('0' * 40, snapshot, progress=False)
+        shutil.unpack_archive(path, root / 'two-phase')
+        two_phase_time = time.perf_counter() - start
+
+        cache = SnapshotCache(root / 'streaming-cache', max_size=1 << 40)
+        start = time.perf_counter()
+        with cache.open('0' * 40, snapshot) as stream:
+            with tarfile.open(fileobj=stream, mode='r|gz') as tar:
+                tar.extractall(root / 'streaming')
+        streaming_time = time.perf_counter() - start
+
+    server.shutdown()
+    print(f'{len(data) / 1024 / 1024:.1f} MB tarball, server rate {rate} MB/s')
+    print(f'two-phase: {two_phase_time:.3f} s')
+    print(f'streaming: {streaming_time:.3f} s ({two_phase_time / streaming_time:.2f}x)')
+
+if __name__ == '__main__':
+    main()
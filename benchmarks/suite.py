@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+# Times the main code paths of mixxx-bisect offline, against a synthetic Mixxx
+# repository and a local stand-in for the snapshot servers, and outputs the
+# results as JSON to compare them across changes.
+# Usage: python3 benchmarks/suite.py [--commits <n>] [--every <n>] [--output <file>]
+
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import replace
+from typing import Any, Iterator
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import pathlib
+
+from fixtures import SnapshotServer, make_options, make_repo
+
+import mixxx_bisect
+import mixxx_bisect.repository.combined as combined
+import mixxx_bisect.repository.m1xxx as m1xxx
+import mixxx_bisect.repository.mixxx_org as mixxx_org
+
+from mixxx_bisect.daemon import Daemon, DaemonClient
+from mixxx_bisect.discovery import discover_snapshots
+from mixxx_bisect.repository import Snapshot, resolve_snapshots
+from mixxx_bisect.utils.git import CommitMetadata, describe_commit, sort_commits
+from mixxx_bisect.utils.request import DEFAULT_SEGMENTS
+from mixxx_bisect.utils.snapshot import SnapshotCache
+
+class Results:
+    def __init__(self):
+        self.entries: list[dict[str, Any]] = []
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[dict[str, Any]]:
+        '''Times the block. Further metrics can be added to the yielded entry.'''
+        entry: dict[str, Any] = {'name': name, 'seconds': None}
+        self.entries.append(entry)
+        start = time.perf_counter()
+        yield entry
+        entry['seconds'] = round(time.perf_counter() - start, 4)
+
+    def print_summary(self):
+        for entry in self.entries:
+            details = ', '.join(f'{key}={value}' for key, value in entry.items() if key not in ('name', 'seconds'))
+            print(f"{entry['name']:<30} {entry['seconds']:8.3f} s  {details}", file=sys.stderr)
+
+def bench_repositories(results: Results, server: SnapshotServer, good: str, root: pathlib.Path, mixxx_dir: pathlib.Path) -> dict[str, Snapshot]:
+    opts = make_options(root, mixxx_dir)
+    opts.index_dir.mkdir(parents=True, exist_ok=True)
+    m1xxx.RELEASES_API_URL = server.releases_url
+    mixxx_org.SNAPSHOTS_BASE_URL = server.snapshots_url
+
+    # mixxx.org only provides macOS (and Windows) snapshots
+    macos_opts = replace(opts, os='Darwin')
+
+    with redirect_stdout(io.StringIO()):
+        for name, repository in [
+            ('m1xxx', m1xxx.M1xxxSnapshotRepository(branch='main', suffix='.tar.gz', opts=opts)),
+            ('mixxx-org', mixxx_org.MixxxOrgSnapshotRepository(branch='main', suffix='.dmg', opts=macos_opts)),
+        ]:
+            for phase in ['cold', 'warm']:
+                requests_before = server.request_count
+                with results.measure(f'fetch_snapshots/{name}/{phase}') as metrics:
+                    snapshots = repository.fetch_snapshots()
+                metrics.update(snapshots=len(snapshots), requests=server.request_count - requests_before)
+
+        # A cold fetch bounded by a good commit in the middle of the history, only pages back that far
+        bounded_opts = make_options(root / 'bounded', mixxx_dir)
+        requests_before = server.request_count
+        with results.measure('fetch_snapshots/m1xxx/bounded') as metrics:
+            snapshots = m1xxx.M1xxxSnapshotRepository(branch='main', suffix='.tar.gz', opts=bounded_opts).fetch_snapshots(oldest=good)
+        metrics.update(snapshots=len(snapshots), requests=server.request_count - requests_before)
+
+        # Both macOS repositories at once, which should take about as long as the slower one
+        combined_opts = replace(make_options(root / 'combined', mixxx_dir), os='Darwin')
+        requests_before = server.request_count
+        with results.measure('fetch_snapshots/combined/cold') as metrics:
+            snapshots = combined.CombinedSnapshotRepository(branch='main', suffix='.dmg', opts=combined_opts).fetch_snapshots()
+        metrics.update(snapshots=len(snapshots), requests=server.request_count - requests_before)
+
+    m1xxx_snapshots = m1xxx.M1xxxSnapshotRepository(branch='main', suffix='.tar.gz', opts=opts).index.snapshots
+    with results.measure('resolve_snapshots') as metrics:
+        resolved, unresolved = resolve_snapshots(m1xxx_snapshots, opts)
+    metrics.update(resolved=len(resolved), unresolved=len(unresolved))
+    return resolved
+
+def bench_commits(results: Results, commits: list[str], root: pathlib.Path, mixxx_dir: pathlib.Path):
+    opts = make_options(root, mixxx_dir)
+    with results.measure('sort_commits') as metrics:
+        sorted_commits = sort_commits(commits, opts)
+    metrics.update(commits=len(sorted_commits))
+
+    metadata = CommitMetadata(opts)
+    with results.measure('describe_commit') as metrics:
+        metadata.load(sorted_commits)
+        descriptions = [describe_commit(commit, metadata) for commit in sorted_commits]
+    metrics.update(commits=len(descriptions))
+
+def bench_daemon(results: Results, server: SnapshotServer, root: pathlib.Path, mixxx_dir: pathlib.Path):
+    opts = make_options(root, mixxx_dir)
+    opts.index_dir.mkdir(parents=True, exist_ok=True)
+    m1xxx.RELEASES_API_URL = server.releases_url
+    key = ('m1xxx', 'main', 'x86_64', '.tar.gz')
+
+    # What every invocation without a daemon does
+    with results.measure('discovery/cold') as metrics, redirect_stdout(io.StringIO()):
+        repository = m1xxx.M1xxxSnapshotRepository(branch='main', suffix='.tar.gz', opts=opts)
+        discovery = discover_snapshots(repository, None, None, fetch_ttl=float('inf'), opts=opts)
+    metrics.update(snapshots=len(discovery.commits))
+
+    # The daemon keeps running in the background until the benchmarks exit
+    with redirect_stdout(io.StringIO()):
+        daemon = Daemon(fetch_ttl=float('inf'), refresh_interval=3600, opts=opts)
+        threading.Thread(target=daemon.serve, args=([key],), daemon=True).start()
+        while not (client := DaemonClient.connect(opts)):
+            time.sleep(0.01)
+        with client:
+            # Wait for the daemon to warm up
+            while not client.request('status')['repositories']:
+                time.sleep(0.01)
+            with results.measure('discovery/daemon') as metrics:
+                discovery = client.discover(*key, good=None, bad=None)
+            metrics.update(snapshots=len(discovery.commits))
+
+def bench_download(results: Results, server: SnapshotServer, root: pathlib.Path, size: int):
+    url = server.add_file('large.tar.gz', os.urandom(size))
+    snapshot = Snapshot(url=url, name='large.tar.gz', size=size)
+    for segments in sorted({1, DEFAULT_SEGMENTS}):
+        cache = SnapshotCache(root / f'download-cache-{segments}', max_size=1 << 40, segments=segments)
+        with results.measure(f'download/{segments}-segment') as metrics:
+            cache.fetch('0' * 40, snapshot, progress=False)
+        metrics.update(bytes=size, mb_per_second=round(size / (1024 * 1024) / metrics['seconds'], 1))
+
+def bench_bisect(results: Results, server: SnapshotServer, snapshot_commits: list[str], root: pathlib.Path, mixxx_dir: pathlib.Path):
+    if platform.system() != 'Linux':
+        print('Skipping end-to-end bisect (requires the Linux snapshot runner)', file=sys.stderr)
+        return
+
+    bisect_root = root / 'bisect'
+    subprocess.run(['git', 'clone', '-q', '--bare', str(mixxx_dir), str(bisect_root / 'mixxx.git')], check=True)
+    m1xxx.RELEASES_API_URL = server.releases_url
+
+    # A scripted oracle: snapshots containing the culprit commit are bad
+    culprit = snapshot_commits[len(snapshot_commits) * 3 // 8]
+    command = f'if git -C {mixxx_dir} merge-base --is-ancestor {culprit} "$MIXXX_BISECT_COMMIT"; then exit 1; fi'
+    argv = sys.argv
+    sys.argv = ['mixxx-bisect', '--root', str(bisect_root), '--repository', 'm1xxx', '--arch', 'x86_64', '-q', '--run', command]
+    output = io.StringIO()
+    try:
+        with results.measure('bisect') as metrics, redirect_stdout(output):
+            mixxx_bisect.main()
+    finally:
+        sys.argv = argv
+    lines = output.getvalue().splitlines()
+    metrics.update(
+        rounds=sum(line.startswith('==> Checking') for line in lines),
+        found=any(line.startswith('First bad:') and culprit[:10] in line for line in lines),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks of mixxx-bisect')
+    parser.add_argument('--commits', type=int, default=5000, help='The number of commits in the synthetic repository.')
+    parser.add_argument('--every', type=int, default=5, help='Every how many commits there is a snapshot.')
+    parser.add_argument('--download-size', type=int, default=64, help='The size of the download to measure throughput with (in MB).')
+    parser.add_argument('--output', type=pathlib.Path, help='The file to write the JSON results to (instead of stdout).')
+    args = parser.parse_args()
+
+    results = Results()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        mixxx_dir = root / 'mixxx.git'
+        with results.measure('make_repo') as metrics:
+            commits = make_repo(mixxx_dir, args.commits)
+        metrics.update(commits=len(commits))
+
+        snapshot_commits = commits[::args.every]
+        server = SnapshotServer(snapshot_commits, repo=mixxx_dir)
+        try:
+            resolved = bench_repositories(results, server, snapshot_commits[len(snapshot_commits) // 2], root / 'repositories', mixxx_dir)
+            bench_commits(results, list(resolved.keys()), root / 'commits', mixxx_dir)
+            bench_daemon(results, server, root / 'daemon', mixxx_dir)
+            bench_download(results, server, root, args.download_size * 1024 * 1024)
+            bench_bisect(results, server, snapshot_commits, root, mixxx_dir)
+        finally:
+            server.shutdown()
+
+    results.print_summary()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'commits': args.commits,
+        'snapshots': len(snapshot_commits),
+        'results': results.entries,
+    }
+    if args.output:
+        with args.output.open('w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -1,56 +1,106 @@
+from os import environ
+from typing import Optional
+
 import argparse
 import json
 import platform
+import re
 import sys
 
 from pathlib import Path
-from mixxx_bisect.error import EmptyRangeError, MixxxBisectError, NoCommitsFoundError, MissingSnapshotsError, UnsupportedOSError
-from mixxx_bisect.repository import SnapshotRepository
-from mixxx_bisect.repository.m1xxx import M1xxxSnapshotRepository
-from mixxx_bisect.repository.mixxx_org import MixxxOrgSnapshotRepository
+from mixxx_bisect.error import EmptyRangeError, MixxxBisectError, NoCommitsFoundError, MissingSessionError, MissingSnapshotsError, UnsupportedOSError
+from mixxx_bisect.discovery import discover_snapshots
 
 from mixxx_bisect.options import Options
-from mixxx_bisect.runner import SnapshotRunner
-from mixxx_bisect.runner.linux import LinuxSnapshotRunner
-from mixxx_bisect.runner.macos import MacOSSnapshotRunner
-from mixxx_bisect.runner.windows import WindowsSnapshotRunner
-from mixxx_bisect.utils.git import clone_mixxx, commits_in_order, describe_commit, parse_commit, sort_commits
-from mixxx_bisect.utils.snapshot import download_snapshot
+from mixxx_bisect.oracle import Oracle, Verdict
+from mixxx_bisect.oracle.command import CommandOracle
+from mixxx_bisect.oracle.interactive import InteractiveOracle
+from mixxx_bisect.oracle.performance import METRIC_KINDS, PerformanceOracle, make_metric, measurement_cache_path
+from mixxx_bisect.registry import SNAPSHOT_REPOSITORIES, SNAPSHOT_RUNNERS, load_class
+from mixxx_bisect.search import midpoint, speculative_midpoints, split_points
+from mixxx_bisect.utils.git import MIXXX_REMOTE, CommitMetadata, describe_commit, try_parse_commits
+from mixxx_bisect.utils.measurements import MeasurementCache
+from mixxx_bisect.utils.session import Session, oracle_spec
+from mixxx_bisect.utils.size import parse_size
+from mixxx_bisect.utils.trace import enable_tracing, span
 from mixxx_bisect.utils.version import pkg_version
 
 DEFAULT_ROOT = Path.home() / '.local' / 'state' / 'mixxx-bisect'
 
-# Platform-specific snapshot runners
+def make_options(args: argparse.Namespace, os: str, mixxx_args: list[str]) -> Options:
+    '''Creates the options from the parsed arguments, along with the root and auxiliary directories.'''
+    opts = Options(
+        quiet=args.quiet,
+        verbose=args.verbose,
+        os=os,
+        arch=args.arch,
+        mixxx_args=mixxx_args,
+        root_dir=args.root,
+        mixxx_dir=args.root / 'mixxx.git',
+        mixxx_remote=args.remote,
+        clone_filter=None if args.clone_filter == 'none' else args.clone_filter,
+        installs_dir=args.root / 'installs',
+        log_dir=args.root / 'log',
+        index_dir=args.root / 'index',
+        cache_dir=args.root / 'cache',
+        cache_max_size=args.cache_max_size,
+        max_installs=args.max_installs,
+    )
 
-SNAPSHOT_RUNNERS: dict[str, type[SnapshotRunner]] = {
-    'Windows': WindowsSnapshotRunner,
-    'Darwin': MacOSSnapshotRunner,
-    'Linux': LinuxSnapshotRunner,
-}
+    for dir in [opts.root_dir, opts.installs_dir, opts.log_dir, opts.index_dir, opts.cache_dir]:
+        dir.mkdir(parents=True, exist_ok=True)
 
-SNAPSHOT_REPOSITORIES: dict[str, type[SnapshotRepository]] = {
-    'mixxx-org': MixxxOrgSnapshotRepository,
-    'm1xxx': M1xxxSnapshotRepository,
-}
+    return opts
 
 # Main
 
 def main():
     os = platform.system()
 
-    parser = argparse.ArgumentParser(description='Finds Mixxx regressions using binary search', usage='mixxx-bisect [<options>] [[--] <mixxx args>]')
+    # 'mixxx-bisect daemon' serves the snapshots to other invocations instead of searching (see mixxx_bisect.daemon)
+    argv = sys.argv[1:]
+    daemon = argv[:1] == ['daemon']
+    if daemon:
+        argv.pop(0)
+
+    parser = argparse.ArgumentParser(description='Finds Mixxx regressions using binary search', usage='mixxx-bisect [daemon] [<options>] [[--] <mixxx args>]')
     parser.add_argument('--repository', default='m1xxx' if os == 'Linux' else 'mixxx-org', choices=sorted(SNAPSHOT_REPOSITORIES.keys()), help=f'The snapshot repository to use.')
     parser.add_argument('--branch', default='main', help=f'The branch to search for snapshots on, if supported by the repository.')
     parser.add_argument('--root', type=Path, default=DEFAULT_ROOT, help='The root directory where all application-specific state (i.e. the mixxx repo, downloads, installed snapshots etc.) will be stored.')
+    parser.add_argument('--remote', default=MIXXX_REMOTE, help='The Git remote to clone and fetch Mixxx from.')
+    parser.add_argument('--clone-filter', default='tree:0', help="The partial clone filter to clone Mixxx with, only commits are needed. 'none' makes a full clone.")
+    parser.add_argument('--fetch-ttl', type=float, default=3600, help='The number of seconds after which the Mixxx clone is fetched again if snapshots refer to commits missing locally, 0 means always.')
+    parser.add_argument('--github-token', default=environ.get('GITHUB_TOKEN'), help='A GitHub token to raise the API rate limit with (e.g. for the m1xxx repository). Defaults to $GITHUB_TOKEN.')
+    parser.add_argument('--retries', type=int, help='The number of times to retry failed HTTP requests (with exponential backoff). Defaults to a few.')
+    parser.add_argument('--cache-max-size', type=parse_size, default='4G', help='The maximum total size of cached snapshot downloads (e.g. 500M or 2G), least recently used snapshots are evicted first.')
+    parser.add_argument('--max-installs', type=int, default=5, help='The maximum number of extracted snapshots to keep around for quick re-checks (where supported by the platform).')
+    parser.add_argument('--download-segments', type=int, help='The number of parallel byte-range requests to download large snapshots with (if supported by the server). Defaults to a few.')
+    parser.add_argument('--stream', action='store_true', help='Extracts snapshots while downloading them (where supported by the platform).')
+    parser.add_argument('--prefetch-depth', type=int, default=1, help='The number of upcoming bisection rounds to download snapshots for in the background while testing (0 disables prefetching).')
+    parser.add_argument('--prefetch-rate', type=parse_size, default='0', help='The maximum combined bandwidth per second of background downloads (e.g. 5M), 0 means unlimited.')
+    parser.add_argument('--trace', type=Path, metavar='FILE', help='Records how long each phase and step of the search takes to the given file (in the Chrome trace format, viewable e.g. in https://ui.perfetto.dev) and prints a summary at the end.')
+    parser.add_argument('--no-daemon', action='store_true', help='Discovers the snapshots in this process, even if a daemon is running for the root directory.')
+    parser.add_argument('--refresh-interval', type=float, default=600, help='The number of seconds after which the daemon refreshes the snapshots it serves.')
     parser.add_argument('--dump-snapshots', action='store_true', help='Dumps the fetched snapshots.')
     parser.add_argument('--verbose', action='store_true', help='Enables verbose output.')
     parser.add_argument('--arch', default=platform.machine(), help="The architecture to query for. Defaults to `platform.machine()`, requires the repository to provide corresponding binaries and is primarily useful for machines capable of running multiple architectures, e.g. via Rosetta or QEMU.")
     parser.add_argument('-v', '--version', action='store_true', help='Outputs the version.')
     parser.add_argument('-q', '--quiet', action='store_true', help='Suppress output from subprocesses.')
+    parser.add_argument('--run', nargs='?', const='', metavar='CMD', help='Bisects unattended by running the given shell command (or Mixxx itself, if omitted) against each snapshot. Exit code 0 means good, 125 skip and anything else bad. The command gets the MIXXX_BISECT_MIXXX (executable) and MIXXX_BISECT_COMMIT environment variables.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='The number of snapshots to check in parallel in --run mode. Each round then splits the range at that many points.')
+    parser.add_argument('--perf', metavar='METRIC', help="Bisects a performance regression unattended by launching each snapshot repeatedly and comparing a metric (lower is better) to that of the good commit. The metric is 'exit' (the time until Mixxx exits), 'log:<regex>' (the time until Mixxx outputs a matching line, after which it is killed) or 'command:<cmd>' (the number output last by the given shell command, which gets the same environment variables as with --run).")
+    parser.add_argument('--repeat', type=int, default=5, help='The number of times to measure each snapshot in --perf mode.')
+    parser.add_argument('--threshold', type=float, default=0.1, help='The relative slowdown from which snapshots are considered bad in --perf mode (e.g. 0.1 for 10%%), if it is statistically significant.')
+    parser.add_argument('--significance', type=float, default=0.05, help="The significance level of Welch's t-test that a slowdown has to pass in --perf mode.")
+    parser.add_argument('--timeout', type=float, help='The number of seconds after which the command (or Mixxx) is killed in --run or --perf mode.')
+    parser.add_argument('--timeout-verdict', choices=[verdict.value for verdict in Verdict], default=Verdict.BAD.value, help='How to consider a snapshot whose command timed out in --run or --perf mode.')
+    parser.add_argument('--session', help="The name of the session to record the search range and verdicts in (defaults to 'default'). Verdicts from earlier runs of an explicitly named session are reused, if they were judged the same way (e.g. by the same command).")
+    parser.add_argument('--resume', action='store_true', help='Resumes the session, i.e. continues searching the range it was interrupted at, reusing its verdicts.')
+    parser.add_argument('--forget-verdicts', action='store_true', help='Discards the verdicts recorded in earlier runs of the session.')
     parser.add_argument('-g', '--good', help='The lower bound of the commit range (a good commit)')
     parser.add_argument('-b', '--bad', help='The upper bound of the commit range (a bad commit)')
 
-    args, extra_args = parser.parse_known_args()
+    args, extra_args = parser.parse_known_args(argv)
 
     if extra_args and extra_args[0] == '--':
         extra_args.pop(0)
@@ -59,105 +109,282 @@ def main():
         print(pkg_version())
         return
 
+    if args.resume and (args.good or args.bad):
+        parser.error('--resume continues the recorded search range and cannot be combined with --good/--bad')
+    if args.jobs < 1 or (args.jobs > 1 and args.run is None):
+        parser.error('--jobs requires --run and must be positive')
+    if args.timeout is not None and (args.timeout <= 0 or (args.run is None and args.perf is None)):
+        parser.error('--timeout requires --run or --perf and must be positive')
+    if args.perf is not None:
+        kind, separator, arg = args.perf.partition(':')
+        if kind not in METRIC_KINDS or (kind == 'exit') == bool(separator):
+            parser.error("--perf must be 'exit', 'log:<regex>' or 'command:<cmd>'")
+        if args.run is not None:
+            parser.error('--perf cannot be combined with --run')
+        if kind == 'log':
+            try:
+                re.compile(arg)
+            except re.error as e:
+                parser.error(f'--perf has an invalid regex: {e}')
+    if args.repeat < 2:
+        parser.error('--repeat must be at least 2')
+    if args.threshold < 0 or not 0 < args.significance < 1:
+        parser.error('--threshold must not be negative and --significance must be between 0 and 1')
+    if args.download_segments is not None and args.download_segments < 1:
+        parser.error('--download-segments must be positive')
+    if args.retries is not None and args.retries < 0:
+        parser.error('--retries must not be negative')
+    if args.prefetch_depth < 0 or args.max_installs < 0 or args.fetch_ttl < 0:
+        parser.error('--prefetch-depth, --max-installs and --fetch-ttl must not be negative')
+    if args.refresh_interval <= 0:
+        parser.error('--refresh-interval must be positive')
+
+    # Everything below may do network or git work, so we import the heavy machinery only now, after validating the arguments
+    from concurrent.futures import ThreadPoolExecutor, wait
+    from mixxx_bisect.daemon import Daemon, DaemonClient
+    from mixxx_bisect.utils.prefetch import SnapshotPrefetcher
+    from mixxx_bisect.utils.request import DEFAULT_RETRIES, DEFAULT_SEGMENTS, configure_client
+    from mixxx_bisect.utils.snapshot import SnapshotCache
+
+    tracer = enable_tracing() if args.trace else None
+
     try:
         if os not in SNAPSHOT_RUNNERS.keys():
             raise UnsupportedOSError(f"Unsupported OS: {os} has no snapshot runner (supported are {', '.join(SNAPSHOT_RUNNERS.keys())})")
 
-        SnapshotRunner = SNAPSHOT_RUNNERS[os]
-        SnapshotRepository = SNAPSHOT_REPOSITORIES[args.repository]
-
-        opts = Options(
-            quiet=args.quiet,
-            verbose=args.verbose,
-            os=os,
-            arch=args.arch,
-            mixxx_args=extra_args,
-            root_dir=args.root,
-            mixxx_dir=args.root / 'mixxx.git',
-            installs_dir=args.root / 'installs',
-            log_dir=args.root / 'log',
-            downloads_dir=args.root / 'downloads',
+        SnapshotRunner = load_class(SNAPSHOT_RUNNERS[os])
+
+        configure_client(
+            retries=DEFAULT_RETRIES if args.retries is None else args.retries,
+            github_token=args.github_token,
         )
 
-        # Ensure that the root directory exists
-        opts.root_dir.mkdir(parents=True, exist_ok=True)
+        if daemon:
+            opts = make_options(args, os, extra_args)
+            # Discover the snapshots this machine would ask for right away, so the first client doesn't have to wait
+            Daemon(fetch_ttl=args.fetch_ttl, refresh_interval=args.refresh_interval, opts=opts).serve(
+                warm_up=[(args.repository, args.branch, opts.arch, SnapshotRunner(opts).suffix)],
+            )
+            return
 
-        # Clone or fetch git repo
-        clone_mixxx(opts)
+        session_name = args.session or 'default'
+        session_path = args.root / 'sessions' / f'{session_name}.json'
+        previous_session = Session.load(session_path)
 
-        # Create auxiliary directories
-        for dir in [opts.downloads_dir, opts.installs_dir, opts.log_dir]:
-            dir.mkdir(parents=True, exist_ok=True)
+        if args.resume:
+            if not previous_session:
+                raise MissingSessionError(f"No session '{session_name}' to resume!")
+            print(f"==> Resuming session '{session_name}'...")
+            args.repository = previous_session.repository
+            args.branch = previous_session.branch
+            args.arch = previous_session.arch
 
-        # Set up platform-specific snapshot runner
+        opts = make_options(args, os, extra_args)
+
+        # Set up platform-specific snapshot runner and the download cache
         runner = SnapshotRunner(opts)
+        cache = SnapshotCache(opts.cache_dir, opts.cache_max_size, segments=args.download_segments or DEFAULT_SEGMENTS)
 
-        # Fetch snapshots and match them up with Git commits
-        repository = SnapshotRepository(
-            branch=args.branch,
-            suffix=runner.suffix,
-            opts=opts
-        )
+        if args.resume and previous_session:
+            good_rev, bad_rev = previous_session.good, previous_session.bad
+        else:
+            good_rev, bad_rev = args.good, args.bad
+
+        # Ask the daemon for the snapshots if one is running for our root directory, otherwise discover them ourselves
+        client = None if args.no_daemon else DaemonClient.connect(opts)
+        if client:
+            print('==> Querying snapshots from the daemon...')
+            with client:
+                discovery = client.discover(args.repository, args.branch, opts.arch, runner.suffix, good_rev, bad_rev)
+        else:
+            SnapshotRepository = load_class(SNAPSHOT_REPOSITORIES[args.repository])
+            repository = SnapshotRepository(
+                branch=args.branch,
+                suffix=runner.suffix,
+                opts=opts
+            )
+            discovery = discover_snapshots(repository, good_rev, bad_rev, args.fetch_ttl, opts)
+        snapshots = discovery.snapshots
+        commits = discovery.commits
 
-        snapshots = repository.fetch_snapshots()
         if args.dump_snapshots:
-            print(json.dumps(snapshots, indent=2))
+            print(json.dumps({commit: snapshot.url for commit, snapshot in snapshots.items()}, indent=2))
 
-        if snapshots:
-            commits = sort_commits(list(snapshots.keys()), opts)
-        else:
+        if not snapshots:
             raise MissingSnapshotsError(f'No snapshots found (for architecture {opts.arch})!')
 
         if commits:
             print(f'{len(commits)} snapshot commits found.')
+            metadata = CommitMetadata(opts)
+            metadata.load(commits)
             if opts.verbose:
                 for commit in commits:
-                    print(f'  {describe_commit(commit, opts)}')
+                    print(f'  {describe_commit(commit, metadata)}')
         else:
             raise NoCommitsFoundError('No snapshot commits found (or some error occurred while sorting the commits)')
 
         # Parse search range bounds
-        good = parse_commit(args.good or commits[0], opts)
-        bad = parse_commit(args.bad or commits[-1], opts)
+        good, bad = try_parse_commits([good_rev or commits[0], bad_rev or commits[-1]], opts)
+        indices = {commit: i for i, commit in enumerate(commits)}
 
-        if good == bad or not commits_in_order([good, bad], opts):
+        if good is None or good not in indices:
+            raise MissingSnapshotsError(f'Good commit {good or good_rev} has no associated snapshot!')
+        if bad is None or bad not in indices:
+            raise MissingSnapshotsError(f'Bad commit {bad or bad_rev} has no associated snapshot!')
+        if indices[good] >= indices[bad]:
             raise EmptyRangeError('Please make sure that good < bad!')
 
-        try:
-            good_idx = commits.index(good)
-        except ValueError:
-            raise MissingSnapshotsError(f'Good commit {good} has no associated snapshot!')
-        try:
-            bad_idx = commits.index(bad)
-        except ValueError:
-            raise MissingSnapshotsError(f'Bad commit {bad} has no associated snapshot!')
-
-        # Binary search over the commits
-        while good_idx < bad_idx - 1:
-            print(f'==> Searching {commits[good_idx][:10]} to {commits[bad_idx][:10]} ({bad_idx - good_idx} commits)...')
-            mid_idx = (bad_idx + good_idx) // 2
-            mid = commits[mid_idx]
-
-            print(f'==> Checking {describe_commit(mid, opts)}')
-            download_snapshot(snapshots[mid], runner.download_path)
-            runner.setup_snapshot()
-            runner.run_snapshot()
-            runner.cleanup_snapshot()
-
-            answer = ''
-            while not answer or answer not in 'yn':
-                answer = input('Good? [y/n] ')
-
-            if answer == 'y':
-                good_idx = mid_idx
+        good_idx = indices[good]
+        bad_idx = indices[bad]
+
+        oracle: Oracle
+        perf_oracle: Optional[PerformanceOracle] = None
+        if args.perf is not None:
+            oracle = perf_oracle = PerformanceOracle(
+                metric=make_metric(args.perf, runner, timeout=args.timeout, opts=opts),
+                cache=MeasurementCache(measurement_cache_path(args.perf, opts)),
+                snapshots=snapshots,
+                repeat=args.repeat,
+                threshold=args.threshold,
+                significance=args.significance,
+                timeout_verdict=Verdict(args.timeout_verdict),
+            )
+        elif args.run is not None:
+            oracle = CommandOracle(runner, command=args.run or None, timeout=args.timeout, timeout_verdict=Verdict(args.timeout_verdict), opts=opts)
+        else:
+            oracle = InteractiveOracle(runner)
+
+        # Record the session, reusing the verdicts from earlier runs only if asked to, a new search starts over
+        reuse_verdicts = (args.resume or args.session is not None) and not args.forget_verdicts
+        session = Session(
+            path=session_path,
+            repository=args.repository,
+            branch=args.branch,
+            arch=opts.arch,
+            good=good,
+            bad=bad,
+            oracle=oracle_spec(args.run, args.perf, args.threshold),
+            verdicts_by_oracle=previous_session.verdicts_by_oracle if previous_session and reuse_verdicts else {},
+        )
+        session.save()
+        if session.verdicts:
+            print(f"Reusing {len(session.verdicts)} verdict(s) from session '{session_name}' (pass --forget-verdicts to discard them).")
+
+        # Balance the search by the actual number of commits rather than the number of snapshots, which varies a lot over time
+        positions = discovery.positions
+
+        def print_range():
+            print(f'==> Searching {commits[good_idx][:10]} to {commits[bad_idx][:10]} ({bad_idx - good_idx} snapshots, {positions[bad_idx] - positions[good_idx]} commits)...')
+
+        def set_up_snapshot(commit: str, progress: bool=True):
+            '''Downloads and sets up the snapshot for the given commit, unless it is installed already.'''
+            if runner.is_installed(commit):
+                print('Using cached install...')
+            elif args.stream and runner.supports_streaming:
+                with cache.open(commit, snapshots[commit], tee=opts.cache_max_size > 0, progress=progress) as stream:
+                    runner.stream_snapshot(commit, stream)
+            else:
+                # Finishing prefetches must not evict the archive before it is set up
+                with cache.pinned(commit, snapshots[commit]):
+                    archive = cache.fetch(commit, snapshots[commit], progress=progress)
+                    runner.setup_snapshot(commit, archive)
+
+        # The good commit is the baseline that performance is compared to
+        if perf_oracle:
+            baseline = commits[good_idx]
+            print(f'==> Measuring baseline {describe_commit(baseline, metadata)}')
+            if perf_oracle.needs_snapshot(baseline):
+                set_up_snapshot(baseline)
+                try:
+                    perf_oracle.measure_baseline(baseline)
+                finally:
+                    runner.cleanup_snapshot(baseline)
             else:
-                bad_idx = mid_idx
+                perf_oracle.measure_baseline(baseline)
+
+        skipped: set[int] = set()
+
+        def apply_verdicts(verdicts: dict[int, Verdict]):
+            '''Narrows the search range according to the given verdicts for indices within it.'''
+            nonlocal good_idx, bad_idx
+            bad_idx = min((idx for idx, verdict in verdicts.items() if verdict == Verdict.BAD), default=bad_idx)
+            good_idx = max((idx for idx, verdict in verdicts.items() if verdict == Verdict.GOOD and idx < bad_idx), default=good_idx)
+            skipped.update(idx for idx, verdict in verdicts.items() if verdict == Verdict.SKIP)
+            for idx, verdict in verdicts.items():
+                session.record(commits[idx], verdict, good=commits[good_idx], bad=commits[bad_idx])
+
+        if args.jobs > 1:
+            # K-way search, checking the snapshots at K points of the range in parallel per round
+            def check_snapshot(commit: str) -> Verdict:
+                with span('check snapshot', 'step', commit=commit):
+                    set_up_snapshot(commit, progress=False)
+                    return oracle.judge(commit)
+
+            while points := split_points(good_idx, bad_idx, args.jobs, skipped, positions):
+                print_range()
+                verdicts = {idx: session.verdicts[commits[idx]] for idx in points if commits[idx] in session.verdicts}
+                for idx, verdict in verdicts.items():
+                    print(f'==> Reusing verdict for {describe_commit(commits[idx], metadata)} ({verdict.value})')
+                pending = [idx for idx in points if idx not in verdicts]
+                for idx in pending:
+                    print(f'==> Checking {describe_commit(commits[idx], metadata)}')
+                if pending:
+                    with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                        futures = {idx: executor.submit(check_snapshot, commits[idx]) for idx in pending}
+                        wait(futures.values())
+                    for idx in pending:
+                        runner.cleanup_snapshot(commits[idx])
+                    for idx, future in futures.items():
+                        verdicts[idx] = future.result()
+                apply_verdicts(verdicts)
+        else:
+            # Binary search over the commits, downloading possible upcoming snapshots in the background
+            prefetcher = SnapshotPrefetcher(cache, rate=args.prefetch_rate) if args.prefetch_depth > 0 else None
+            try:
+                while (mid_idx := midpoint(good_idx, bad_idx, skipped, positions)) is not None:
+                    print_range()
+                    mid = commits[mid_idx]
+
+                    if mid in session.verdicts:
+                        verdict = session.verdicts[mid]
+                        print(f'==> Reusing verdict for {describe_commit(mid, metadata)} ({verdict.value})')
+                    elif not oracle.needs_snapshot(mid):
+                        print(f'==> Judging {describe_commit(mid, metadata)} from earlier measurements')
+                        verdict = oracle.judge(mid)
+                    else:
+                        print(f'==> Checking {describe_commit(mid, metadata)}')
+                        with span('check snapshot', 'step', commit=mid):
+                            if prefetcher:
+                                prefetcher.wait(mid)
+                            set_up_snapshot(mid)
+                            if prefetcher:
+                                upcoming = [commits[i] for i in speculative_midpoints(good_idx, mid_idx, bad_idx, args.prefetch_depth, skipped, positions)]
+                                prefetcher.prefetch([(commit, snapshots[commit]) for commit in upcoming if commit not in session.verdicts])
+                            try:
+                                verdict = oracle.judge(mid)
+                            finally:
+                                runner.cleanup_snapshot(mid)
+
+                    apply_verdicts({mid_idx: verdict})
+            finally:
+                if prefetcher:
+                    prefetcher.close()
+
+        if bad_idx - good_idx > 1:
+            print('Only skipped snapshots are left to check, the first bad commit could be in any of these:')
+            for commit in commits[good_idx + 1:bad_idx]:
+                print(f'  {describe_commit(commit, metadata)}')
 
-        print(f'Last good: {describe_commit(commits[good_idx], opts)}')
-        print(f'First bad: {describe_commit(commits[bad_idx], opts)}')
+        print(f'Last good: {describe_commit(commits[good_idx], metadata)}')
+        print(f'First bad: {describe_commit(commits[bad_idx], metadata)}')
         print(f'Trees:     https://github.com/mixxxdj/mixxx/tree/{commits[good_idx]}')
         print(f'           https://github.com/mixxxdj/mixxx/tree/{commits[bad_idx]}')
         print(f'Diff:      https://github.com/mixxxdj/mixxx/compare/{commits[good_idx]}...{commits[bad_idx]}')
     except MixxxBisectError as e:
         print(str(e))
         sys.exit(1)
+    finally:
+        if tracer and args.trace:
+            tracer.save(args.trace)
+            print(f'==> Phase timings (trace written to {args.trace})')
+            print(tracer.summary())
@@ -0,0 +1,238 @@
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Optional
+
+from mixxx_bisect.discovery import Discovery, discover_snapshots
+from mixxx_bisect.error import DaemonError, MixxxBisectError, UnsupportedOSError
+from mixxx_bisect.options import Options
+from mixxx_bisect.registry import SNAPSHOT_REPOSITORIES, load_class
+from mixxx_bisect.repository import SnapshotRepository
+from mixxx_bisect.utils.git import CommitMetadata, CommitResolver, fetch_mixxx
+from mixxx_bisect.utils.trace import traced
+
+import json
+import math
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+SOCKET_NAME = 'daemon.sock'
+
+# A repository, branch, arch and suffix, i.e. everything that determines the snapshots
+DiscoveryKey = tuple[str, str, str, str]
+
+def socket_path(opts: Options) -> Path:
+    return opts.root_dir / SOCKET_NAME
+
+class Daemon:
+    '''
+    Keeps the Mixxx clone, the snapshot indexes and the commit order of the requested repositories
+    in memory, refreshes them in the background and serves them to clients over a Unix socket.
+    '''
+
+    def __init__(self, fetch_ttl: float, refresh_interval: float, opts: Options):
+        self.fetch_ttl = fetch_ttl
+        self.refresh_interval = refresh_interval
+        self.opts = opts
+        self.repositories: dict[DiscoveryKey, SnapshotRepository] = {}
+        self.discoveries: dict[DiscoveryKey, Discovery] = {}
+        # The revisions that had no snapshot when last looked up (and when), which are not looked up again until the fetch TTL expires
+        self.missing_revs: dict[DiscoveryKey, dict[str, float]] = {}
+        # Discoveries share the clone and the indexes, so only one runs at a time
+        self.discovery_lock = threading.Lock()
+        self.resolver: Optional[CommitResolver] = None
+        self.resolver_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def discover(self, key: DiscoveryKey, good: Optional[str], bad: Optional[str]) -> Discovery:
+        '''The snapshots for the given key, discovered only if unknown so far or if the given bounds may have new snapshots.'''
+        discovery = self.discoveries.get(key)
+        if discovery is None or self._unknown_revs(key, discovery, good, bad):
+            with self.discovery_lock:
+                # Another client may have discovered them while we were waiting
+                discovery = self.discoveries.get(key)
+                if discovery is None:
+                    discovery = self._rediscover(key, good, bad)
+                    revs = [rev for rev in (good, bad) if rev]
+                else:
+                    revs = self._unknown_revs(key, discovery, good, bad)
+                    if revs:
+                        discovery = self._discover_revs(key, revs)
+                # Clients may keep asking for revisions without snapshots (e.g. typos), which shouldn't fetch and discover every time
+                now = time.time()
+                self.missing_revs.setdefault(key, {}).update({rev: now for rev in revs if self._resolve(rev) not in discovery.snapshots})
+        return discovery
+
+    def warm_up(self, key: DiscoveryKey):
+        try:
+            self.discover(key, good=None, bad=None)
+        except Exception as e:
+            print(f'Warming up {key[0]} failed: {e}')
+
+    def refresh_periodically(self):
+        while not self.stopped.wait(self.refresh_interval):
+            for key in list(self.discoveries.keys()):
+                print(f'==> Refreshing {key[0]} snapshots...')
+                try:
+                    with self.discovery_lock:
+                        self._rediscover(key, good=None, bad=None)
+                except Exception as e:
+                    # Clients are served the previous snapshots until the next refresh succeeds (e.g. once the network is back)
+                    print(f'Refreshing failed: {e}')
+
+    def serve(self, warm_up: list[DiscoveryKey]):
+        path = socket_path(self.opts)
+        if not hasattr(socket, 'AF_UNIX'):
+            raise UnsupportedOSError('The daemon requires Unix domain sockets, which this platform does not support.')
+        client = DaemonClient.connect(self.opts)
+        if client:
+            client.close()
+            raise DaemonError(f'A daemon is already running at {path}.')
+        # A socket left behind by a daemon that didn't exit cleanly
+        path.unlink(missing_ok=True)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    response = daemon.handle(json.loads(line))
+                    self.wfile.write(json.dumps(response).encode() + b'\n')
+
+        server = self.server = socketserver.ThreadingUnixStreamServer(str(path), Handler)
+        server.daemon_threads = True
+        # Make sure the socket is removed when being terminated (signal handlers can only be set from the main thread)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            for key in warm_up:
+                threading.Thread(target=self.warm_up, args=(key,), daemon=True).start()
+            threading.Thread(target=self.refresh_periodically, daemon=True).start()
+            print(f'==> Serving at {path} (stop with Ctrl+C)...')
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stopped.set()
+            server.server_close()
+            path.unlink(missing_ok=True)
+
+    def shutdown(self):
+        '''Stops serving from another thread, once the daemon serves clients.'''
+        if self.server:
+            self.server.shutdown()
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        try:
+            method = request.get('method')
+            if method == 'discover':
+                key = (request['repository'], request['branch'], request['arch'], request['suffix'])
+                if key[0] not in SNAPSHOT_REPOSITORIES:
+                    raise DaemonError(f'Unknown repository: {key[0]}')
+                return {'result': self.discover(key, request.get('good'), request.get('bad')).to_json()}
+            if method == 'status':
+                return {'result': {'repositories': [list(key) for key in self.discoveries.keys()]}}
+            raise DaemonError(f'Unknown method: {method}')
+        except MixxxBisectError as e:
+            return {'error': str(e)}
+        except Exception as e:
+            # Report unexpected errors (e.g. from the network) to the client too, instead of just dropping the connection
+            return {'error': f'{type(e).__name__}: {e}'}
+
+    def _rediscover(self, key: DiscoveryKey, good: Optional[str], bad: Optional[str]) -> Discovery:
+        name, branch, arch, suffix = key
+        opts = replace(self.opts, arch=arch)
+        if key not in self.repositories:
+            repository_class = load_class(SNAPSHOT_REPOSITORIES[name])
+            self.repositories[key] = repository_class(branch=branch, suffix=suffix, opts=opts)
+        # Clients may ask for any range, so the indexes are always kept complete
+        discovery = discover_snapshots(self.repositories[key], good, bad, self.fetch_ttl, opts, bounded=False)
+        CommitMetadata(opts).load(discovery.commits)
+        self.discoveries[key] = discovery
+        # The clone may have been fetched, so commits that were missing before may resolve now
+        self._close_resolver()
+        return discovery
+
+    def _discover_revs(self, key: DiscoveryKey, revs: list[str]) -> Discovery:
+        '''Fetches the clone if it lacks any of the given revisions, then discovers the snapshots again if any of them are in the clone.'''
+        if not all(self._resolve(rev) for rev in revs):
+            fetch_mixxx(self.opts)
+            self._close_resolver()
+        # Only revisions in the clone can be matched up with snapshots
+        if any(self._resolve(rev) for rev in revs):
+            return self._rediscover(key, good=None, bad=None)
+        return self.discoveries[key]
+
+    def _unknown_revs(self, key: DiscoveryKey, discovery: Discovery, *revs: Optional[str]) -> list[str]:
+        '''The given revisions without a snapshot, except for those that had none when looked up within the fetch TTL.'''
+        missing = self.missing_revs.get(key, {})
+        return [
+            rev for rev in revs
+            if rev and self._resolve(rev) not in discovery.snapshots and time.time() - missing.get(rev, -math.inf) >= self.fetch_ttl
+        ]
+
+    def _resolve(self, rev: str) -> Optional[str]:
+        '''Resolves the given revision in the clone through a long-lived git process.'''
+        with self.resolver_lock:
+            if not self.resolver:
+                self.resolver = CommitResolver(self.opts)
+            return self.resolver.resolve(rev)
+
+    def _close_resolver(self):
+        with self.resolver_lock:
+            if self.resolver:
+                self.resolver.close()
+                self.resolver = None
+
+class DaemonClient:
+    '''A connection to a running daemon.'''
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.file = sock.makefile('rwb')
+
+    @staticmethod
+    def connect(opts: Options) -> Optional['DaemonClient']:
+        '''Connects to the daemon for the given root directory, if one is running.'''
+        path = socket_path(opts)
+        if not hasattr(socket, 'AF_UNIX') or not path.exists():
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            sock.close()
+            return None
+        return DaemonClient(sock)
+
+    def __enter__(self) -> 'DaemonClient':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def request(self, method: str, **params: Any) -> Any:
+        try:
+            self.file.write(json.dumps({'method': method, **params}).encode() + b'\n')
+            self.file.flush()
+            line = self.file.readline()
+        except OSError as e:
+            raise DaemonError(f'Lost the connection to the daemon: {e}')
+        if not line:
+            raise DaemonError('The daemon closed the connection.')
+        response = json.loads(line)
+        if 'error' in response:
+            raise DaemonError(f"Daemon: {response['error']}")
+        return response['result']
+
+    @traced('discovery')
+    def discover(self, repository: str, branch: str, arch: str, suffix: str, good: Optional[str], bad: Optional[str]) -> Discovery:
+        return Discovery.from_json(self.request('discover', repository=repository, branch=branch, arch=arch, suffix=suffix, good=good, bad=bad))
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
@@ -0,0 +1,73 @@
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from mixxx_bisect.options import Options
+from mixxx_bisect.repository import Snapshot, SnapshotRepository, resolve_snapshots
+from mixxx_bisect.utils.git import CommitOrder, clone_mixxx, fetch_mixxx, last_fetch_age, try_parse_commits
+
+@dataclass
+class Discovery:
+    '''The snapshots of a repository, matched up with the commits of the local clone.'''
+
+    # The snapshots by full commit SHA
+    snapshots: dict[str, Snapshot]
+    # The snapshot commits, oldest first
+    commits: list[str]
+    # The topological positions of the snapshot commits, differing by the number of commits in between
+    positions: list[int]
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            'snapshots': {commit: asdict(snapshot) for commit, snapshot in self.snapshots.items()},
+            'commits': self.commits,
+            'positions': self.positions,
+        }
+
+    @staticmethod
+    def from_json(raw: dict[str, Any]) -> 'Discovery':
+        return Discovery(
+            snapshots={commit: Snapshot(**snapshot) for commit, snapshot in raw['snapshots'].items()},
+            commits=raw['commits'],
+            positions=raw['positions'],
+        )
+
+def discover_snapshots(repository: SnapshotRepository, good: Optional[str], bad: Optional[str], fetch_ttl: float, opts: Options, bounded: bool=True) -> Discovery:
+    '''
+    Fetches the snapshots and orders them by the commits they were built from, cloning or fetching Mixxx as needed.
+    The given good and bad revisions are always fetched. If bounded, snapshots older than the good one may be omitted.
+    '''
+    # Clone git repo (fetching is deferred until we know whether it is needed)
+    cloned = clone_mixxx(opts)
+
+    # Explicitly given bounds are always needed, so fetch if the clone is missing them
+    good_commit, bad_commit = try_parse_commits([good, bad], opts)
+    fetched = False
+    if not cloned and (good and not good_commit or bad and not bad_commit):
+        fetch_mixxx(opts)
+        fetched = True
+        good_commit, = try_parse_commits([good], opts)
+
+    # Fetch snapshots (only back to the good commit, if known) and match them up with Git commits
+    published_snapshots = repository.fetch_snapshots(oldest=good_commit if bounded else None)
+    snapshots, unresolved = resolve_snapshots(published_snapshots, opts)
+
+    # Otherwise fetch only if the clone is missing snapshot commits and hasn't been fetched recently
+    if not cloned and not fetched:
+        if unresolved and last_fetch_age(opts) >= fetch_ttl:
+            fetch_mixxx(opts)
+            snapshots, unresolved = resolve_snapshots(published_snapshots, opts)
+        elif unresolved:
+            print(f'Not fetching Mixxx, {len(unresolved)} snapshot commit(s) missing locally but fetched recently (see --fetch-ttl).')
+        else:
+            print('Mixxx clone is up to date.')
+
+    if not snapshots:
+        return Discovery(snapshots={}, commits=[], positions=[])
+
+    order = CommitOrder(snapshots.keys(), opts)
+    commits = order.sort(snapshots.keys())
+    return Discovery(
+        snapshots=snapshots,
+        commits=commits,
+        positions=[order.position(commit) for commit in commits],
+    )
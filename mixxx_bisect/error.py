@@ -15,3 +15,27 @@ class NoCommitsFoundError(MixxxBisectError):
 
 class MissingSnapshotsError(MixxxBisectError):
     pass
+
+class SnapshotIntegrityError(MixxxBisectError):
+    pass
+
+class DownloadCancelledError(MixxxBisectError):
+    pass
+
+class DownloadError(MixxxBisectError):
+    pass
+
+class MissingSessionError(MixxxBisectError):
+    pass
+
+class RateLimitError(MixxxBisectError):
+    pass
+
+class DaemonError(MixxxBisectError):
+    pass
+
+class MeasurementError(MixxxBisectError):
+    pass
+
+class SnapshotSetupError(MixxxBisectError):
+    pass
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 @dataclass
 class Options:
@@ -10,6 +11,11 @@ class Options:
     mixxx_args: list[str]
     root_dir: Path
     mixxx_dir: Path
+    mixxx_remote: str
+    clone_filter: Optional[str]
     installs_dir: Path
     log_dir: Path
-    downloads_dir: Path
+    index_dir: Path
+    cache_dir: Path
+    cache_max_size: int
+    max_installs: int
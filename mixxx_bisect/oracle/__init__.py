@@ -0,0 +1,18 @@
+from enum import Enum
+from typing import Protocol
+
+class Verdict(Enum):
+    GOOD = 'good'
+    BAD = 'bad'
+    SKIP = 'skip'
+
+class Oracle(Protocol):
+    '''A way of judging whether a (set up) snapshot is good or bad.'''
+
+    def judge(self, commit: str) -> Verdict:
+        '''Runs or inspects the snapshot for the given commit and judges it.'''
+        raise NotImplementedError()
+
+    def needs_snapshot(self, commit: str) -> bool:
+        '''Whether the snapshot for the given commit has to be set up to judge it (rather than e.g. from earlier measurements).'''
+        return True
@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Optional
+
+from mixxx_bisect.options import Options
+from mixxx_bisect.oracle import Oracle, Verdict
+from mixxx_bisect.runner import SnapshotRunner
+from mixxx_bisect.utils.run import run
+from mixxx_bisect.utils.trace import span
+
+import os
+import subprocess
+
+# Like `git bisect run`, scripts can exit with 125 to signal that a snapshot cannot be tested
+SKIP_EXIT_CODE = 125
+
+def verdict_from_exit_code(code: int) -> Verdict:
+    if code == 0:
+        return Verdict.GOOD
+    elif code == SKIP_EXIT_CODE:
+        return Verdict.SKIP
+    else:
+        return Verdict.BAD
+
+class CommandOracle(Oracle):
+    '''Judges snapshots by the exit code of either Mixxx itself or a user-provided test command.'''
+
+    def __init__(self, runner: SnapshotRunner, command: Optional[str], timeout: Optional[float], timeout_verdict: Verdict, opts: Options):
+        self.runner = runner
+        self.command = command
+        self.timeout = timeout
+        self.timeout_verdict = timeout_verdict
+        self.opts = opts
+
+    def judge(self, commit: str) -> Verdict:
+        try:
+            if self.command:
+                print(f'Running {self.command}...')
+                # The command runs in the user's working directory and learns about the snapshot via the environment
+                with span('command', 'oracle', commit=commit):
+                    code = run(self.command, opts=self.opts, cwd=Path.cwd(), timeout=self.timeout, shell=True, env={
+                        **os.environ,
+                        'MIXXX_BISECT_COMMIT': commit,
+                        'MIXXX_BISECT_MIXXX': str(self.runner.executable_path(commit)),
+                    })
+            else:
+                code = self.runner.run_snapshot(commit, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            print(f'Timed out after {self.timeout} s ({self.timeout_verdict.value})')
+            return self.timeout_verdict
+
+        verdict = verdict_from_exit_code(code)
+        print(f'Exited with code {code} ({verdict.value})')
+        return verdict
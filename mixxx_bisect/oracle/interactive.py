@@ -0,0 +1,20 @@
+from mixxx_bisect.oracle import Oracle, Verdict
+from mixxx_bisect.runner import SnapshotRunner
+from mixxx_bisect.utils.trace import span
+
+class InteractiveOracle(Oracle):
+    '''Runs the snapshot and asks the user for a verdict.'''
+
+    def __init__(self, runner: SnapshotRunner):
+        self.runner = runner
+
+    def judge(self, commit: str) -> Verdict:
+        self.runner.run_snapshot(commit)
+
+        answers = {'y': Verdict.GOOD, 'n': Verdict.BAD, 's': Verdict.SKIP}
+        answer = ''
+        with span('prompt', 'user', commit=commit):
+            while answer not in answers:
+                answer = input('Good? [y/n/s(kip)] ')
+
+        return answers[answer]
@@ -0,0 +1,210 @@
+from pathlib import Path
+from typing import Optional, Protocol
+
+from mixxx_bisect.error import MeasurementError
+from mixxx_bisect.options import Options
+from mixxx_bisect.oracle import Oracle, Verdict
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.runner import SnapshotRunner
+from mixxx_bisect.utils.measurements import MeasurementCache
+from mixxx_bisect.utils.run import launch, run_with_output
+from mixxx_bisect.utils.stats import welch_t_test
+from mixxx_bisect.utils.trace import span
+
+import hashlib
+import math
+import os
+import re
+import statistics
+import subprocess
+import time
+
+# The kinds of metrics, specified as 'exit', 'log:<regex>' or 'command:<shell command>'
+METRIC_KINDS = ['exit', 'log', 'command']
+
+# How often the log is checked for new lines (in seconds)
+LOG_POLL_INTERVAL = 0.01
+
+class Metric(Protocol):
+    '''A quantity measured by launching a set up snapshot, where lower is better (e.g. a duration).'''
+
+    @property
+    def name(self) -> str:
+        raise NotImplementedError()
+
+    def measure(self, commit: str) -> float:
+        '''Measures the snapshot once. Raises MeasurementError if the run failed and subprocess.TimeoutExpired if it timed out.'''
+        raise NotImplementedError()
+
+class ExitTimeMetric(Metric):
+    '''The wall time until Mixxx exits (successfully).'''
+
+    def __init__(self, runner: SnapshotRunner, timeout: Optional[float]):
+        self.runner = runner
+        self.timeout = timeout
+
+    @property
+    def name(self) -> str:
+        return 'Time to exit'
+
+    def measure(self, commit: str) -> float:
+        start = time.perf_counter()
+        code = self.runner.run_snapshot(commit, timeout=self.timeout)
+        elapsed = time.perf_counter() - start
+        if code != 0:
+            raise MeasurementError(f'Mixxx exited with code {code}')
+        return elapsed
+
+class LogLineMetric(Metric):
+    '''The wall time until Mixxx outputs a line matching a pattern, after which it is killed. The output is logged to the log directory.'''
+
+    def __init__(self, runner: SnapshotRunner, pattern: str, timeout: Optional[float], opts: Options):
+        self.runner = runner
+        self.pattern = re.compile(pattern)
+        self.timeout = timeout
+        self.opts = opts
+
+    @property
+    def name(self) -> str:
+        return f'Time to log /{self.pattern.pattern}/'
+
+    def measure(self, commit: str) -> float:
+        log_path = self.opts.log_dir / f'perf-{commit[:10]}.log'
+        cmd = self.runner.snapshot_command(commit)
+        print('Running snapshot...')
+        with log_path.open('wb') as output, log_path.open('rb') as log:
+            start = time.perf_counter()
+            with launch(cmd, self.opts, output) as process:
+                line = b''
+                while True:
+                    # Checked before reading, so that output written right before exiting isn't missed
+                    exited = process.poll() is not None
+                    chunk = log.readline()
+                    elapsed = time.perf_counter() - start
+                    if chunk:
+                        # Lines may arrive in pieces, so we match what we have of the current line so far
+                        line += chunk
+                        if self.pattern.search(line.decode(errors='replace')):
+                            return elapsed
+                        if line.endswith(b'\n'):
+                            line = b''
+                    elif exited:
+                        raise MeasurementError(f'Mixxx exited with code {process.returncode} without logging a line matching /{self.pattern.pattern}/ (see {log_path})')
+                    elif self.timeout is not None and elapsed > self.timeout:
+                        raise subprocess.TimeoutExpired(cmd, self.timeout)
+                    else:
+                        time.sleep(LOG_POLL_INTERVAL)
+
+class CommandMetric(Metric):
+    '''The number output by a user-provided command on its last line, e.g. a duration measured by the command itself.'''
+
+    def __init__(self, runner: SnapshotRunner, command: str, timeout: Optional[float], opts: Options):
+        self.runner = runner
+        self.command = command
+        self.timeout = timeout
+        self.opts = opts
+
+    @property
+    def name(self) -> str:
+        return 'Command output'
+
+    def measure(self, commit: str) -> float:
+        print(f'Running {self.command}...')
+        try:
+            # Like with --run, the command runs in the user's working directory and learns about the snapshot via the environment
+            lines = run_with_output(self.command, opts=self.opts, cwd=Path.cwd(), timeout=self.timeout, shell=True, env={
+                **os.environ,
+                'MIXXX_BISECT_COMMIT': commit,
+                'MIXXX_BISECT_MIXXX': str(self.runner.executable_path(commit)),
+            })
+        except subprocess.CalledProcessError as e:
+            raise MeasurementError(f'{self.command} exited with code {e.returncode}')
+        output = [line.strip() for line in lines if line.strip()]
+        try:
+            return float(output[-1])
+        except (IndexError, ValueError):
+            raise MeasurementError(f'{self.command} did not output a number on its last line')
+
+def make_metric(spec: str, runner: SnapshotRunner, timeout: Optional[float], opts: Options) -> Metric:
+    '''Creates the metric from a specification like 'exit', 'log:<regex>' or 'command:<shell command>'.'''
+    kind, _, arg = spec.partition(':')
+    if kind == 'log':
+        return LogLineMetric(runner, arg, timeout, opts)
+    if kind == 'command':
+        return CommandMetric(runner, arg, timeout, opts)
+    return ExitTimeMetric(runner, timeout)
+
+def measurement_cache_path(spec: str, opts: Options) -> Path:
+    '''The path to cache measurements at, which only depend on the metric, the snapshot (by URL) and the arguments Mixxx is launched with.'''
+    key = '\0'.join([spec, opts.os, opts.arch, *opts.mixxx_args])
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    kind = spec.partition(':')[0]
+    return opts.root_dir / 'measurements' / f'{kind}-{digest}.json'
+
+def relative_change(value: float, baseline: float) -> float:
+    if baseline == 0:
+        return 0 if value == 0 else math.copysign(math.inf, value)
+    return (value - baseline) / abs(baseline)
+
+class PerformanceOracle(Oracle):
+    '''
+    Judges snapshots by launching them repeatedly and comparing a metric to that of a known good baseline snapshot.
+    Snapshots are bad if the metric is worse by more than a threshold and Welch's t-test considers that significant.
+    '''
+
+    def __init__(self, metric: Metric, cache: MeasurementCache, snapshots: dict[str, Snapshot], repeat: int, threshold: float, significance: float, timeout_verdict: Verdict):
+        self.metric = metric
+        self.cache = cache
+        self.snapshots = snapshots
+        self.repeat = repeat
+        self.threshold = threshold
+        self.significance = significance
+        self.timeout_verdict = timeout_verdict
+        self.baseline: Optional[str] = None
+
+    def needs_snapshot(self, commit: str) -> bool:
+        return len(self._samples(commit)) < self.repeat
+
+    def measure(self, commit: str) -> list[float]:
+        '''Measures the snapshot until there are enough samples, reusing the ones from earlier runs.'''
+        for i in range(len(self._samples(commit)), self.repeat):
+            print(f'Measuring ({i + 1}/{self.repeat})...')
+            with span('measure', 'oracle', commit=commit):
+                sample = self.metric.measure(commit)
+            print(f'{self.metric.name}: {sample:.3f}')
+            self.cache.add(self.snapshots[commit].url, sample)
+        return self._samples(commit)
+
+    def _samples(self, commit: str) -> list[float]:
+        # Builds of the same commit from different repositories may perform differently, so samples belong to the snapshot
+        return self.cache.samples(self.snapshots[commit].url)
+
+    def measure_baseline(self, commit: str):
+        '''Measures the known good snapshot that the others are compared to.'''
+        try:
+            samples = self.measure(commit)
+        except subprocess.TimeoutExpired:
+            raise MeasurementError('Measuring the baseline timed out')
+        print(f'Baseline: {self._describe(samples)}')
+        self.baseline = commit
+
+    def judge(self, commit: str) -> Verdict:
+        assert self.baseline, 'The baseline has to be measured first'
+        try:
+            samples = self.measure(commit)
+        except subprocess.TimeoutExpired:
+            print(f'Timed out ({self.timeout_verdict.value})')
+            return self.timeout_verdict
+        except MeasurementError as e:
+            print(f'{e} (skip)')
+            return Verdict.SKIP
+
+        baseline = self._samples(self.baseline)
+        change = relative_change(statistics.mean(samples), statistics.mean(baseline))
+        p = welch_t_test(samples, baseline).p
+        verdict = Verdict.BAD if change > self.threshold and p < self.significance else Verdict.GOOD
+        print(f'{self._describe(samples)}, {change:+.1%} vs. baseline (p = {p:.3f}) ({verdict.value})')
+        return verdict
+
+    def _describe(self, samples: list[float]) -> str:
+        return f'{self.metric.name} {statistics.mean(samples):.3f} ± {statistics.stdev(samples):.3f} (n = {len(samples)})'
@@ -0,0 +1,22 @@
+from typing import Any
+
+import importlib
+
+# Platform-specific snapshot runners and snapshot repositories, referenced as '<module>:<class>'
+# and only imported when used, since they pull in comparatively heavy dependencies (e.g. requests)
+
+SNAPSHOT_RUNNERS: dict[str, str] = {
+    'Windows': 'mixxx_bisect.runner.windows:WindowsSnapshotRunner',
+    'Darwin': 'mixxx_bisect.runner.macos:MacOSSnapshotRunner',
+    'Linux': 'mixxx_bisect.runner.linux:LinuxSnapshotRunner',
+}
+
+SNAPSHOT_REPOSITORIES: dict[str, str] = {
+    'mixxx-org': 'mixxx_bisect.repository.mixxx_org:MixxxOrgSnapshotRepository',
+    'm1xxx': 'mixxx_bisect.repository.m1xxx:M1xxxSnapshotRepository',
+    'combined': 'mixxx_bisect.repository.combined:CombinedSnapshotRepository',
+}
+
+def load_class(path: str) -> Any:
+    module_name, class_name = path.split(':')
+    return getattr(importlib.import_module(module_name), class_name)
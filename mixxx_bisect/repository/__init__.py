@@ -1,6 +1,18 @@
-from typing import Protocol
+from dataclasses import dataclass
+from typing import Optional, Protocol
 
 from mixxx_bisect.options import Options
+from mixxx_bisect.utils.git import try_parse_commits
+from mixxx_bisect.utils.trace import traced
+
+@dataclass
+class Snapshot:
+    '''A downloadable snapshot along with the asset metadata provided by the repository.'''
+
+    url: str
+    name: str
+    size: Optional[int] = None
+    digest: Optional[str] = None
 
 class SnapshotRepository(Protocol):
     '''A repository/archive of (binary) Mixxx snapshots, usually hosted on the web.'''
@@ -8,6 +20,22 @@ class SnapshotRepository(Protocol):
     def __init__(self, branch: str, suffix: str, opts: Options):
         pass
 
-    def fetch_snapshots(self) -> dict[str, str]:
-        '''Fetches the snapshots as a dictionary from commit SHAs to URLs..'''
+    def fetch_snapshots(self, oldest: Optional[str]=None) -> dict[str, Snapshot]:
+        '''
+        Fetches the snapshots as a dictionary from the (usually abbreviated) revisions they were built from to snapshots.
+        If the oldest commit of interest is given, older snapshots may be omitted.
+        '''
         raise NotImplementedError()
+
+@traced('git')
+def resolve_snapshots(snapshots: dict[str, Snapshot], opts: Options) -> tuple[dict[str, Snapshot], list[str]]:
+    '''Matches up the given snapshots with the local clone, returning the snapshots by full commit SHA and the revisions that are missing locally.'''
+    revs = list(snapshots.keys())
+    resolved: dict[str, Snapshot] = {}
+    unresolved: list[str] = []
+    for rev, commit in zip(revs, try_parse_commits(revs, opts)):
+        if commit:
+            resolved[commit] = snapshots[rev]
+        else:
+            unresolved.append(rev)
+    return resolved, unresolved
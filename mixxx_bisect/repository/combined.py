@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from typing import Iterator, Optional, TextIO
+
+from mixxx_bisect.error import MixxxBisectError, UnsupportedArchError, UnsupportedOSError
+from mixxx_bisect.repository import Snapshot, SnapshotRepository
+from mixxx_bisect.options import Options
+from mixxx_bisect.registry import SNAPSHOT_REPOSITORIES, load_class
+from mixxx_bisect.utils.trace import traced
+
+import io
+import sys
+import threading
+
+# The repositories to combine, most preferred first, i.e. the official snapshots are used wherever they exist
+COMBINED_REPOSITORIES = ['mixxx-org', 'm1xxx']
+
+# Revisions are abbreviated differently by each repository, but never shorter than this
+MIN_REV_LENGTH = 7
+
+class _CollectedOutput(io.TextIOBase):
+    '''Stands in for stdout, collecting what some threads print separately and passing through what the others print.'''
+
+    def __init__(self, stdout: TextIO):
+        self.stdout = stdout
+        self.buffers: dict[int, io.StringIO] = {}
+
+    @contextmanager
+    def collect(self, buffer: io.StringIO) -> Iterator[None]:
+        '''Collects what the current thread prints into the given buffer.'''
+        self.buffers[threading.get_ident()] = buffer
+        try:
+            yield
+        finally:
+            del self.buffers[threading.get_ident()]
+
+    def write(self, s: str) -> int:
+        return self.buffers.get(threading.get_ident(), self.stdout).write(s)
+
+    def flush(self):
+        self.stdout.flush()
+
+class CombinedSnapshotRepository(SnapshotRepository):
+    '''The snapshots of all repositories supporting the platform, which are queried concurrently and merged.'''
+
+    def __init__(self, branch: str, suffix: str, opts: Options):
+        self.repositories: list[tuple[str, SnapshotRepository]] = []
+        errors: list[MixxxBisectError] = []
+        for name in COMBINED_REPOSITORIES:
+            try:
+                repository_class = load_class(SNAPSHOT_REPOSITORIES[name])
+                self.repositories.append((name, repository_class(branch=branch, suffix=suffix, opts=opts)))
+            except (UnsupportedArchError, UnsupportedOSError) as e:
+                errors.append(e)
+
+        if not self.repositories:
+            raise errors[0]
+
+    @traced('discovery')
+    def fetch_snapshots(self, oldest: Optional[str]=None) -> dict[str, Snapshot]:
+        print(f"==> Combining snapshots from {', '.join(name for name, _ in self.repositories)}...")
+        outputs = {name: io.StringIO() for name, _ in self.repositories}
+        output = _CollectedOutput(sys.stdout)
+
+        def fetch(name: str, repository: SnapshotRepository) -> dict[str, Snapshot]:
+            with output.collect(outputs[name]):
+                return repository.fetch_snapshots(oldest)
+
+        # Discovery mostly waits for the network, so querying concurrently takes about as long as the slowest repository
+        with redirect_stdout(output), ThreadPoolExecutor(max_workers=len(self.repositories)) as executor:
+            futures = [(name, executor.submit(fetch, name, repository)) for name, repository in self.repositories]
+            results: list[tuple[str, dict[str, Snapshot]]] = []
+            failures: list[tuple[str, Exception]] = []
+            for name, future in futures:
+                try:
+                    results.append((name, future.result()))
+                except Exception as e:
+                    failures.append((name, e))
+                # Each repository's output is printed in one piece once it is done, rather than interleaved with the others'
+                print(outputs[name].getvalue(), end='')
+
+        # The other repositories may still cover enough to search, so failing ones are only fatal if all fail
+        if not results:
+            raise failures[0][1]
+        for name, e in failures:
+            print(f'Skipping {name}, fetching its snapshots failed: {e}')
+
+        merged: dict[str, Snapshot] = {}
+        revs_by_prefix: dict[str, list[str]] = {}
+        for _, snapshots in results:
+            for rev, snapshot in snapshots.items():
+                # The same commit may be abbreviated differently, in which case the more preferred repository's snapshot wins
+                prefix = rev[:MIN_REV_LENGTH]
+                known_revs = revs_by_prefix.setdefault(prefix, [])
+                if any(rev.startswith(known) or known.startswith(rev) for known in known_revs):
+                    continue
+                known_revs.append(rev)
+                merged[rev] = snapshot
+
+        counts = ', '.join(f'{len(snapshots)} from {name}' for name, snapshots in results)
+        print(f'{len(merged)} combined snapshots ({counts}).')
+        return merged
@@ -1,14 +1,26 @@
-from typing import Optional, cast
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Generator, Optional, cast
+from urllib.parse import parse_qs, urlparse
 from mixxx_bisect.error import UnsupportedArchError, UnsupportedOSError
 
-from mixxx_bisect.repository import SnapshotRepository
+from mixxx_bisect.repository import Snapshot, SnapshotRepository
 from mixxx_bisect.options import Options
-from mixxx_bisect.utils.git import try_parse_commit
+from mixxx_bisect.utils.git import show_commit
+from mixxx_bisect.utils.index import SnapshotIndex, index_name
 from mixxx_bisect.utils.request import get
+from mixxx_bisect.utils.trace import traced
 
 import re
+import requests
+import subprocess
 
 RELEASES_API_URL = 'https://api.github.com/repos/fwcd/m1xxx/releases'
+MAX_PAGES = 100
+PAGE_WORKERS = 8
+BOUNDED_LOOKAHEAD = 2
 
 class M1xxxSnapshotRepository(SnapshotRepository):
     def __init__(self, branch: str, suffix: str, opts: Options):
@@ -32,7 +44,9 @@ class M1xxxSnapshotRepository(SnapshotRepository):
 
         if os is None:
             raise UnsupportedOSError(f'The os {opts.os} is not supported by the m1xxx repository.')
-        
+
+        self.index = SnapshotIndex(opts.index_dir / f"{index_name('m1xxx', os, arch)}.json")
+
         # TODO: Should we use the 'debugasserts' variant? Perhaps as an optional flag?
         base_triplet_pattern = re.escape(arch) + r'-' + re.escape(os) + r'(?:-min\d+)?(?:-release)?'
 
@@ -45,28 +59,142 @@ class M1xxxSnapshotRepository(SnapshotRepository):
             *([re.compile(r'^mixxx-[\d\.]+\.c\d+\.r(\w+)$')] if arch == 'arm64' else []),
         ]
     
-    def fetch_snapshots(self) -> dict[str, str]:
+    @traced('discovery')
+    def fetch_snapshots(self, oldest: Optional[str]=None) -> dict[str, Snapshot]:
         print(f'==> Fetching snapshots from {RELEASES_API_URL}...')
-        # TODO: Proper paging over more than the latest 100 snapshots
-        releases = []
-        page = 1
-        while (results := get(f'{RELEASES_API_URL}?per_page=100&page={page}', json=True).json()) and page <= 100 and isinstance(results, list):
-            print(f'Fetching page {page}...')
-            releases += results
-            page += 1
-        urls = [
-            asset['browser_download_url']
-            for release in releases
-            for asset in release.get('assets', [])
-            if cast(str, asset['name']).endswith(self.suffix)
-        ]
-        commits = [self._parse_commit_from_name(url.split('/')[-1], self.suffix) for url in urls]
-        parsed_commits = [try_parse_commit(commit, self.opts) if commit else None for commit in commits]
-        return {
-            commit: url
-            for commit, url in zip(parsed_commits, urls)
-            if commit and url.endswith(self.suffix)
-        }
+        # Releases are built after the commit they are built from, so nothing created before it can be needed
+        since = self._commit_time(oldest) if oldest else None
+        # Only the first page is requested conditionally, if nothing changed there, nothing changed at all
+        first_response = self._fetch_page(1, headers=self.index.conditional_headers())
+        if first_response.status_code == 304:
+            if self.index.covers(since):
+                print('Snapshot index is up to date.')
+                return dict(self.index.snapshots)
+            # Nothing changed, but the index doesn't reach back far enough, so we need the page itself
+            first_response = self._fetch_page(1)
+        self.index.update_validators(first_response)
+        self._refresh(first_response, oldest, since)
+        self.index.save()
+
+        return dict(self.index.snapshots)
+
+    def _refresh(self, first_response: requests.Response, oldest: Optional[str], since: Optional[float]):
+        was_covered = self.index.covers(since)
+        # Merge in page order, so the newest release wins if there are multiple for the same commit
+        snapshots: dict[str, Snapshot] = {}
+        # The creation time of the oldest release seen, everything newer has been seen too
+        walked_since: Optional[float] = None
+        # A covering index usually only lacks the first page or so and a bounded walk stops somewhere in the middle,
+        # pages read ahead past that point just waste rate limit
+        lookahead = 0 if was_covered else BOUNDED_LOOKAHEAD if oldest else PAGE_WORKERS
+        with closing(self._pages(first_response, lookahead)) as pages:
+            for releases in pages:
+                page_snapshots = self._parse_snapshots(releases)
+                for rev, snapshot in page_snapshots.items():
+                    snapshots.setdefault(rev, snapshot)
+                walked_since = min((t for t in map(self._release_time, releases) if t is not None), default=walked_since)
+                if was_covered:
+                    # Releases are ordered newest-first, so a page without new snapshots (where the index has them all) means we are caught up
+                    if all(rev in self.index.snapshots for rev in self._parse_snapshots(self._covered(releases))):
+                        # The pages walked overlap with the covered range, which therefore extends to them
+                        if self.index.covered_since is not None and walked_since is not None:
+                            self.index.covered_since = min(self.index.covered_since, walked_since)
+                        break
+                # Otherwise we only page back as far as the oldest needed snapshot (e.g. the good one's)
+                elif self._reaches(page_snapshots, walked_since, oldest, since):
+                    print('Found the oldest needed snapshot, skipping older releases.')
+                    self.index.covered_since = walked_since
+                    break
+            else:
+                # We have seen every release, so the index can be replaced entirely
+                self.index.snapshots = snapshots
+                self.index.complete = True
+                return
+        for rev, snapshot in snapshots.items():
+            self.index.snapshots.setdefault(rev, snapshot)
+
+    def _covered(self, releases: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        '''The given releases within the range covered by the index, i.e. the ones whose snapshots it should have.'''
+        covered_since = self.index.covered_since
+        if self.index.complete or covered_since is None:
+            return releases
+        return [release for release in releases if (self._release_time(release) or covered_since) >= covered_since]
+
+    def _reaches(self, page_snapshots: dict[str, Snapshot], walked_since: Optional[float], oldest: Optional[str], since: Optional[float]) -> bool:
+        '''Whether the walk has reached back to the oldest needed commit, i.e. older pages can be skipped.'''
+        if since is not None and walked_since is not None:
+            return walked_since < since
+        # Without times to compare (e.g. if the release dates are missing), only finding the snapshot itself tells
+        return oldest is not None and any(oldest.startswith(rev) for rev in page_snapshots)
+
+    def _commit_time(self, commit: str) -> Optional[float]:
+        try:
+            return float(show_commit(commit, '%ct', self.opts))
+        except (subprocess.CalledProcessError, ValueError):
+            return None
+
+    def _release_time(self, release: dict[str, Any]) -> Optional[float]:
+        created_at = release.get('created_at')
+        if not isinstance(created_at, str):
+            return None
+        try:
+            # Python < 3.11 doesn't parse the Z suffix GitHub uses
+            return datetime.fromisoformat(created_at.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+
+    def _pages(self, first_response: requests.Response, lookahead: int) -> Generator[list[dict[str, Any]], None, None]:
+        '''Yields the releases page by page (newest first), fetching up to `lookahead` pages ahead concurrently.'''
+        last_page = self._last_page(first_response)
+        print(f'Fetching page 1/{last_page}...')
+        yield self._page_results(first_response)
+        with ThreadPoolExecutor(max_workers=max(1, lookahead)) as executor:
+            pending: deque[tuple[int, Future[requests.Response]]] = deque()
+            next_page = 2
+            try:
+                while next_page <= last_page or pending:
+                    while next_page <= last_page and len(pending) <= lookahead:
+                        pending.append((next_page, executor.submit(self._fetch_page, next_page)))
+                        next_page += 1
+                    page, future = pending.popleft()
+                    print(f'Fetching page {page}/{last_page}...')
+                    yield self._page_results(future.result())
+            finally:
+                # If the consumer stops early, don't bother waiting for pages it won't look at
+                for _, future in pending:
+                    future.cancel()
+
+    def _fetch_page(self, page: int, headers: Optional[dict[str, str]]=None) -> requests.Response:
+        return get(f'{RELEASES_API_URL}?per_page=100&page={page}', headers={'Accept': 'application/vnd.github+json', **(headers or {})})
+
+    def _page_results(self, response: requests.Response) -> list[dict[str, Any]]:
+        results = response.json()
+        return results if isinstance(results, list) else []
+
+    def _last_page(self, response: requests.Response) -> int:
+        '''Parses the number of the last page from the Link header, see https://docs.github.com/en/rest/using-the-rest-api/using-pagination-in-the-rest-api'''
+        last_url = response.links.get('last', {}).get('url')
+        if not last_url:
+            return 1
+        pages = parse_qs(urlparse(last_url).query).get('page', [])
+        return min(int(pages[0]), MAX_PAGES) if pages and pages[0].isdigit() else 1
+
+    def _parse_snapshots(self, releases: list[dict[str, Any]]) -> dict[str, Snapshot]:
+        snapshots: dict[str, Snapshot] = {}
+        for release in releases:
+            for asset in release.get('assets', []):
+                name = cast(str, asset['name'])
+                if not name.endswith(self.suffix):
+                    continue
+                rev = self._parse_commit_from_name(name, self.suffix)
+                if rev and rev not in snapshots:
+                    snapshots[rev] = Snapshot(
+                        url=asset['browser_download_url'],
+                        name=name,
+                        size=asset.get('size'),
+                        digest=asset.get('digest'),
+                    )
+        return snapshots
 
     def _parse_commit_from_name(self, name: str, suffix: str) -> Optional[str]:
         name = name.removesuffix(suffix)
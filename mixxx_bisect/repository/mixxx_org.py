@@ -1,10 +1,12 @@
-from typing import Optional, cast
-from mixxx_bisect.error import UnsupportedArchError
+from typing import Optional
+from mixxx_bisect.error import UnsupportedArchError, UnsupportedOSError
 
-from mixxx_bisect.repository import SnapshotRepository
+from mixxx_bisect.repository import Snapshot, SnapshotRepository
 from mixxx_bisect.options import Options
-from mixxx_bisect.utils.git import try_parse_commit
-from mixxx_bisect.utils.request import get_soup
+from mixxx_bisect.utils.index import SnapshotIndex, index_name
+from mixxx_bisect.utils.links import iter_links
+from mixxx_bisect.utils.request import CHUNK_SIZE, get
+from mixxx_bisect.utils.trace import traced
 
 import re
 
@@ -17,6 +19,9 @@ class MixxxOrgSnapshotRepository(SnapshotRepository):
         self.suffix = suffix
         self.opts = opts
 
+        if opts.os not in ('Darwin', 'Windows'):
+            raise UnsupportedOSError(f'The os {opts.os} is not supported by the mixxx.org repository.')
+
         arch = {
             'arm64': 'arm',
             'aarch64': 'arm',
@@ -27,6 +32,8 @@ class MixxxOrgSnapshotRepository(SnapshotRepository):
         if arch is None:
             raise UnsupportedArchError(f'The architecture {opts.arch} is not supported by the mixxx.org repository.')
 
+        self.index = SnapshotIndex(opts.index_dir / f"{index_name('mixxx-org', branch, arch)}.json")
+
         self.snapshot_name_patterns = [
             # New pattern, e.g. mixxx-2.4-alpha-6370-g44f29763ed-macosintel
             re.compile(r'^mixxx-[\d\.]+(?:-[a-z]+)?-\d+-g(\w+)-macos' + re.escape(arch) + r'$'),
@@ -34,17 +41,29 @@ class MixxxOrgSnapshotRepository(SnapshotRepository):
             *([re.compile(r'^mixxx-[\w\.]+-r\d+-(\w+)$')] if arch == 'intel' else []),
         ]
     
-    def fetch_snapshots(self) -> dict[str, str]:
+    @traced('discovery')
+    def fetch_snapshots(self, oldest: Optional[str]=None) -> dict[str, Snapshot]:
+        # The listing is a single document, so there is nothing to gain from stopping at the oldest snapshot
         print(f'==> Fetching snapshots from {self.snapshots_url}...')
-        snapshot_soup = get_soup(self.snapshots_url)
-        links = [cast(str, a.get('href')) for a in snapshot_soup.select('a')]
-        commits = [self._parse_commit_from_name(link.split('/')[-1], self.suffix) for link in links]
-        parsed_commits = [try_parse_commit(commit, self.opts) if commit else None for commit in commits]
-        return {
-            commit: f'{self.snapshots_url}/{link}'
-            for commit, link in zip(parsed_commits, links)
-            if commit and link.endswith(self.suffix)
-        }
+        response = get(self.snapshots_url, headers=self.index.conditional_headers(), stream=True)
+        if response.status_code == 304:
+            print('Snapshot index is up to date.')
+        else:
+            snapshots: dict[str, Snapshot] = {}
+            # The listing spans years of snapshots, so we extract the links while it arrives rather than parsing it as a whole
+            with response:
+                for link in iter_links(response.iter_content(CHUNK_SIZE)):
+                    name = link.split('/')[-1]
+                    rev = self._parse_commit_from_name(name, self.suffix)
+                    if rev and link.endswith(self.suffix):
+                        snapshots[rev] = Snapshot(url=f'{self.snapshots_url}/{link}', name=name)
+            # The listing is always complete, so it replaces the index entirely
+            self.index.snapshots = snapshots
+            self.index.complete = True
+            self.index.update_validators(response)
+            self.index.save()
+
+        return dict(self.index.snapshots)
 
     def _parse_commit_from_name(self, name: str, suffix: str) -> Optional[str]:
         name = name.removesuffix(suffix)
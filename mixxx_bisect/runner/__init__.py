@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Protocol
+from typing import BinaryIO, Optional, Protocol
 
 from mixxx_bisect.options import Options
 
@@ -14,19 +14,40 @@ class SnapshotRunner(Protocol):
         '''The file extension for the downloaded artifact.'''
         raise NotImplementedError()
 
+
     @property
-    def download_path(self) -> Path:
-        '''The path to download to.'''
+    def supports_streaming(self) -> bool:
+        '''Whether the runner can set up snapshots while they are being downloaded.'''
+        return False
+
+    def install_dir(self, commit: str) -> Path:
+        '''The directory the snapshot for the given commit is extracted or mounted to, isolated from other snapshots.'''
         raise NotImplementedError()
 
-    def setup_snapshot(self) -> None:
-        '''Extracts or mounts the snapshot.'''
+    def is_installed(self, commit: str) -> bool:
+        '''Whether the snapshot for the given commit is already set up, i.e. needs no download.'''
+        return False
+
+    def setup_snapshot(self, commit: str, archive: Path) -> None:
+        '''Extracts or mounts the snapshot from the given downloaded archive.'''
         raise NotImplementedError()
     
-    def run_snapshot(self) -> None:
-        '''Runs the snapshot.'''
+    def stream_snapshot(self, commit: str, stream: BinaryIO) -> None:
+        '''Extracts the snapshot from a stream, only supported if supports_streaming is set.'''
+        raise NotImplementedError()
+
+    def executable_path(self, commit: str) -> Path:
+        '''The path to the Mixxx executable of the set up snapshot.'''
+        raise NotImplementedError()
+
+    def snapshot_command(self, commit: str) -> list[str]:
+        '''The command line launching the set up snapshot (with the configured Mixxx arguments).'''
+        raise NotImplementedError()
+
+    def run_snapshot(self, commit: str, timeout: Optional[float]=None) -> int:
+        '''Runs the snapshot and returns its exit code. Raises subprocess.TimeoutExpired if the timeout elapses.'''
         raise NotImplementedError()
     
-    def cleanup_snapshot(self) -> None:
+    def cleanup_snapshot(self, commit: str) -> None:
         '''Cleans up the snapshot.'''
         raise NotImplementedError()
@@ -1,13 +1,18 @@
 from pathlib import Path
+from typing import BinaryIO, Optional
 
 from mixxx_bisect.options import Options
 from mixxx_bisect.runner import SnapshotRunner
+from mixxx_bisect.utils.install import COMPLETE_MARKER, InstallCache
 from mixxx_bisect.utils.run import run
+from mixxx_bisect.utils.trace import traced
 
 import shutil
+import tarfile
 
 class LinuxSnapshotRunner(SnapshotRunner):
     def __init__(self, opts: Options):
+        self.installs = InstallCache(opts.installs_dir, opts.max_installs)
         self.opts = opts
     
     @property
@@ -15,24 +20,46 @@ class LinuxSnapshotRunner(SnapshotRunner):
         return '.tar.gz'
 
     @property
-    def download_path(self) -> Path:
-        return self.opts.downloads_dir / f'mixxx-current{self.suffix}'
+    def supports_streaming(self) -> bool:
+        return True
 
-    def setup_snapshot(self):
+    def install_dir(self, commit: str) -> Path:
+        return self.installs.path(commit)
+
+    def is_installed(self, commit: str) -> bool:
+        return self.installs.lookup(commit) is not None
+
+    @traced('runner')
+    def setup_snapshot(self, commit: str, archive: Path):
+        if self.is_installed(commit):
+            return
         print('Extracting snapshot...')
-        shutil.unpack_archive(self.download_path, self.opts.installs_dir)
+        self.installs.install(commit, lambda dir: shutil.unpack_archive(archive, dir))
 
-    def run_snapshot(self):
-        print('Running snapshot...')
-        child_dirs = list(self.opts.installs_dir.iterdir())
+    @traced('runner')
+    def stream_snapshot(self, commit: str, stream: BinaryIO):
+        def extract(dir: Path):
+            # Stream mode reads the archive strictly sequentially, i.e. without seeking
+            with tarfile.open(fileobj=stream, mode='r|gz') as tar:
+                tar.extractall(dir)
+
+        print('Extracting snapshot while downloading...')
+        self.installs.install(commit, extract)
+
+    def executable_path(self, commit: str) -> Path:
+        child_dirs = [path for path in self.install_dir(commit).iterdir() if path.name != COMPLETE_MARKER]
         assert len(child_dirs) == 1, 'Mixxx should be extracted to exactly one folder'
-        mixxx_dir = child_dirs[0]
-        run([str(mixxx_dir / 'bin' / 'mixxx'), *self.opts.mixxx_args], opts=self.opts)
+        return child_dirs[0] / 'bin' / 'mixxx'
+
+    def snapshot_command(self, commit: str) -> list[str]:
+        return [str(self.executable_path(commit)), *self.opts.mixxx_args]
+
+    @traced('runner')
+    def run_snapshot(self, commit: str, timeout: Optional[float]=None) -> int:
+        print('Running snapshot...')
+        return run(self.snapshot_command(commit), opts=self.opts, timeout=timeout)
     
-    def cleanup_snapshot(self):
+    @traced('runner')
+    def cleanup_snapshot(self, commit: str):
         print('Cleaning up snapshot...')
-        for path in self.opts.installs_dir.iterdir():
-            if path.is_file():
-                path.unlink()
-            else:
-                shutil.rmtree(path)
+        self.installs.evict(keep=frozenset({commit}))
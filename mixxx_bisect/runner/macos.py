@@ -1,49 +1,64 @@
 from pathlib import Path
+from typing import Optional
 
 from mixxx_bisect.runner import SnapshotRunner
 from mixxx_bisect.options import Options
 from mixxx_bisect.utils.run import run
+from mixxx_bisect.utils.trace import traced
 
 class MacOSSnapshotRunner(SnapshotRunner):
     def __init__(self, opts: Options):
-        self.mount_dir = opts.installs_dir / 'mnt'
+        self.mounts_dir = opts.installs_dir / 'mnt'
         self.opts = opts
 
     @property
     def suffix(self) -> str:
         return '.dmg'
-    
-    @property
-    def download_path(self) -> Path:
-        return self.opts.downloads_dir / f'mixxx-current{self.suffix}'
-    
-    @property
-    def cdr_path(self) -> Path:
-        return self.download_path.with_suffix('.cdr')
 
-    def _mount_snapshot(self):
+    def install_dir(self, commit: str) -> Path:
+        return self.mounts_dir / commit
+
+    def _cdr_path(self, commit: str) -> Path:
+        return self.mounts_dir / f'{commit}.cdr'
+
+    def _mount_snapshot(self, commit: str, archive: Path):
         print('Mounting snapshot...')
-        self.mount_dir.mkdir(parents=True, exist_ok=True)
-        self.cdr_path.unlink(missing_ok=True)
-        run(['hdiutil', 'convert', str(self.download_path), '-format', 'UDTO', '-o', str(self.cdr_path)], opts=self.opts)
-        run(['hdiutil', 'attach', str(self.cdr_path), '-mountpoint', str(self.mount_dir)], opts=self.opts)
+        mount_dir = self.install_dir(commit)
+        cdr_path = self._cdr_path(commit)
+        mount_dir.mkdir(parents=True, exist_ok=True)
+        cdr_path.unlink(missing_ok=True)
+        run(['hdiutil', 'convert', str(archive), '-format', 'UDTO', '-o', str(cdr_path)], opts=self.opts)
+        run(['hdiutil', 'attach', str(cdr_path), '-mountpoint', str(mount_dir)], opts=self.opts)
 
-    def _unmount_snapshot(self):
+    def _unmount_snapshot(self, commit: str):
         print('Unmounting snapshot...')
-        run(['hdiutil', 'unmount', str(self.mount_dir)], cwd=self.mount_dir.parent, opts=self.opts)
+        run(['hdiutil', 'unmount', str(self.install_dir(commit))], cwd=self.mounts_dir, opts=self.opts)
 
-    def _delete_snapshot(self):
+    def _delete_snapshot(self, commit: str):
         print('Deleting snapshot...')
-        self.download_path.unlink(missing_ok=True)
-        self.cdr_path.unlink(missing_ok=True)
+        self._cdr_path(commit).unlink(missing_ok=True)
+        try:
+            self.install_dir(commit).rmdir()
+        except OSError:
+            # The mount point may still be in use
+            pass
+
+    @traced('runner')
+    def setup_snapshot(self, commit: str, archive: Path):
+        self._mount_snapshot(commit, archive)
+
+    def executable_path(self, commit: str) -> Path:
+        return self.install_dir(commit) / 'mixxx.app' / 'Contents' / 'MacOS' / 'mixxx'
 
-    def setup_snapshot(self):
-        self._mount_snapshot()
+    def snapshot_command(self, commit: str) -> list[str]:
+        return [str(self.executable_path(commit)), *self.opts.mixxx_args]
 
-    def run_snapshot(self):
+    @traced('runner')
+    def run_snapshot(self, commit: str, timeout: Optional[float]=None) -> int:
         print('Running snapshot...')
-        run([str(self.mount_dir / 'mixxx.app' / 'Contents' / 'MacOS' / 'mixxx'), *self.opts.mixxx_args], opts=self.opts)
+        return run(self.snapshot_command(commit), opts=self.opts, timeout=timeout)
     
-    def cleanup_snapshot(self):
-        self._unmount_snapshot()
-        self._delete_snapshot()
+    @traced('runner')
+    def cleanup_snapshot(self, commit: str):
+        self._unmount_snapshot(commit)
+        self._delete_snapshot(commit)
@@ -1,42 +1,61 @@
 from pathlib import Path
+from typing import Optional
 
+from mixxx_bisect.error import SnapshotSetupError
 from mixxx_bisect.options import Options
 from mixxx_bisect.runner import SnapshotRunner
+from mixxx_bisect.utils.install import InstallCache
 from mixxx_bisect.utils.run import run
-
-import shutil
+from mixxx_bisect.utils.trace import traced
 
 class WindowsSnapshotRunner(SnapshotRunner):
     def __init__(self, opts: Options):
-        self.install_dir = opts.installs_dir / 'Mixxx'
+        self.installs = InstallCache(opts.installs_dir, opts.max_installs)
         self.opts = opts
     
     @property
     def suffix(self) -> str:
         return '.msi'
 
-    @property
-    def download_path(self) -> Path:
-        return self.opts.downloads_dir / f'mixxx-current{self.suffix}'
+    def install_dir(self, commit: str) -> Path:
+        return self.installs.path(commit)
 
-    def setup_snapshot(self):
+    def is_installed(self, commit: str) -> bool:
+        return self.installs.lookup(commit) is not None
+
+    @traced('runner')
+    def setup_snapshot(self, commit: str, archive: Path):
+        if self.is_installed(commit):
+            return
         print('Extracting snapshot...')
-        run([
-            'msiexec',
-            '/a', str(self.download_path),           # Install the msi
-            '/q',                                    # Install quietly i.e. without GUI
-            f'TARGETDIR={self.opts.installs_dir}',                # Install to custom target dir
-            '/li', str(self.opts.log_dir / 'msi-install.log'), # Log installation to file
-        ], opts=self.opts)
-
-    def run_snapshot(self):
+        log_path = self.opts.log_dir / f'msi-install-{commit[:10]}.log'
+
+        def extract(dir: Path):
+            code = run([
+                'msiexec',
+                '/a', str(archive),                      # Install the msi
+                '/q',                                    # Install quietly i.e. without GUI
+                f'TARGETDIR={dir}',                      # Install to custom target dir
+                '/li', str(log_path),                    # Log installation to file
+            ], opts=self.opts)
+            # Raising keeps the install from being marked as complete and thereby reused
+            if code != 0:
+                raise SnapshotSetupError(f'msiexec exited with code {code} (see {log_path})')
+
+        self.installs.install(commit, extract)
+
+    def executable_path(self, commit: str) -> Path:
+        return self.install_dir(commit) / 'Mixxx' / 'mixxx.exe'
+
+    def snapshot_command(self, commit: str) -> list[str]:
+        return [str(self.executable_path(commit)), *self.opts.mixxx_args]
+
+    @traced('runner')
+    def run_snapshot(self, commit: str, timeout: Optional[float]=None) -> int:
         print('Running snapshot...')
-        run([str(self.install_dir / 'mixxx.exe'), *self.opts.mixxx_args], opts=self.opts)
+        return run(self.snapshot_command(commit), opts=self.opts, timeout=timeout)
 
-    def cleanup_snapshot(self):
+    @traced('runner')
+    def cleanup_snapshot(self, commit: str):
         print('Cleaning up snapshot...')
-        for path in self.opts.installs_dir.iterdir():
-            if path.is_file():
-                path.unlink()
-            else:
-                shutil.rmtree(path)
+        self.installs.evict(keep=frozenset({commit}))
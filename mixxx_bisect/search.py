@@ -0,0 +1,42 @@
+from typing import AbstractSet, Optional, Sequence
+
+def _weight(idx: int, weights: Optional[Sequence[int]]) -> int:
+    return weights[idx] if weights else idx
+
+def midpoint(good_idx: int, bad_idx: int, skipped: AbstractSet[int]=frozenset(), weights: Optional[Sequence[int]]=None) -> Optional[int]:
+    '''
+    The index to check next when searching the given range, avoiding skipped indices. None if there is nothing left to check.
+    Weights (e.g. commit counts) can be given per index to balance the range by those rather than by the number of indices.
+    '''
+    center = (_weight(good_idx, weights) + _weight(bad_idx, weights)) / 2
+    candidates = (idx for idx in range(good_idx + 1, bad_idx) if idx not in skipped)
+    return min(candidates, key=lambda idx: (abs(_weight(idx, weights) - center), idx), default=None)
+
+def speculative_midpoints(good_idx: int, mid_idx: int, bad_idx: int, depth: int, skipped: AbstractSet[int]=frozenset(), weights: Optional[Sequence[int]]=None) -> list[int]:
+    '''The indices that may be checked in the next `depth` rounds after `mid_idx`, nearest rounds first.'''
+    indices = []
+    ranges = [(good_idx, mid_idx), (mid_idx, bad_idx)]
+    for _ in range(depth):
+        next_ranges = []
+        for lower, upper in ranges:
+            idx = midpoint(lower, upper, skipped, weights)
+            if idx is not None:
+                indices.append(idx)
+                next_ranges += [(lower, idx), (idx, upper)]
+        ranges = next_ranges
+    return indices
+
+def split_points(good_idx: int, bad_idx: int, count: int, skipped: AbstractSet[int]=frozenset(), weights: Optional[Sequence[int]]=None) -> list[int]:
+    '''Up to `count` distinct indices splitting the given range into roughly equal parts, avoiding skipped indices.'''
+    available = {idx for idx in range(good_idx + 1, bad_idx) if idx not in skipped}
+    lower = _weight(good_idx, weights)
+    upper = _weight(bad_idx, weights)
+    points: list[int] = []
+    for i in range(1, count + 1):
+        if not available:
+            break
+        target = lower + (upper - lower) * i / (count + 1)
+        idx = min(available, key=lambda idx: (abs(_weight(idx, weights) - target), idx))
+        available.remove(idx)
+        points.append(idx)
+    return sorted(points)
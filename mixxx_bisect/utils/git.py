@@ -1,23 +1,98 @@
-from typing import Optional
+from dataclasses import astuple, dataclass
+from typing import Iterable, Optional, Sequence
 
 from mixxx_bisect.options import Options
 from mixxx_bisect.utils.run import run, run_with_output
+from mixxx_bisect.utils.trace import traced
 
+import json
+import math
 import subprocess
+import time
 
-def clone_mixxx(opts: Options):
+MIXXX_REMOTE = 'https://github.com/mixxxdj/mixxx.git'
+
+# Touched after every successful clone or fetch, inside the clone
+LAST_FETCH_STAMP = 'mixxx-bisect-last-fetch'
+
+@traced('git')
+def clone_mixxx(opts: Options) -> bool:
+    '''Clones Mixxx unless there is a clone already. Returns whether a new clone was made.'''
     if opts.mixxx_dir.exists():
-        print('==> Fetching Mixxx...')
-        run(['git', 'fetch', 'origin'], opts=opts, cwd=opts.mixxx_dir)
-    else:
-        print('==> Cloning Mixxx...')
-        run(['git', 'clone', '--bare', 'https://github.com/mixxxdj/mixxx.git', str(opts.mixxx_dir)], opts=opts)
+        return False
+    print('==> Cloning Mixxx...')
+    # Only commits are needed for ordering and describing them, so a treeless clone avoids fetching almost all of the history
+    filter_args = [f'--filter={opts.clone_filter}'] if opts.clone_filter else []
+    if run(['git', 'clone', '--bare', *filter_args, opts.mixxx_remote, str(opts.mixxx_dir)], opts=opts) == 0:
+        # A commit-graph speeds up the topological walks used for ordering commits considerably
+        run(['git', 'commit-graph', 'write', '--reachable'], opts=opts, cwd=opts.mixxx_dir)
+        (opts.mixxx_dir / LAST_FETCH_STAMP).touch()
+    return True
+
+@traced('git')
+def fetch_mixxx(opts: Options):
+    print('==> Fetching Mixxx...')
+    run(['git', 'remote', 'set-url', 'origin', opts.mixxx_remote], opts=opts, cwd=opts.mixxx_dir)
+    # Bare clones have no fetch refspec, so we specify it explicitly to keep the branches up to date
+    if run(['git', '-c', 'fetch.writeCommitGraph=true', 'fetch', 'origin', '+refs/heads/*:refs/heads/*'], opts=opts, cwd=opts.mixxx_dir) == 0:
+        (opts.mixxx_dir / LAST_FETCH_STAMP).touch()
+
+def last_fetch_age(opts: Options) -> float:
+    '''The number of seconds since Mixxx was last cloned or fetched (infinite if unknown).'''
+    try:
+        return time.time() - (opts.mixxx_dir / LAST_FETCH_STAMP).stat().st_mtime
+    except OSError:
+        return math.inf
+
+class CommitOrder:
+    '''
+    The topological order of a set of commits, computed in a single walk of their history,
+    after which order queries are constant-time lookups.
+    '''
+
+    @traced('git')
+    def __init__(self, commits: Iterable[str], opts: Options):
+        wanted = set(commits)
+        # Full SHAs are passed via stdin, since the command line is limited (especially on Windows) and abbreviations may become ambiguous
+        process = subprocess.Popen(
+            ['git', 'rev-list', '--topo-order', '--stdin'],
+            cwd=opts.mixxx_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding='utf8',
+        )
+        assert process.stdin and process.stdout
+        process.stdin.write(''.join(f'{commit}\n' for commit in wanted))
+        process.stdin.close()
+        # The walk goes from newest to oldest, so we can stop as soon as the oldest of our commits turned up
+        walked: list[str] = []
+        missing = set(wanted)
+        for line in process.stdout:
+            commit = line.rstrip('\n')
+            walked.append(commit)
+            missing.discard(commit)
+            if not missing:
+                break
+        process.kill()
+        process.wait()
+        # Positions grow from old to new and differ by the number of commits in between
+        self.positions = {commit: len(walked) - 1 - i for i, commit in enumerate(walked)}
+
+    def __contains__(self, commit: str) -> bool:
+        return commit in self.positions
+
+    def position(self, commit: str) -> int:
+        return self.positions[commit]
+
+    def sort(self, commits: Iterable[str]) -> list[str]:
+        '''Sorts the given commits oldest first, dropping the ones not known to this order.'''
+        return sorted((commit for commit in commits if commit in self.positions), key=self.positions.__getitem__)
+
+    def precedes(self, commit: str, other: str) -> bool:
+        return self.positions[commit] < self.positions[other]
 
 def sort_commits(commits: list[str], opts: Options) -> list[str]:
-    # Windows doesn't like passing too many (long) args, so we truncate commit hashes to 8 chars
-    commits = [commit[:8] for commit in commits]
-    lines = run_with_output(['git', 'rev-list', '--no-walk'] + commits, cwd=opts.mixxx_dir, opts=opts)
-    return lines[::-1]
+    return CommitOrder(commits, opts).sort(commits)
 
 def parse_commit(rev: str, opts: Options) -> str:
     lines = run_with_output(['git', 'rev-parse', rev], cwd=opts.mixxx_dir, opts=opts)
@@ -29,13 +104,106 @@ def try_parse_commit(rev: str, opts: Options) -> Optional[str]:
     except subprocess.CalledProcessError:
         return None
 
+class CommitResolver:
+    '''Resolves revisions to full commit SHAs through a single long-lived `git cat-file` process.'''
+
+    def __init__(self, opts: Options):
+        self.process = subprocess.Popen(
+            ['git', 'cat-file', '--batch-check=%(objectname) %(objecttype)'],
+            cwd=opts.mixxx_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding='utf8',
+        )
+        self.resolved: dict[str, Optional[str]] = {}
+
+    def __enter__(self) -> 'CommitResolver':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def resolve(self, rev: str) -> Optional[str]:
+        '''Resolves the given revision to a full commit SHA or returns None if it is missing or ambiguous.'''
+        # The batch protocol is line-based, so anything containing whitespace could never be resolved
+        if not rev or any(c.isspace() for c in rev):
+            return None
+        if rev not in self.resolved:
+            assert self.process.stdin and self.process.stdout
+            self.process.stdin.write(f'{rev}^{{commit}}\n')
+            self.process.stdin.flush()
+            # Missing or ambiguous objects are reported as '<rev> missing' or '<rev> ambiguous'
+            fields = self.process.stdout.readline().split()
+            self.resolved[rev] = fields[0] if len(fields) == 2 and fields[1] == 'commit' else None
+        return self.resolved[rev]
+
+    def close(self):
+        if self.process.stdin:
+            self.process.stdin.close()
+        self.process.wait()
+
+@traced('git')
+def try_parse_commits(revs: Sequence[Optional[str]], opts: Options) -> list[Optional[str]]:
+    '''Resolves many revisions at once, mapping missing ones to None.'''
+    with CommitResolver(opts) as resolver:
+        return [resolver.resolve(rev) if rev else None for rev in revs]
+
 def show_commit(rev: str, format: str, opts: Options) -> str:
     lines = run_with_output(['git', 'show', '-s', f'--format={format}', rev], cwd=opts.mixxx_dir, opts=opts)
     return lines[0]
 
-def describe_commit(rev: str, opts: Options) -> str:
-    commit = parse_commit(rev, opts)
-    return f"{commit[:10]} from {show_commit(rev, '%ci', opts)} ({show_commit(rev, '%s', opts)})"
+@dataclass
+class CommitInfo:
+    date: str
+    author: str
+    subject: str
+
+# The fields of CommitInfo, separated by NUL bytes (since subjects contain pretty much anything else)
+COMMIT_INFO_FORMAT = '%H%x00%ci%x00%an%x00%s'
+
+class CommitMetadata:
+    '''Metadata of commits, queried in bulk and persisted alongside the snapshot indexes.'''
+
+    def __init__(self, opts: Options):
+        self.path = opts.index_dir / 'commits.json'
+        self.opts = opts
+        self.infos: dict[str, CommitInfo] = {}
+        try:
+            with self.path.open('r') as f:
+                self.infos = {commit: CommitInfo(*fields) for commit, fields in json.load(f).items()}
+        except (OSError, ValueError, TypeError):
+            pass
+
+    @traced('git')
+    def load(self, commits: Iterable[str]):
+        '''Queries the metadata of all given (full) commits that are not known yet in a single git invocation.'''
+        missing = [commit for commit in commits if commit not in self.infos]
+        if not missing:
+            return
+        lines = run_with_output(
+            ['git', 'log', '--no-walk=unsorted', '--stdin', f'--format={COMMIT_INFO_FORMAT}'],
+            cwd=self.opts.mixxx_dir,
+            opts=self.opts,
+            input=''.join(f'{commit}\n' for commit in missing),
+        )
+        for line in lines:
+            fields = line.split('\0')
+            if len(fields) == 4:
+                self.infos[fields[0]] = CommitInfo(*fields[1:])
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with tmp_path.open('w') as f:
+            json.dump({commit: astuple(info) for commit, info in self.infos.items()}, f)
+        tmp_path.replace(self.path)
+
+    def __getitem__(self, commit: str) -> CommitInfo:
+        if commit not in self.infos:
+            self.load([commit])
+        return self.infos[commit]
 
-def commits_in_order(commits: list[str], opts: Options) -> bool:
-    return commits == sort_commits(commits, opts)
+def describe_commit(commit: str, metadata: CommitMetadata) -> str:
+    info = metadata[commit]
+    return f'{commit[:10]} from {info.date} ({info.subject})'
@@ -0,0 +1,81 @@
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+from mixxx_bisect.repository import Snapshot
+
+import json
+import re
+
+if TYPE_CHECKING:
+    import requests
+
+INDEX_VERSION = 1
+
+def index_name(*parts: str) -> str:
+    '''Joins the given parts (e.g. repository, branch and arch) into a file name for an index.'''
+    return '-'.join(re.sub(r'[^\w\.-]', '_', part) for part in parts)
+
+class SnapshotIndex:
+    '''A persistent, incrementally refreshed mapping from (abbreviated) commits to snapshots.'''
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.complete = False
+        # The creation time of the oldest release that a partial walk (from the newest release on) has covered
+        self.covered_since: Optional[float] = None
+        self.snapshots: dict[str, Snapshot] = {}
+        self.load()
+
+    def load(self):
+        try:
+            with self.path.open('r') as f:
+                raw: dict[str, Any] = json.load(f)
+            if raw.get('version') != INDEX_VERSION:
+                return
+            self.etag = raw.get('etag')
+            self.last_modified = raw.get('last_modified')
+            self.complete = raw.get('complete', False)
+            self.covered_since = raw.get('covered_since')
+            self.snapshots = {rev: Snapshot(**snapshot) for rev, snapshot in raw.get('snapshots', {}).items()}
+        except (OSError, ValueError, TypeError):
+            # A missing or corrupt index is simply rebuilt from scratch
+            pass
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with tmp_path.open('w') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'complete': self.complete,
+                'covered_since': self.covered_since,
+                'snapshots': {rev: asdict(snapshot) for rev, snapshot in self.snapshots.items()},
+            }, f)
+        tmp_path.replace(self.path)
+
+    def covers(self, since: Optional[float]) -> bool:
+        '''Whether the index contains every snapshot released since the given time (or at all, if None).'''
+        if self.complete:
+            return True
+        return since is not None and self.covered_since is not None and self.covered_since <= since
+
+    def conditional_headers(self) -> dict[str, str]:
+        '''The headers for a conditional request that only succeeds if the remote has changed.'''
+        # Without a range of releases that is known to be covered, an unchanged remote tells us nothing
+        if not self.complete and self.covered_since is None:
+            return {}
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def update_validators(self, response: 'requests.Response'):
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
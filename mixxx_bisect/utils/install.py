@@ -0,0 +1,112 @@
+from pathlib import Path
+from typing import Callable, Optional
+
+import hashlib
+import os
+import shutil
+import stat
+import uuid
+
+COMPLETE_MARKER = '.complete'
+
+class InstallCache:
+    '''Persistent per-commit installs whose identical files are deduplicated through hard links into a content-addressed store.'''
+
+    def __init__(self, installs_dir: Path, max_installs: int):
+        self.installs_dir = installs_dir
+        self.store_dir = installs_dir / '.store'
+        self.max_installs = max_installs
+
+    def path(self, commit: str) -> Path:
+        return self.installs_dir / commit
+
+    def lookup(self, commit: str) -> Optional[Path]:
+        '''Returns the install for the given commit if it exists and was set up completely.'''
+        path = self.path(commit)
+        marker = path / COMPLETE_MARKER
+        if not marker.exists():
+            return None
+        # Bump the marker's modification time to mark the install as recently used
+        os.utime(marker)
+        return path
+
+    def install(self, commit: str, extract: Callable[[Path], None]) -> Path:
+        '''Sets up the install for the given commit by extracting into a temporary directory via the given function.'''
+        path = self.path(commit)
+        tmp_path = self.installs_dir / f'.{commit}.{uuid.uuid4().hex}.tmp'
+        try:
+            tmp_path.mkdir(parents=True)
+            extract(tmp_path)
+            self._deduplicate(tmp_path)
+            (tmp_path / COMPLETE_MARKER).touch()
+            shutil.rmtree(path, ignore_errors=True)
+            tmp_path.rename(path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        return path
+
+    def evict(self, keep: frozenset[str]=frozenset()):
+        '''Removes the least recently used installs beyond the limit along with store files no longer referenced by any install.'''
+        installs = sorted(
+            (path for path in self.installs_dir.iterdir() if (path / COMPLETE_MARKER).exists()),
+            key=lambda path: (path / COMPLETE_MARKER).stat().st_mtime,
+            reverse=True,
+        )
+        evicted = [path for path in installs[self.max_installs:] if path.name not in keep]
+        for path in evicted:
+            print(f'Evicting cached install {path.name[:10]}...')
+            shutil.rmtree(path)
+        if evicted:
+            self._collect_garbage()
+
+    def _store_path(self, path: Path) -> Path:
+        sha256 = hashlib.sha256()
+        with path.open('rb') as f:
+            while chunk := f.read(1024 * 1024):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        # Hard links share their permissions, so files only differing in those must not be deduplicated
+        mode = stat.S_IMODE(path.stat().st_mode)
+        return self.store_dir / digest[:2] / f'{digest}-{mode:o}'
+
+    def _deduplicate(self, root: Path):
+        for dir, _, files in os.walk(root):
+            for name in files:
+                path = Path(dir) / name
+                if path.is_symlink() or not path.is_file():
+                    continue
+                store_path = self._store_path(path)
+                try:
+                    self._link(path, store_path)
+                except OSError:
+                    # The file system may not support hard links, in which case we just keep the extracted copy
+                    pass
+
+    def _link(self, path: Path, store_path: Path):
+        '''Replaces the given file by a hard link to its store entry, adding the file to the store if there is none yet.'''
+        store_path.parent.mkdir(parents=True, exist_ok=True)
+        # The link is created beside the file and then renamed over it, so the file is never missing
+        tmp_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        while True:
+            try:
+                os.link(store_path, tmp_path)
+            except FileNotFoundError:
+                # Either not stored yet or just collected as garbage by an eviction in another process
+                try:
+                    os.link(path, store_path)
+                    return
+                except FileExistsError:
+                    # Another install stored it in the meantime
+                    continue
+            try:
+                os.replace(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            return
+
+    def _collect_garbage(self):
+        if not self.store_dir.exists():
+            return
+        for path in self.store_dir.glob('*/*'):
+            if path.stat().st_nlink <= 1:
+                path.unlink()
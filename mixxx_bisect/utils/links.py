@@ -0,0 +1,28 @@
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, Optional
+
+import codecs
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+def iter_links(chunks: Iterable[bytes], encoding: str='utf-8') -> Iterator[str]:
+    '''Incrementally extracts the link targets (hrefs) from an HTML document arriving in chunks, without building a DOM.'''
+    # Decode incrementally too, since multi-byte characters may be split across chunks
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    parser = _LinkParser()
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        yield from parser.links
+        parser.links.clear()
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    yield from parser.links
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import json
+
+class MeasurementCache:
+    '''The samples measured per snapshot (keyed by its URL) with a single metric, persisted so that no snapshot has to be measured twice.'''
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.measurements: dict[str, list[float]] = {}
+        try:
+            with self.path.open('r') as f:
+                self.measurements = {key: [float(sample) for sample in samples] for key, samples in json.load(f).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def samples(self, key: str) -> list[float]:
+        return list(self.measurements.get(key, []))
+
+    def add(self, key: str, sample: float):
+        self.measurements.setdefault(key, []).append(sample)
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with tmp_path.open('w') as f:
+            json.dump(self.measurements, f)
+        tmp_path.replace(self.path)
@@ -0,0 +1,70 @@
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from pathlib import Path
+
+from mixxx_bisect.error import MixxxBisectError
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.utils.request import RateLimiter
+from mixxx_bisect.utils.snapshot import SnapshotCache
+from mixxx_bisect.utils.trace import span
+
+import requests
+import threading
+
+class SnapshotPrefetcher:
+    '''Speculatively downloads snapshots into the cache in background threads.'''
+
+    def __init__(self, cache: SnapshotCache, rate: int=0, workers: int=2):
+        self.cache = cache
+        self.limiter = RateLimiter(rate) if rate > 0 else None
+        self.cancel_event = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self.futures: dict[str, Future[Path]] = {}
+        # The wanted snapshots are pinned in the cache, so that they don't evict each other (or the one being set up)
+        self.pinned: dict[str, Snapshot] = {}
+
+    def prefetch(self, snapshots: list[tuple[str, Snapshot]]):
+        '''Schedules the given snapshots (most important first) and cancels queued ones that are no longer needed.'''
+        wanted = {commit for commit, _ in snapshots}
+        for commit, future in list(self.futures.items()):
+            # Downloads already in flight are left running and end up in the cache
+            if future.done() or (commit not in wanted and future.cancel()):
+                del self.futures[commit]
+        # Snapshots waited for were set up by now, so they are unpinned here too
+        for commit in [commit for commit in self.pinned if commit not in wanted and commit not in self.futures]:
+            self.cache.unpin(commit, self.pinned.pop(commit))
+        for commit, snapshot in snapshots:
+            if commit not in self.pinned:
+                self.cache.pin(commit, snapshot)
+                self.pinned[commit] = snapshot
+            if commit not in self.futures:
+                self.futures[commit] = self.executor.submit(self._fetch, commit, snapshot)
+
+    def wait(self, commit: str):
+        '''Waits for a pending prefetch of the given commit, if there is one. The snapshot stays pinned until the next prefetch.'''
+        future = self.futures.pop(commit, None)
+        if not future:
+            return
+        if not future.done():
+            print('Waiting for prefetched snapshot...')
+        # The user is waiting now, so there is no point in throttling
+        if self.limiter:
+            self.limiter.suspended = True
+        try:
+            with span('wait for prefetch', 'download', commit=commit):
+                future.result()
+        except (CancelledError, MixxxBisectError, requests.RequestException, OSError):
+            # Failed prefetches are simply retried in the foreground
+            pass
+        finally:
+            if self.limiter:
+                self.limiter.suspended = False
+
+    def close(self):
+        self.cancel_event.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for commit, snapshot in self.pinned.items():
+            self.cache.unpin(commit, snapshot)
+        self.pinned.clear()
+
+    def _fetch(self, commit: str, snapshot: Snapshot) -> Path:
+        return self.cache.fetch(commit, snapshot, progress=False, cancel=self.cancel_event, limiter=self.limiter)
@@ -1,21 +1,187 @@
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
-from typing import Any
+from typing import Any, BinaryIO, Iterator, Optional, cast
+from urllib.parse import urlparse
+from urllib3.exceptions import ProtocolError
 
+from mixxx_bisect.error import DownloadCancelledError, DownloadError, RateLimitError
 from mixxx_bisect.utils.version import pkg_version
 
 import functools
+import json
+import math
+import random
 import requests
-import shutil
+import threading
+import time
 
-def get(url: str, **kwargs: Any) -> requests.Response:
-    headers = {'User-Agent': f'mixxx-bisect/{pkg_version()}'}
-    response = requests.get(url, headers=headers, **kwargs)
-    response.raise_for_status()
-    return response
+CHUNK_SIZE = 64 * 1024
+SEGMENT_THRESHOLD = 16 * 1024 * 1024
+DEFAULT_SEGMENTS = 4
 
-def download(url: str, output: Path):
+DEFAULT_RETRIES = 3
+# The base delay (in seconds) of the exponential backoff between retries
+RETRY_BACKOFF = 1.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+POOL_SIZE = 16
+
+# Once fewer requests than this are left in a rate limit window, the remaining ones are spread over the window
+LOW_RATE_LIMIT = 10
+MAX_PACING_DELAY = 5.0
+# The longest we are willing to wait for a rate limit to reset before giving up (in seconds)
+MAX_RATE_LIMIT_WAIT = 120.0
+
+# Hosts that the GitHub token is sent to (notably not the hosts serving release assets)
+GITHUB_API_HOSTS = frozenset({'api.github.com'})
+
+class RateLimiter:
+    '''A thread-safe limit on the combined throughput (in bytes per second) of several downloads.'''
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.suspended = False
+        self.lock = threading.Lock()
+        self.next_free = time.monotonic()
+
+    def consume(self, amount: int):
+        if self.suspended:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.next_free = max(self.next_free, now) + amount / self.rate
+            delay = self.next_free - now
+        time.sleep(delay)
+
+@dataclass
+class _RateLimitWindow:
+    remaining: int
+    reset: float
+
+class HttpClient:
+    '''
+    An HTTP client with keep-alive connection pooling, retries with jittered exponential backoff
+    and pacing of requests to APIs announcing their rate limit (e.g. GitHub's X-RateLimit-* headers).
+    '''
+
+    def __init__(self, retries: int=DEFAULT_RETRIES, tokens: Optional[dict[str, str]]=None):
+        self.retries = retries
+        self.tokens = tokens or {}
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = f'mixxx-bisect/{pkg_version()}'
+        # Downloads, segments and page fetches run concurrently, so the pool has to be larger than the default
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.lock = threading.Lock()
+        self.windows: dict[str, _RateLimitWindow] = {}
+
+    def request(self, method: str, url: str, headers: Optional[dict[str, str]]=None, **kwargs: Any) -> requests.Response:
+        host = urlparse(url).hostname or ''
+        token = self.tokens.get(host)
+        headers = {**({'Authorization': f'Bearer {token}'} if token else {}), **(headers or {})}
+        attempt = 0
+        while True:
+            self._pace(host)
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            self._observe(host, response)
+            rate_limited = response.status_code in (403, 429) and self._rate_limit_delay(response) is not None
+            if (rate_limited or response.status_code in RETRY_STATUSES) and attempt < self.retries:
+                delay = self._rate_limit_delay(response)
+                if delay is not None and delay > MAX_RATE_LIMIT_WAIT:
+                    raise self._rate_limit_error(host, delay)
+                response.close()
+                time.sleep(self._backoff(attempt) if delay is None else delay)
+                attempt += 1
+                continue
+            response.raise_for_status()
+            return response
+
+    def _backoff(self, attempt: int) -> float:
+        # Jitter avoids concurrent requests (e.g. download segments) retrying in lockstep
+        return RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def _rate_limit_delay(self, response: requests.Response) -> Optional[float]:
+        '''The number of seconds to wait as indicated by the response, if any.'''
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            if retry_after.isdigit():
+                return float(retry_after)
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+        reset = response.headers.get('X-RateLimit-Reset')
+        if response.headers.get('X-RateLimit-Remaining') == '0' and reset and reset.isdigit():
+            return max(0.0, int(reset) - time.time())
+        return None
+
+    def _rate_limit_error(self, host: str, delay: float) -> RateLimitError:
+        hint = ', consider setting GITHUB_TOKEN (or --github-token) to raise it' if host in GITHUB_API_HOSTS and host not in self.tokens else ''
+        return RateLimitError(f'Rate limit of {host} exhausted for another {delay:.0f} s{hint}')
+
+    def _observe(self, host: str, response: requests.Response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining and remaining.isdigit() and reset and reset.isdigit():
+            with self.lock:
+                self.windows[host] = _RateLimitWindow(remaining=int(remaining), reset=float(reset))
+
+    def _pace(self, host: str):
+        '''Waits before a request to the given host if its rate limit is (nearly) exhausted.'''
+        delay = 0.0
+        with self.lock:
+            window = self.windows.get(host)
+            if not window:
+                return
+            until_reset = window.reset - time.time()
+            if until_reset <= 0:
+                del self.windows[host]
+                return
+            exhausted = window.remaining <= 0
+            if not exhausted:
+                # Reserve a request, so concurrent requests don't overdraw the window
+                window.remaining -= 1
+                if window.remaining < LOW_RATE_LIMIT:
+                    delay = min(until_reset / (window.remaining + 1), MAX_PACING_DELAY)
+        if exhausted:
+            if until_reset > MAX_RATE_LIMIT_WAIT:
+                raise self._rate_limit_error(host, until_reset)
+            print(f'Rate limit of {host} exhausted, waiting {until_reset:.0f} s...')
+            delay = until_reset
+        if delay > 0:
+            time.sleep(delay)
+
+# The process-wide client that all requests go through, see configure_client
+_client = HttpClient()
+
+def configure_client(retries: int=DEFAULT_RETRIES, github_token: Optional[str]=None):
+    global _client
+    tokens = {host: github_token for host in GITHUB_API_HOSTS} if github_token else {}
+    _client = HttpClient(retries=retries, tokens=tokens)
+
+def get(url: str, headers: Optional[dict[str, str]]=None, **kwargs: Any) -> requests.Response:
+    return _client.request('GET', url, headers=headers, **kwargs)
+
+def head(url: str, headers: Optional[dict[str, str]]=None, **kwargs: Any) -> requests.Response:
+    # Like requests.head, don't follow redirects unless asked to
+    kwargs.setdefault('allow_redirects', False)
+    return _client.request('HEAD', url, headers=headers, **kwargs)
+
+@contextmanager
+def open_download(url: str, progress: bool=True) -> Iterator[BinaryIO]:
+    '''Opens the given URL as a readable stream of (decoded) bytes, optionally displaying a progress bar.'''
     # https://stackoverflow.com/a/63831344
     response = get(url, stream=True, allow_redirects=True)
     file_size = int(response.headers.get('Content-Length', 0))
@@ -23,10 +189,93 @@ def download(url: str, output: Path):
     # Decompress if needed
     response.raw.read = functools.partial(response.raw.read, decode_content=True)
 
-    with tqdm.wrapattr(response.raw, 'read', total=file_size) as raw: # type: ignore
+    with response, tqdm.wrapattr(response.raw, 'read', total=file_size, disable=not progress) as raw:
+        # The wrapper proxies all other attributes to the raw response, so it can be read like a binary file
+        yield cast(BinaryIO, raw)
+
+def download(url: str, output: Path, progress: bool=True, cancel: Optional[threading.Event]=None, limiter: Optional[RateLimiter]=None, segments: int=DEFAULT_SEGMENTS):
+    '''Downloads the given URL, in parallel byte-range segments and resuming an interrupted download to the same output if the server supports it.'''
+    try:
+        probe = head(url, allow_redirects=True, headers={'Accept-Encoding': 'identity'})
+    except requests.HTTPError:
+        # Some servers don't support HEAD requests, the plain download will surface actual errors
+        probe = None
+    size = int(probe.headers.get('Content-Length', 0)) if probe else 0
+    if probe and probe.headers.get('Accept-Ranges') == 'bytes' and size > 0:
+        _download_ranges(probe.url, output, size, probe.headers.get('ETag'), progress, cancel, limiter, segments if size >= SEGMENT_THRESHOLD else 1)
+    else:
+        _download_stream(url, output, progress, cancel, limiter)
+
+def _download_stream(url: str, output: Path, progress: bool, cancel: Optional[threading.Event], limiter: Optional[RateLimiter]):
+    with open_download(url, progress=progress) as raw:
+        with output.open('wb') as f:
+            while chunk := raw.read(CHUNK_SIZE):
+                if cancel and cancel.is_set():
+                    raise DownloadCancelledError(f'Download of {url} was cancelled')
+                if limiter:
+                    limiter.consume(len(chunk))
+                f.write(chunk)
+
+def _download_ranges(url: str, output: Path, size: int, etag: Optional[str], progress: bool, cancel: Optional[threading.Event], limiter: Optional[RateLimiter], segment_count: int):
+    # The state tracks the remaining [start, end] byte range of every segment
+    state_path = output.with_name(f'{output.name}.state')
+    try:
+        with state_path.open('r') as f:
+            state = json.load(f)
+        if state['size'] != size or state['etag'] != etag or output.stat().st_size != size:
+            raise ValueError('Partial download is stale')
+        segments: list[list[int]] = state['segments']
+        print('Resuming download...')
+    except (OSError, ValueError, KeyError):
+        step = math.ceil(size / segment_count)
+        segments = [[start, min(start + step, size) - 1] for start in range(0, size, step)]
         with output.open('wb') as f:
-            shutil.copyfileobj(raw, f)
+            f.truncate(size)
+
+    lock = threading.Lock()
+    stop = threading.Event()
+    remaining = sum(end - start + 1 for start, end in segments)
+    bar = tqdm(total=size, initial=size - remaining, unit='B', unit_scale=True, disable=not progress)
+
+    def fetch_segment(segment: list[int]):
+        if segment[0] > segment[1]:
+            return
+        response = get(url, stream=True, headers={'Range': f'bytes={segment[0]}-{segment[1]}', 'Accept-Encoding': 'identity'})
+        if response.status_code != 206:
+            raise DownloadError(f'Server ignored range request for {url} (status {response.status_code})')
+        with response, output.open('r+b') as f:
+            f.seek(segment[0])
+            try:
+                while segment[0] <= segment[1] and (chunk := response.raw.read(min(CHUNK_SIZE, segment[1] - segment[0] + 1))):
+                    if stop.is_set() or (cancel and cancel.is_set()):
+                        raise DownloadCancelledError(f'Download of {url} was cancelled')
+                    if limiter:
+                        limiter.consume(len(chunk))
+                    f.write(chunk)
+                    with lock:
+                        segment[0] += len(chunk)
+                        bar.update(len(chunk))
+            except ProtocolError as e:
+                # The connection dropped, what was received so far is kept for resuming
+                raise DownloadError(f'Connection broken while downloading segment of {url}: {e}') from e
+        if segment[0] <= segment[1]:
+            raise DownloadError(f'Connection closed before segment of {url} was complete')
 
-def get_soup(url: str) -> BeautifulSoup:
-    raw = get(url).content
-    return BeautifulSoup(raw, 'html.parser')
+    try:
+        with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+            futures = [executor.submit(fetch_segment, segment) for segment in segments]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Stop the other segments too (e.g. on Ctrl+C), the progress is persisted below
+                stop.set()
+                raise
+    finally:
+        bar.close()
+        # Segment progress is only persisted once all writers have closed (and thus flushed) the file
+        if all(start > end for start, end in segments):
+            state_path.unlink(missing_ok=True)
+        else:
+            with state_path.open('w') as f:
+                json.dump({'size': size, 'etag': etag, 'segments': segments}, f)
@@ -1,24 +1,70 @@
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import IO, Iterator, Optional, Union
 
 from mixxx_bisect.options import Options
 
+import os
+import signal
 import subprocess
 
-def run(cmd: list[str], opts: Options, cwd: Optional[Path]=None):
-    subprocess.run(
+def run(cmd: Union[list[str], str], opts: Options, cwd: Optional[Path]=None, timeout: Optional[float]=None, env: Optional[dict[str, str]]=None, shell: bool=False) -> int:
+    '''Runs the given command and returns its exit code. Raises subprocess.TimeoutExpired if the timeout elapses.'''
+    # With a timeout, the command gets its own process group so that we can kill its children too
+    new_session = timeout is not None and os.name == 'posix'
+    process = subprocess.Popen(
         cmd,
         cwd=cwd or opts.root_dir,
         stdout=subprocess.DEVNULL if opts.quiet else None,
         stderr=subprocess.DEVNULL if opts.quiet else None,
+        env=env,
+        shell=shell,
+        start_new_session=new_session,
     )
+    try:
+        return process.wait(timeout=timeout)
+    except BaseException:
+        # Also covers Ctrl+C, which doesn't reach a command in its own process group
+        _kill(process, new_session)
+        raise
 
-def run_with_output(cmd: list[str], opts: Options, cwd: Optional[Path]=None) -> list[str]:
+@contextmanager
+def launch(cmd: list[str], opts: Options, output: IO[bytes], cwd: Optional[Path]=None) -> Iterator[subprocess.Popen]:
+    '''Starts the given command with its output redirected to the given file, killing it (and its children) when leaving the block.'''
+    new_session = os.name == 'posix'
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd or opts.root_dir,
+        stdout=output,
+        stderr=subprocess.STDOUT,
+        start_new_session=new_session,
+    )
+    try:
+        yield process
+    finally:
+        _kill(process, new_session)
+
+def _kill(process: subprocess.Popen, new_session: bool):
+    if new_session:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # The whole process group exited already
+            pass
+    elif process.poll() is None:
+        process.kill()
+    process.wait()
+
+def run_with_output(cmd: Union[list[str], str], opts: Options, cwd: Optional[Path]=None, input: Optional[str]=None, timeout: Optional[float]=None, env: Optional[dict[str, str]]=None, shell: bool=False) -> list[str]:
     result = subprocess.run(
         cmd,
         cwd=cwd or opts.root_dir,
         check=True,
         capture_output=True,
         encoding='utf8',
+        input=input,
+        timeout=timeout,
+        env=env,
+        shell=shell,
     )
     return result.stdout.splitlines()
@@ -0,0 +1,82 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from mixxx_bisect.oracle import Verdict
+
+import json
+
+def oracle_spec(run: Optional[str], perf: Optional[str], threshold: float) -> str:
+    '''Identifies how snapshots are judged (i.e. interactively, by a command or by a metric), since only verdicts judged the same way can be reused.'''
+    if perf is not None:
+        return f'perf:{perf}@{threshold}'
+    if run is not None:
+        # An empty command runs Mixxx itself
+        return f'run:{run}'
+    return 'interactive'
+
+@dataclass
+class Session:
+    '''A bisect session persisted after every verdict, so it can be resumed and its verdicts reused.'''
+
+    path: Path
+    repository: str
+    branch: str
+    arch: str
+    good: str
+    bad: str
+    # Identifies how this run judges snapshots, see oracle_spec
+    oracle: str
+    # The verdicts by the oracle that reached them, since e.g. a command may judge a snapshot differently than the user
+    verdicts_by_oracle: dict[str, dict[str, Verdict]] = field(default_factory=dict)
+
+    @property
+    def verdicts(self) -> dict[str, Verdict]:
+        '''The verdicts reached by the oracle of this run.'''
+        return self.verdicts_by_oracle.setdefault(self.oracle, {})
+
+    @staticmethod
+    def load(path: Path) -> Optional['Session']:
+        try:
+            with path.open('r') as f:
+                raw = json.load(f)
+            return Session(
+                path=path,
+                repository=raw['repository'],
+                branch=raw['branch'],
+                arch=raw['arch'],
+                good=raw['good'],
+                bad=raw['bad'],
+                oracle=raw['oracle'],
+                verdicts_by_oracle={
+                    oracle: {commit: Verdict(verdict) for commit, verdict in verdicts.items()}
+                    for oracle, verdicts in raw['verdicts'].items()
+                },
+            )
+        except (OSError, ValueError, KeyError, AttributeError):
+            return None
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with tmp_path.open('w') as f:
+            json.dump({
+                'repository': self.repository,
+                'branch': self.branch,
+                'arch': self.arch,
+                'good': self.good,
+                'bad': self.bad,
+                'oracle': self.oracle,
+                'verdicts': {
+                    oracle: {commit: verdict.value for commit, verdict in verdicts.items()}
+                    for oracle, verdicts in self.verdicts_by_oracle.items()
+                },
+            }, f, indent=2)
+        tmp_path.replace(self.path)
+
+    def record(self, commit: str, verdict: Verdict, good: str, bad: str):
+        '''Records a verdict along with the resulting search range.'''
+        self.verdicts[commit] = verdict
+        self.good = good
+        self.bad = bad
+        self.save()
@@ -0,0 +1,24 @@
+import argparse
+import re
+
+SIZE_UNITS = {
+    '': 1,
+    'K': 1024,
+    'M': 1024 ** 2,
+    'G': 1024 ** 3,
+    'T': 1024 ** 4,
+}
+
+def parse_size(raw: str) -> int:
+    '''Parses a human-readable size like 500M or 2G (binary units) to a number of bytes.'''
+    matches = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', raw, re.IGNORECASE)
+    if not matches:
+        raise argparse.ArgumentTypeError(f'Invalid size: {raw} (expected e.g. 500M or 2G)')
+    return int(float(matches[1]) * SIZE_UNITS[matches[2].upper()])
+
+def format_size(size: float) -> str:
+    for unit in ['', 'K', 'M', 'G']:
+        if size < 1024:
+            return f'{size:.1f} {unit}B' if unit else f'{int(size)} B'
+        size /= 1024
+    return f'{size:.1f} TB'
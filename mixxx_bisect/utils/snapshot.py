@@ -1,7 +1,229 @@
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, cast
 
-from mixxx_bisect.utils.request import download
+from mixxx_bisect.error import SnapshotIntegrityError
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.utils.request import CHUNK_SIZE, DEFAULT_SEGMENTS, RateLimiter, download, open_download
+from mixxx_bisect.utils.size import format_size
+from mixxx_bisect.utils.trace import span
 
-def download_snapshot(url: str, download_path: Path):
-    print(f'Downloading snapshot...')
-    download(url, download_path)
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+PARTIAL_MAX_AGE = 7 * 24 * 60 * 60
+
+def file_digest(path: Path) -> str:
+    '''Computes the SHA-256 digest of the given file in the format used by GitHub, i.e. sha256:<hex>.'''
+    sha256 = hashlib.sha256()
+    with path.open('rb') as f:
+        while chunk := f.read(1024 * 1024):
+            sha256.update(chunk)
+    return f'sha256:{sha256.hexdigest()}'
+
+class TeeReader:
+    '''A readable stream that copies everything read from the underlying stream to a sink.'''
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        self.source = source
+        self.sink = sink
+
+    def read(self, size: int=-1) -> bytes:
+        data = self.source.read(size)
+        self.sink.write(data)
+        return data
+
+class SnapshotCache:
+    '''
+    A size-bounded cache of downloaded snapshots, keyed by commit and URL and evicted in LRU order.
+    Pinned snapshots (e.g. ones being set up or prefetched) are never evicted, so the cache may exceed its limit while they are.
+    '''
+
+    def __init__(self, cache_dir: Path, max_size: int, segments: int=DEFAULT_SEGMENTS):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.segments = segments
+        self.lock = threading.Lock()
+        self.download_locks: dict[Path, threading.Lock] = {}
+        self.pins: dict[Path, int] = {}
+
+    def path(self, commit: str, snapshot: Snapshot) -> Path:
+        key = hashlib.sha256(f'{snapshot.url}\n{commit}'.encode()).hexdigest()[:16]
+        return self.cache_dir / f'{key}-{snapshot.name}'
+
+    def _meta_path(self, path: Path) -> Path:
+        return path.with_name(f'{path.name}.json')
+
+    def lookup(self, commit: str, snapshot: Snapshot) -> Optional[Path]:
+        '''Returns the cached snapshot if it exists and is intact.'''
+        path = self.path(commit, snapshot)
+        meta_path = self._meta_path(path)
+        try:
+            with meta_path.open('r') as f:
+                meta = json.load(f)
+            # The digest was verified on insertion, a snapshot modified since then has a different size or modification time
+            stat = path.stat()
+            intact = stat.st_size == meta['size'] and stat.st_mtime_ns == meta['mtime_ns']
+        except (OSError, ValueError):
+            # Not cached (yet), the entry may also be in the middle of being inserted
+            return None
+        except KeyError:
+            intact = False
+        if not intact:
+            print(f'Removing corrupt cached snapshot {path.name}...')
+            self._remove(path)
+            return None
+        # Bump the modification time of the metadata to mark the entry as recently used, the snapshot's has to stay the same
+        os.utime(meta_path)
+        return path
+
+    def fetch(self, commit: str, snapshot: Snapshot, progress: bool=True, cancel: Optional[threading.Event]=None, limiter: Optional[RateLimiter]=None) -> Path:
+        '''Returns the cached snapshot, downloading it first if needed.'''
+        cached = self.lookup(commit, snapshot)
+        if cached:
+            if progress:
+                print('Using cached snapshot...')
+            return cached
+
+        path = self.path(commit, snapshot)
+        with self._download_lock(path):
+            # Another thread may have downloaded the snapshot in the meantime
+            cached = self.lookup(commit, snapshot)
+            if cached:
+                return cached
+
+            if progress:
+                print('Downloading snapshot...')
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Download to a partial path first so readers never observe partial files. The path
+            # is stable, so interrupted downloads are resumed by the next fetch of the snapshot.
+            partial_path = path.with_name(f'{path.name}.part')
+            with span('download', 'download', commit=commit, snapshot=snapshot.name) as args:
+                download(snapshot.url, partial_path, progress=progress, cancel=cancel, limiter=limiter, segments=self.segments)
+                args['bytes'] = partial_path.stat().st_size
+            try:
+                self._insert(commit, snapshot, partial_path, path)
+            finally:
+                partial_path.unlink(missing_ok=True)
+        return path
+
+    def pin(self, commit: str, snapshot: Snapshot):
+        '''Protects the snapshot from eviction (even before it is cached) until it is unpinned as often as it was pinned.'''
+        path = self.path(commit, snapshot)
+        with self.lock:
+            self.pins[path] = self.pins.get(path, 0) + 1
+
+    def unpin(self, commit: str, snapshot: Snapshot):
+        path = self.path(commit, snapshot)
+        with self.lock:
+            self.pins[path] -= 1
+            if self.pins[path] > 0:
+                return
+            del self.pins[path]
+        # The snapshot may have been kept beyond the size limit
+        if self.cache_dir.exists():
+            self.evict()
+
+    @contextmanager
+    def pinned(self, commit: str, snapshot: Snapshot) -> Iterator[None]:
+        '''Pins the snapshot while in the context, e.g. while a fetched snapshot is set up.'''
+        self.pin(commit, snapshot)
+        try:
+            yield
+        finally:
+            self.unpin(commit, snapshot)
+
+    def _download_lock(self, path: Path) -> threading.Lock:
+        with self.lock:
+            return self.download_locks.setdefault(path, threading.Lock())
+
+    @contextmanager
+    def open(self, commit: str, snapshot: Snapshot, tee: bool=True, progress: bool=True) -> Iterator[BinaryIO]:
+        '''Opens the snapshot for reading, streaming it from the network (and, if tee is set, into the cache) if it is not cached yet.'''
+        with self.pinned(commit, snapshot):
+            cached = self.lookup(commit, snapshot)
+            if cached:
+                print('Using cached snapshot...')
+                with cached.open('rb') as f:
+                    yield f
+                return
+
+        print('Streaming snapshot...')
+        if not tee:
+            with open_download(snapshot.url, progress=progress) as raw:
+                yield raw
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(commit, snapshot)
+        tmp_path = self._tmp_path(path)
+        try:
+            # The span includes the consumer (e.g. extraction), since both happen at once
+            with span('stream', 'download', commit=commit, snapshot=snapshot.name) as args, open_download(snapshot.url, progress=progress) as raw, tmp_path.open('wb') as f:
+                reader = TeeReader(raw, f)
+                yield cast(BinaryIO, reader)
+                # Consumers like tarfile may stop before the end of the stream (e.g. at padding)
+                while reader.read(CHUNK_SIZE):
+                    pass
+                args['bytes'] = f.tell()
+            self._insert(commit, snapshot, tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _tmp_path(self, path: Path) -> Path:
+        return path.with_name(f'{path.name}.{uuid.uuid4().hex}.part')
+
+    def _insert(self, commit: str, snapshot: Snapshot, tmp_path: Path, path: Path):
+        '''Verifies the downloaded snapshot and moves it into the cache.'''
+        size = tmp_path.stat().st_size
+        digest = file_digest(tmp_path)
+        if snapshot.size is not None and size != snapshot.size:
+            raise SnapshotIntegrityError(f'Downloaded snapshot {snapshot.name} has size {size}, but expected {snapshot.size}')
+        if snapshot.digest and snapshot.digest.startswith('sha256:') and digest != snapshot.digest:
+            raise SnapshotIntegrityError(f'Downloaded snapshot {snapshot.name} has digest {digest}, but expected {snapshot.digest}')
+        # The snapshot is moved into place before its metadata, since lookups ignore entries without metadata
+        tmp_meta_path = self._meta_path(tmp_path)
+        with tmp_meta_path.open('w') as f:
+            # Moving the snapshot preserves its modification time
+            json.dump({'url': snapshot.url, 'commit': commit, 'size': size, 'digest': digest, 'mtime_ns': tmp_path.stat().st_mtime_ns}, f)
+        tmp_path.replace(path)
+        tmp_meta_path.replace(self._meta_path(path))
+        self.evict(keep=frozenset({path}))
+
+    def evict(self, keep: frozenset[Path]=frozenset()):
+        '''Evicts the least recently used snapshots until the cache fits into its size limit.'''
+        with self.lock:
+            # Partial downloads that have not been resumed for a long time are unlikely to ever be resumed
+            for path in self.cache_dir.glob('*.part*'):
+                try:
+                    if path.stat().st_mtime < time.time() - PARTIAL_MAX_AGE:
+                        path.unlink(missing_ok=True)
+                except FileNotFoundError:
+                    # Other processes sharing the cache may finish or remove any file in the meantime
+                    continue
+            # The entries along with their size and when they were last used (as marked on their metadata)
+            entries: list[tuple[Path, int, float]] = []
+            for path in self.cache_dir.iterdir():
+                try:
+                    # Anything without metadata (e.g. the metadata itself or partial downloads) is skipped
+                    entries.append((path, path.stat().st_size, self._meta_path(path).stat().st_mtime))
+                except FileNotFoundError:
+                    continue
+            entries.sort(key=lambda entry: entry[2])
+            total_size = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total_size <= self.max_size:
+                    break
+                if path in keep or path in self.pins:
+                    continue
+                print(f'Evicting cached snapshot {path.name} ({format_size(size)})...')
+                self._remove(path)
+                total_size -= size
+
+    def _remove(self, path: Path):
+        path.unlink(missing_ok=True)
+        self._meta_path(path).unlink(missing_ok=True)
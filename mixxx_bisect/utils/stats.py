@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import Sequence
+
+import math
+import statistics
+
+# The precision and iteration limit of the continued fraction for the incomplete beta function
+BETA_EPSILON = 1e-12
+BETA_MAX_ITERATIONS = 200
+
+@dataclass
+class TTestResult:
+    t: float
+    df: float
+    # The one-sided p-value for the alternative that the first sample has the greater mean
+    p: float
+
+def welch_t_test(samples: Sequence[float], baseline: Sequence[float]) -> TTestResult:
+    '''Welch's t-test (i.e. not assuming equal variances) of whether the samples have a greater mean than the baseline.'''
+    if len(samples) < 2 or len(baseline) < 2:
+        raise ValueError('The t-test requires at least two samples on each side')
+    se_samples = statistics.variance(samples) / len(samples)
+    se_baseline = statistics.variance(baseline) / len(baseline)
+    diff = statistics.mean(samples) - statistics.mean(baseline)
+    se = se_samples + se_baseline
+    if se == 0:
+        # Without any noise, any difference at all is significant
+        return TTestResult(t=math.copysign(math.inf, diff) if diff else 0, df=math.inf, p=0 if diff > 0 else 1)
+    t = diff / math.sqrt(se)
+    # The Welch-Satterthwaite approximation of the degrees of freedom
+    df = se ** 2 / (se_samples ** 2 / (len(samples) - 1) + se_baseline ** 2 / (len(baseline) - 1))
+    return TTestResult(t=t, df=df, p=student_t_sf(t, df))
+
+def student_t_sf(t: float, df: float) -> float:
+    '''The survival function P(T > t) of Student's t-distribution with the given degrees of freedom.'''
+    tail = 0.5 * regularized_beta(df / (df + t * t), df / 2, 0.5)
+    return tail if t > 0 else 1 - tail
+
+def regularized_beta(x: float, a: float, b: float) -> float:
+    '''The regularized incomplete beta function I_x(a, b).'''
+    if x <= 0:
+        return 0
+    if x >= 1:
+        return 1
+    log_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x)
+    # The continued fraction converges quickly only below this point, otherwise we use the symmetry I_x(a, b) = 1 - I_{1-x}(b, a)
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_continued_fraction(x, a, b) / a
+    return 1 - math.exp(log_front) * _beta_continued_fraction(1 - x, b, a) / b
+
+def _beta_continued_fraction(x: float, a: float, b: float) -> float:
+    '''Evaluates the continued fraction of the incomplete beta function with the modified Lentz method.'''
+    tiny = 1e-300
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, BETA_MAX_ITERATIONS + 1):
+        for numerator in [
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ]:
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            delta = c * d
+            result *= delta
+        if abs(delta - 1) < BETA_EPSILON:
+            break
+    return result
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from mixxx_bisect.utils.size import format_size
+
+import functools
+import json
+import os
+import threading
+import time
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+class Tracer:
+    '''Records timed spans as Chrome trace events, viewable in chrome://tracing or https://ui.perfetto.dev.'''
+
+    def __init__(self):
+        self.events: list[dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[dict[str, Any]]:
+        '''Records the block as a span. Further args (e.g. bytes) can be added to the yielded dict.'''
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            duration = time.perf_counter() - start
+            if 'bytes' in args and duration > 0:
+                args['mb_per_s'] = round(args['bytes'] / (1024 * 1024) / duration, 2)
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round((start - self.start) * 1e6),
+                'dur': round(duration * 1e6),
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': args,
+            }
+            with self.lock:
+                self.events.append(event)
+
+    def save(self, path: Path):
+        with path.open('w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+    def summary(self) -> str:
+        '''A table of the time (and, where applicable, data) spent per category and span name.'''
+        totals: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        with self.lock:
+            for event in self.events:
+                totals.setdefault((event['cat'], event['name']), []).append(event)
+        rows = [('Phase', 'Count', 'Total', 'Mean', 'Data')]
+        for (category, name), events in sorted(totals.items(), key=lambda item: -sum(event['dur'] for event in item[1])):
+            seconds = sum(event['dur'] for event in events) / 1e6
+            data = sum(event['args'].get('bytes', 0) for event in events)
+            rows.append((
+                f'{category}: {name}',
+                str(len(events)),
+                f'{seconds:.2f} s',
+                f'{seconds / len(events):.2f} s',
+                f'{format_size(data)} ({format_size(data / seconds)}/s)' if data and seconds > 0 else '',
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return '\n'.join(
+            '  '.join(cell.ljust(width) if i in (0, 4) else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths))).rstrip()
+            for row in rows
+        )
+
+# The process-wide tracer, only set if tracing is enabled (see enable_tracing)
+_tracer: Optional[Tracer] = None
+
+def enable_tracing() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+@contextmanager
+def span(name: str, category: str, **args: Any) -> Iterator[dict[str, Any]]:
+    '''Records the block as a span if tracing is enabled.'''
+    if _tracer:
+        with _tracer.span(name, category, **args) as span_args:
+            yield span_args
+    else:
+        yield args
+
+def traced(category: str) -> Callable[[F], F]:
+    '''Records every call of the decorated function as a span if tracing is enabled.'''
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(func.__qualname__, category):
+                return func(*args, **kwargs)
+        return wrapper # type: ignore
+    return decorator
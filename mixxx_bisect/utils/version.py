@@ -1,6 +1,6 @@
-from importlib.metadata import version, PackageNotFoundError
-
 def pkg_version() -> str:
+    # importlib.metadata is comparatively slow to import and only needed for --version and the user agent
+    from importlib.metadata import version, PackageNotFoundError
     try:
         return version('mixxx-bisect')
     except PackageNotFoundError:
@@ -0,0 +1,38 @@
+from pathlib import Path
+from typing import Iterator
+
+from fakes import FakeSnapshotRepository, FakeSnapshotRunner, OtherFakeSnapshotRepository, make_options
+from server import SnapshotServer
+
+from mixxx_bisect import registry
+from mixxx_bisect.options import Options
+
+import platform
+import pytest
+
+@pytest.fixture
+def opts(tmp_path: Path) -> Options:
+    opts = make_options(tmp_path / 'root')
+    for dir in [opts.root_dir, opts.installs_dir, opts.log_dir, opts.index_dir, opts.cache_dir]:
+        dir.mkdir(parents=True, exist_ok=True)
+    return opts
+
+@pytest.fixture
+def server() -> Iterator[SnapshotServer]:
+    '''A local snapshot server without any releases, files can be added to it.'''
+    server = SnapshotServer([])
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def fake_platform(monkeypatch: pytest.MonkeyPatch):
+    '''Makes mixxx-bisect use the fake runner on this platform and offers the fake repository as 'fake'.'''
+    monkeypatch.setitem(registry.SNAPSHOT_RUNNERS, platform.system(), 'fakes:FakeSnapshotRunner')
+    monkeypatch.setitem(registry.SNAPSHOT_REPOSITORIES, 'fake', 'fakes:FakeSnapshotRepository')
+
+@pytest.fixture(autouse=True)
+def reset_fakes(monkeypatch: pytest.MonkeyPatch):
+    '''The fakes are configured on their classes, so every test starts from a clean slate.'''
+    monkeypatch.setattr(FakeSnapshotRunner, 'runs', [])
+    monkeypatch.setattr(FakeSnapshotRepository, 'snapshots', {})
+    monkeypatch.setattr(OtherFakeSnapshotRepository, 'snapshots', {})
@@ -0,0 +1,143 @@
+# Stand-ins for the platform-specific snapshot runners and the snapshot
+# repositories, along with a synthetic Mixxx repository, so that the search
+# can be tested offline without downloading or launching Mixxx.
+
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, Optional
+
+from mixxx_bisect.options import Options
+from mixxx_bisect.repository import Snapshot, SnapshotRepository
+from mixxx_bisect.runner import SnapshotRunner
+
+import io
+import mixxx_bisect
+import subprocess
+import sys
+
+def make_repo(path: Path, count: int) -> list[str]:
+    '''Creates a bare repository with a linear history of the given number of commits on main, returning them oldest first.'''
+    subprocess.run(['git', 'init', '-q', '--bare', str(path)], check=True)
+    # Allows partial clones over file:// like on GitHub
+    subprocess.run(['git', 'config', 'uploadpack.allowFilter', 'true'], cwd=path, check=True)
+    subprocess.run(['git', 'symbolic-ref', 'HEAD', 'refs/heads/main'], cwd=path, check=True)
+    return extend_repo(path, count)
+
+def extend_repo(path: Path, count: int) -> list[str]:
+    '''Adds the given number of commits to main, returning the new ones oldest first.'''
+    start = len(subprocess.run(['git', 'rev-list', '--all'], cwd=path, capture_output=True, encoding='utf8', check=True).stdout.split())
+    stream = ''.join(
+        f'commit refs/heads/main\nmark :{i + 1}\ncommitter Test <test@example.com> {1600000000 + start + i} +0000\n'
+        + f'data {len(f"Commit {start + i}")}\nCommit {start + i}\n'
+        + (f'from :{i}\n' if i > 0 else 'from refs/heads/main^0\n' if start > 0 else '')
+        + '\n'
+        for i in range(count)
+    )
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=path, input=stream, encoding='utf8', check=True)
+    return subprocess.run(['git', 'rev-list', '--reverse', f'-{count}', 'main'], cwd=path, capture_output=True, encoding='utf8', check=True).stdout.split()
+
+def make_options(root: Path, mixxx_remote: str='', clone_filter: Optional[str]=None) -> Options:
+    return Options(
+        quiet=True,
+        verbose=False,
+        os='Linux',
+        arch='x86_64',
+        mixxx_args=[],
+        root_dir=root,
+        mixxx_dir=root / 'mixxx.git',
+        mixxx_remote=mixxx_remote,
+        clone_filter=clone_filter,
+        installs_dir=root / 'installs',
+        log_dir=root / 'log',
+        index_dir=root / 'index',
+        cache_dir=root / 'cache',
+        cache_max_size=1 << 30,
+        max_installs=5,
+    )
+
+class FakeSnapshotRunner(SnapshotRunner):
+    '''
+    Pretends that every snapshot is installed and runs it by looking up its exit code.
+    The behavior is configured on the class, since mixxx-bisect instantiates runners itself.
+    '''
+
+    # Maps commits to the exit code of their snapshot, raising subprocess.TimeoutExpired simulates a hang
+    exit_code: Callable[[str], int] = staticmethod(lambda commit: 0)
+    # The commits whose snapshots were run, in order
+    runs: list[str] = []
+
+    def __init__(self, opts: Options):
+        self.opts = opts
+
+    @property
+    def suffix(self) -> str:
+        return '.tar.gz'
+
+    def install_dir(self, commit: str) -> Path:
+        return self.opts.installs_dir / commit
+
+    def is_installed(self, commit: str) -> bool:
+        return True
+
+    def setup_snapshot(self, commit: str, archive: Path):
+        pass
+
+    def executable_path(self, commit: str) -> Path:
+        return self.install_dir(commit) / 'bin' / 'mixxx'
+
+    def snapshot_command(self, commit: str) -> list[str]:
+        return [str(self.executable_path(commit)), *self.opts.mixxx_args]
+
+    def run_snapshot(self, commit: str, timeout: Optional[float]=None) -> int:
+        self.runs.append(commit)
+        return type(self).exit_code(commit)
+
+    def cleanup_snapshot(self, commit: str):
+        pass
+
+class FakeSnapshotRepository(SnapshotRepository):
+    '''Publishes the snapshots configured on the class.'''
+
+    snapshots: dict[str, Snapshot] = {}
+
+    def __init__(self, branch: str, suffix: str, opts: Options):
+        self.suffix = suffix
+
+    def fetch_snapshots(self, oldest: Optional[str]=None) -> dict[str, Snapshot]:
+        return dict(self.snapshots)
+
+class OtherFakeSnapshotRepository(FakeSnapshotRepository):
+    '''Another repository publishing the snapshots configured on its class, e.g. to be combined with the first one.'''
+
+    snapshots: dict[str, Snapshot] = {}
+
+def fake_snapshots(commits: list[str]) -> dict[str, Snapshot]:
+    '''Snapshots for the given commits, keyed by abbreviated revisions like in the real repositories.'''
+    return {commit[:10]: Snapshot(url=f'https://snapshots.invalid/{commit}.tar.gz', name=f'{commit}.tar.gz') for commit in commits}
+
+def bisect_argv(tmp_path: Path, repo: Path, *extra: str) -> list[str]:
+    '''The arguments for an offline search of the given repository using the fakes, followed by the given ones.'''
+    return [
+        '--root', str(tmp_path / 'root'),
+        '--remote', str(repo),
+        '--clone-filter', 'none',
+        '--repository', 'fake',
+        '--no-daemon',
+        '--prefetch-depth', '0',
+        *extra,
+    ]
+
+def run_main(argv: list[str]) -> tuple[int, str]:
+    '''Runs mixxx-bisect with the given arguments, returning its exit code and output.'''
+    output = io.StringIO()
+    old_argv = sys.argv
+    sys.argv = ['mixxx-bisect', *argv]
+    try:
+        with redirect_stdout(output):
+            mixxx_bisect.main()
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    finally:
+        sys.argv = old_argv
+    return code, output.getvalue()
@@ -0,0 +1,153 @@
+# A local server mimicking the GitHub releases API, the mixxx.org snapshot
+# listing and the snapshot downloads, along with synthetic snapshots to serve.
+
+import hashlib
+import http.server
+import io
+import json
+import subprocess
+import tarfile
+import threading
+import time
+
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+def make_tarball(commit: str, padding: int=0) -> bytes:
+    '''A Linux snapshot in the layout of m1xxx, whose Mixxx executable just exits successfully.'''
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz', compresslevel=1) as tar:
+        files = [
+            ('bin/mixxx', b'#!/bin/sh\nexit 0\n'),
+            ('share/mixxx/commit', commit.encode()),
+            ('lib/padding', bytes(padding)),
+        ]
+        for name, data in files:
+            info = tarfile.TarInfo(f'mixxx-{commit[:10]}/{name}')
+            info.size = len(data)
+            info.mode = 0o755
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+def m1xxx_asset_name(index: int, commit: str, triplet: str='x64-linux-release.tar.gz') -> str:
+    return f'mixxx-2.5.0.c{index}.r{commit[:10]}-{triplet}'
+
+def mixxx_org_asset_name(index: int, commit: str) -> str:
+    return f'mixxx-2.4-alpha-{index}-g{commit[:10]}-macosintel.dmg'
+
+class SnapshotServer:
+    '''A local HTTP server serving a releases API (with ETags and Link pagination), a directory listing and downloads (with ETags and ranges).'''
+
+    def __init__(self, snapshot_commits: list[str], repo: Optional[Path]=None):
+        self.files: dict[str, bytes] = {}
+        self.commits: dict[str, str] = {}
+        self.request_count = 0
+        self.bytes_sent = 0
+        # Whether downloads support byte ranges
+        self.ranges = True
+        # If set, responses are cut off after this many bytes of their body, like by a dropped connection
+        self.truncate: Optional[int] = None
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.releases_url = f'{self.base_url}/releases'
+        self.snapshots_url = f'{self.base_url}/snapshots/'
+
+        # Given the repository, releases are dated like on GitHub, a minute after the commit they are built from
+        self.commit_times: dict[str, int] = {}
+        if repo:
+            log = subprocess.run(['git', 'log', '--format=%H %ct', '--all'], cwd=repo, capture_output=True, encoding='utf8', check=True).stdout
+            self.commit_times = {commit: int(time) for commit, time in (line.split() for line in log.splitlines())}
+
+        # Releases are listed newest first, like on GitHub, with Linux and macOS assets
+        self.releases: list[dict[str, Any]] = []
+        for commit in snapshot_commits:
+            self.publish(commit)
+        listing = ''.join(f'<a href="{name}">{name}</a>\r\n' for name in (mixxx_org_asset_name(i, commit) for i, commit in enumerate(snapshot_commits)))
+        self.listing = f'<html><body><pre><a href="../">../</a>\r\n{listing}</pre></body></html>'.encode()
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def publish(self, commit: str):
+        '''Adds a release of the given commit, which becomes the newest one.'''
+        i = len(self.releases)
+        release: dict[str, Any] = {'tag_name': f'c{i}', 'assets': [
+            {'name': name, 'browser_download_url': f'{self.base_url}/download/{name}'}
+            for name in [m1xxx_asset_name(i, commit), m1xxx_asset_name(i, commit, 'x64-osx-min1100-release.dmg')]
+        ]}
+        if commit in self.commit_times:
+            release['created_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.commit_times[commit] + 60))
+        self.releases.insert(0, release)
+        self.commits[m1xxx_asset_name(i, commit)] = commit
+
+    def add_file(self, name: str, data: bytes) -> str:
+        self.files[name] = data
+        return f'{self.base_url}/download/{name}'
+
+    def file(self, name: str) -> bytes:
+        if name not in self.files:
+            # Snapshots are generated on first request, most are never downloaded
+            self.files[name] = make_tarball(self.commits[name])
+        return self.files[name]
+
+    def shutdown(self):
+        self.server.shutdown()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status: int, body: bytes=b'', headers: dict[str, str]={}):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    sent = body[:server.truncate] if server.truncate is not None else body
+                    self.wfile.write(sent)
+                    server.bytes_sent += len(sent)
+                    if len(sent) < len(body):
+                        self.close_connection = True
+
+            def send_cached(self, body: bytes, headers: dict[str, str]={}):
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send(304, headers={'ETag': etag})
+                else:
+                    self.send(200, body, {'ETag': etag, **headers})
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_GET(self):
+                server.request_count += 1
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == '/releases':
+                    page = int(query.get('page', ['1'])[0])
+                    per_page = int(query.get('per_page', ['30'])[0])
+                    last_page = max(1, -(-len(server.releases) // per_page))
+                    body = json.dumps(server.releases[(page - 1) * per_page:page * per_page]).encode()
+                    self.send_cached(body, {'Content-Type': 'application/json', 'Link': f'<{server.releases_url}?per_page={per_page}&page={last_page}>; rel="last"'})
+                elif url.path == '/snapshots/main/':
+                    self.send_cached(server.listing, {'Content-Type': 'text/html'})
+                elif url.path.startswith('/download/') and (name := url.path.removeprefix('/download/')) in server.commits.keys() | server.files.keys():
+                    data = server.file(name)
+                    headers = {'ETag': f'"{hashlib.sha1(data).hexdigest()}"', **({'Accept-Ranges': 'bytes'} if server.ranges else {})}
+                    range_header = self.headers.get('Range') if server.ranges else None
+                    if range_header:
+                        start, end = range_header.removeprefix('bytes=').split('-')
+                        first, last = int(start), int(end) if end else len(data) - 1
+                        self.send(206, data[first:last + 1], {**headers, 'Content-Range': f'bytes {first}-{last}/{len(data)}'})
+                    else:
+                        self.send(200, data, headers)
+                else:
+                    self.send(404)
+
+        return Handler
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from fakes import FakeSnapshotRepository, FakeSnapshotRunner, bisect_argv, fake_snapshots, make_repo, run_main
+
+from mixxx_bisect.options import Options
+from mixxx_bisect.oracle import Verdict
+from mixxx_bisect.oracle.command import CommandOracle, verdict_from_exit_code
+
+import math
+import os
+import pytest
+import subprocess
+import time
+
+def hang(commit: str) -> int:
+    raise subprocess.TimeoutExpired(['mixxx'], 1)
+
+@pytest.mark.parametrize('code, verdict', [
+    (0, Verdict.GOOD),
+    (125, Verdict.SKIP),
+    (1, Verdict.BAD),
+    (124, Verdict.BAD),
+    (126, Verdict.BAD),
+    (-9, Verdict.BAD),
+])
+def test_verdict_from_exit_code(code: int, verdict: Verdict):
+    assert verdict_from_exit_code(code) == verdict
+
+@pytest.mark.parametrize('code, verdict', [(0, Verdict.GOOD), (125, Verdict.SKIP), (3, Verdict.BAD)])
+def test_judges_by_mixxx_exit_code(opts: Options, monkeypatch: pytest.MonkeyPatch, code: int, verdict: Verdict):
+    monkeypatch.setattr(FakeSnapshotRunner, 'exit_code', staticmethod(lambda commit: code))
+    runner = FakeSnapshotRunner(opts)
+    oracle = CommandOracle(runner, command=None, timeout=None, timeout_verdict=Verdict.BAD, opts=opts)
+    assert oracle.judge('abc') == verdict
+    assert runner.runs == ['abc']
+
+@pytest.mark.parametrize('timeout_verdict', list(Verdict))
+def test_mixxx_timeout_maps_to_timeout_verdict(opts: Options, monkeypatch: pytest.MonkeyPatch, timeout_verdict: Verdict):
+    monkeypatch.setattr(FakeSnapshotRunner, 'exit_code', staticmethod(hang))
+    oracle = CommandOracle(FakeSnapshotRunner(opts), command=None, timeout=1, timeout_verdict=timeout_verdict, opts=opts)
+    assert oracle.judge('abc') == timeout_verdict
+
+@pytest.mark.skipif(os.name != 'posix', reason='requires a POSIX shell')
+@pytest.mark.parametrize('timeout_verdict', list(Verdict))
+def test_command_timeout_maps_to_timeout_verdict(opts: Options, timeout_verdict: Verdict):
+    oracle = CommandOracle(FakeSnapshotRunner(opts), command='sleep 30', timeout=0.2, timeout_verdict=timeout_verdict, opts=opts)
+    start = time.perf_counter()
+    assert oracle.judge('abc') == timeout_verdict
+    assert time.perf_counter() - start < 10
+
+@pytest.mark.skipif(os.name != 'posix', reason='requires a POSIX shell')
+def test_command_gets_snapshot_environment(opts: Options, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    runner = FakeSnapshotRunner(opts)
+    oracle = CommandOracle(runner, command='echo "$MIXXX_BISECT_COMMIT $MIXXX_BISECT_MIXXX" > env.txt; exit 125', timeout=None, timeout_verdict=Verdict.BAD, opts=opts)
+    assert oracle.judge('abc') == Verdict.SKIP
+    assert (tmp_path / 'env.txt').read_text().split() == ['abc', str(runner.executable_path('abc'))]
+    # The command is run instead of Mixxx
+    assert runner.runs == []
+
+@pytest.mark.usefixtures('fake_platform')
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_bisect_finds_first_bad_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, jobs: int):
+    commits = make_repo(tmp_path / 'remote.git', 100)
+    snapshot_commits = commits[::4]
+    culprit = snapshot_commits[9]
+    positions = {commit: i for i, commit in enumerate(commits)}
+    monkeypatch.setattr(FakeSnapshotRepository, 'snapshots', fake_snapshots(snapshot_commits))
+    # Snapshots are bad from the culprit on, except for one that cannot be tested
+    untestable = snapshot_commits[6]
+    monkeypatch.setattr(FakeSnapshotRunner, 'exit_code', staticmethod(lambda commit: 125 if commit == untestable else int(positions[commit] >= positions[culprit])))
+
+    code, output = run_main(bisect_argv(tmp_path, tmp_path / 'remote.git', '--jobs', str(jobs), '--run'))
+
+    assert code == 0, output
+    assert f'Last good: {snapshot_commits[8][:10]}' in output
+    assert f'First bad: {culprit[:10]}' in output
+    runs = FakeSnapshotRunner.runs
+    assert len(runs) == len(set(runs)), 'no snapshot should be run twice'
+    if jobs == 1:
+        assert len(runs) <= math.ceil(math.log2(len(snapshot_commits))) + 1
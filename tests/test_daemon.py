@@ -0,0 +1,144 @@
+from pathlib import Path
+from typing import Iterator
+
+from fakes import FakeSnapshotRepository, FakeSnapshotRunner, extend_repo, fake_snapshots, make_options, make_repo, run_main
+
+from mixxx_bisect import daemon as daemon_module
+from mixxx_bisect.daemon import Daemon, DaemonClient, socket_path
+from mixxx_bisect.discovery import discover_snapshots
+from mixxx_bisect.error import DaemonError
+from mixxx_bisect.options import Options
+
+import math
+import pytest
+import socket
+import threading
+import time
+
+pytestmark = [
+    pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='requires Unix domain sockets'),
+    pytest.mark.usefixtures('fake_platform'),
+]
+
+KEY = ('fake', 'main', 'x86_64', '.tar.gz')
+
+@pytest.fixture
+def remote(tmp_path: Path) -> Path:
+    return tmp_path / 'remote.git'
+
+@pytest.fixture
+def commits(remote: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    commits = make_repo(remote, 40)
+    monkeypatch.setattr(FakeSnapshotRepository, 'snapshots', fake_snapshots(commits[::2]))
+    return commits
+
+@pytest.fixture
+def daemon_opts(tmp_path: Path, remote: Path) -> Options:
+    opts = make_options(tmp_path / 'root', mixxx_remote=remote.as_uri())
+    for dir in [opts.root_dir, opts.log_dir, opts.index_dir]:
+        dir.mkdir(parents=True)
+    return opts
+
+def connect(opts: Options) -> DaemonClient:
+    deadline = time.monotonic() + 10
+    while not (client := DaemonClient.connect(opts)):
+        assert time.monotonic() < deadline, 'the daemon did not start'
+        time.sleep(0.01)
+    return client
+
+@pytest.fixture
+def daemon(daemon_opts: Options, commits: list[str]) -> Iterator[Daemon]:
+    daemon = Daemon(fetch_ttl=math.inf, refresh_interval=3600, opts=daemon_opts)
+    thread = threading.Thread(target=daemon.serve, args=([],), daemon=True)
+    thread.start()
+    # Once the daemon answers, it is serving and can be shut down
+    with connect(daemon_opts) as client:
+        client.request('status')
+    yield daemon
+    daemon.shutdown()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert not socket_path(daemon_opts).exists()
+
+@pytest.mark.usefixtures('daemon')
+def test_discovery_round_trip(daemon_opts: Options, commits: list[str], tmp_path: Path):
+    with connect(daemon_opts) as client:
+        served = client.discover(*KEY, good=None, bad=None)
+        assert client.request('status') == {'repositories': [list(KEY)]}
+
+    local_opts = make_options(tmp_path / 'local', mixxx_remote=daemon_opts.mixxx_remote)
+    local_opts.root_dir.mkdir()
+    local = discover_snapshots(FakeSnapshotRepository(branch='main', suffix='.tar.gz', opts=local_opts), None, None, math.inf, local_opts)
+    assert served.commits == commits[::2]
+    assert served == local
+
+@pytest.mark.usefixtures('daemon')
+def test_missing_bound_is_rediscovered(daemon_opts: Options, remote: Path, commits: list[str], monkeypatch: pytest.MonkeyPatch):
+    with connect(daemon_opts) as client:
+        assert client.discover(*KEY, good=None, bad=None).commits == commits[::2]
+        new_commits = extend_repo(remote, 4)
+        monkeypatch.setattr(FakeSnapshotRepository, 'snapshots', fake_snapshots(commits[::2] + new_commits))
+
+        # Known bounds are served from memory, even though there are new snapshots
+        assert client.discover(*KEY, good=None, bad=commits[-2][:10]).commits == commits[::2]
+        # Unknown ones make the daemon fetch the clone and discover the snapshots again
+        assert client.discover(*KEY, good=None, bad=new_commits[-1][:10]).commits == commits[::2] + new_commits
+
+def test_revs_without_snapshots_are_remembered(daemon: Daemon, daemon_opts: Options, commits: list[str], monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+    discover, fetch = daemon_module.discover_snapshots, daemon_module.fetch_mixxx
+    monkeypatch.setattr(daemon_module, 'discover_snapshots', lambda *args, **kwargs: calls.append('discover') or discover(*args, **kwargs))
+    monkeypatch.setattr(daemon_module, 'fetch_mixxx', lambda *args: calls.append('fetch') or fetch(*args))
+
+    with connect(daemon_opts) as client:
+        client.discover(*KEY, good=None, bad=None)
+        calls.clear()
+
+        # Missing from the clone, so it is fetched, but there is nothing to discover
+        client.discover(*KEY, good=None, bad='0123456789')
+        assert calls == ['fetch']
+        # In the clone without a snapshot, so the snapshots are discovered again
+        client.discover(*KEY, good=commits[1][:10], bad=None)
+        assert calls == ['fetch', 'discover']
+        # Neither is looked up again until the fetch TTL expires
+        for _ in range(3):
+            client.discover(*KEY, good=commits[1][:10], bad='0123456789')
+        assert calls == ['fetch', 'discover']
+
+        # Both are looked up at once again afterwards
+        daemon.fetch_ttl = 0
+        client.discover(*KEY, good=commits[1][:10], bad='0123456789')
+        assert calls == ['fetch', 'discover', 'fetch', 'discover']
+
+@pytest.mark.usefixtures('daemon')
+def test_errors_are_reported_to_clients(daemon_opts: Options):
+    with connect(daemon_opts) as client:
+        with pytest.raises(DaemonError, match='Unknown repository: nonexistent'):
+            client.discover('nonexistent', 'main', 'x86_64', '.tar.gz', good=None, bad=None)
+        with pytest.raises(DaemonError, match='Unknown method: frobnicate'):
+            client.request('frobnicate')
+        # The connection stays usable
+        assert client.request('status') == {'repositories': []}
+
+@pytest.mark.usefixtures('daemon')
+def test_only_one_daemon_runs_per_root(daemon_opts: Options):
+    with pytest.raises(DaemonError, match='already running'):
+        Daemon(fetch_ttl=math.inf, refresh_interval=3600, opts=daemon_opts).serve(warm_up=[])
+
+@pytest.mark.usefixtures('daemon')
+def test_bisect_uses_daemon(daemon_opts: Options, commits: list[str], monkeypatch: pytest.MonkeyPatch):
+    culprit = commits[::2][11]
+    positions = {commit: i for i, commit in enumerate(commits)}
+    monkeypatch.setattr(FakeSnapshotRunner, 'exit_code', staticmethod(lambda commit: int(positions[commit] >= positions[culprit])))
+
+    code, output = run_main([
+        '--root', str(daemon_opts.root_dir),
+        '--remote', daemon_opts.mixxx_remote,
+        '--repository', 'fake',
+        '--arch', 'x86_64',
+        '--prefetch-depth', '0',
+        '--run',
+    ])
+    assert code == 0, output
+    assert 'Querying snapshots from the daemon' in output
+    assert f'First bad: {culprit[:10]}' in output
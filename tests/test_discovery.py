@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Optional
+
+from fakes import FakeSnapshotRepository, OtherFakeSnapshotRepository, extend_repo, fake_snapshots, make_options, make_repo
+
+from mixxx_bisect import registry
+from mixxx_bisect.discovery import discover_snapshots
+from mixxx_bisect.options import Options
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.repository.combined import CombinedSnapshotRepository
+from mixxx_bisect.utils.git import LAST_FETCH_STAMP
+
+import math
+import pytest
+import subprocess
+import threading
+
+@pytest.fixture
+def remote(tmp_path: Path) -> Path:
+    return tmp_path / 'remote.git'
+
+@pytest.fixture
+def clone_opts(tmp_path: Path, remote: Path) -> Options:
+    opts = make_options(tmp_path / 'root', mixxx_remote=remote.as_uri(), clone_filter='tree:0')
+    opts.root_dir.mkdir()
+    return opts
+
+def git_config(opts: Options, key: str) -> str:
+    return subprocess.run(['git', 'config', key], cwd=opts.mixxx_dir, capture_output=True, encoding='utf8').stdout.strip()
+
+def discover(opts: Options, commits: list[str], fetch_ttl: float=math.inf, good: Optional[str]=None, bad: Optional[str]=None):
+    repository = FakeSnapshotRepository(branch='main', suffix='.tar.gz', opts=opts)
+    repository.snapshots = fake_snapshots(commits)
+    return discover_snapshots(repository, good, bad, fetch_ttl, opts)
+
+def test_clone_is_partial(remote: Path, clone_opts: Options):
+    commits = make_repo(remote, 20)
+    discovery = discover(clone_opts, commits[::2])
+    assert discovery.commits == commits[::2]
+    assert git_config(clone_opts, 'remote.origin.promisor') == 'true'
+    assert git_config(clone_opts, 'remote.origin.partialclonefilter') == 'tree:0'
+    assert (clone_opts.mixxx_dir / LAST_FETCH_STAMP).exists()
+
+def test_clone_can_be_full(remote: Path, clone_opts: Options):
+    commits = make_repo(remote, 5)
+    clone_opts.clone_filter = None
+    discover(clone_opts, commits)
+    assert git_config(clone_opts, 'remote.origin.promisor') == ''
+
+def test_recent_fetch_is_not_repeated(remote: Path, clone_opts: Options, capsys: pytest.CaptureFixture[str]):
+    commits = make_repo(remote, 10)
+    discover(clone_opts, commits)
+    new_commits = extend_repo(remote, 5)
+    capsys.readouterr()
+
+    discovery = discover(clone_opts, commits + new_commits)
+    assert 'Not fetching Mixxx, 5 snapshot commit(s) missing locally' in capsys.readouterr().out
+    assert discovery.commits == commits
+
+def test_stale_clone_is_fetched(remote: Path, clone_opts: Options):
+    commits = make_repo(remote, 10)
+    discover(clone_opts, commits)
+    new_commits = extend_repo(remote, 5)
+
+    discovery = discover(clone_opts, commits + new_commits, fetch_ttl=0)
+    assert discovery.commits == commits + new_commits
+
+def test_up_to_date_clone_is_not_fetched(remote: Path, clone_opts: Options, capsys: pytest.CaptureFixture[str]):
+    commits = make_repo(remote, 10)
+    discover(clone_opts, commits)
+    stamp = (clone_opts.mixxx_dir / LAST_FETCH_STAMP).stat().st_mtime_ns
+    capsys.readouterr()
+
+    discover(clone_opts, commits, fetch_ttl=0)
+    assert 'Mixxx clone is up to date.' in capsys.readouterr().out
+    assert (clone_opts.mixxx_dir / LAST_FETCH_STAMP).stat().st_mtime_ns == stamp
+
+@pytest.mark.parametrize('bound', ['good', 'bad'])
+def test_missing_bound_is_fetched_despite_ttl(remote: Path, clone_opts: Options, bound: str):
+    commits = make_repo(remote, 10)
+    discover(clone_opts, commits)
+    new_commits = extend_repo(remote, 5)
+
+    discovery = discover(clone_opts, commits + new_commits, **{bound: new_commits[0][:10]})
+    assert discovery.commits[-5:] == new_commits
+
+@pytest.fixture
+def combined(monkeypatch: pytest.MonkeyPatch) -> None:
+    '''Makes the combined repository combine the fake repositories instead.'''
+    monkeypatch.setitem(registry.SNAPSHOT_REPOSITORIES, 'mixxx-org', 'fakes:FakeSnapshotRepository')
+    monkeypatch.setitem(registry.SNAPSHOT_REPOSITORIES, 'm1xxx', 'fakes:OtherFakeSnapshotRepository')
+
+def source_snapshots(source: str, commits: list[str], rev_length: int) -> dict[str, Snapshot]:
+    return {commit[:rev_length]: Snapshot(url=f'https://{source}.invalid/{commit}.tar.gz', name=f'{commit}.tar.gz') for commit in commits}
+
+@pytest.mark.usefixtures('combined')
+def test_combined_snapshots_are_merged(remote: Path, clone_opts: Options, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]):
+    commits = make_repo(remote, 10)
+    # Both repositories have snapshots of commits 4 to 6, abbreviated differently
+    monkeypatch.setattr(FakeSnapshotRepository, 'snapshots', source_snapshots('mixxx-org', commits[:7], 12))
+    monkeypatch.setattr(OtherFakeSnapshotRepository, 'snapshots', source_snapshots('m1xxx', commits[4:], 7))
+
+    repository = CombinedSnapshotRepository(branch='main', suffix='.tar.gz', opts=clone_opts)
+    discovery = discover_snapshots(repository, None, None, math.inf, clone_opts)
+    assert discovery.commits == commits
+    # The official snapshots win
+    assert [discovery.snapshots[commit].url.split('.')[0] for commit in commits] == ['https://mixxx-org'] * 7 + ['https://m1xxx'] * 3
+    assert '10 combined snapshots (7 from mixxx-org, 6 from m1xxx).' in capsys.readouterr().out
+
+@pytest.mark.usefixtures('combined')
+def test_combined_output_is_not_interleaved(opts: Options, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]):
+    # Makes both repositories print concurrently
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fetch_snapshots(self: FakeSnapshotRepository, oldest: Optional[str]=None) -> dict[str, Snapshot]:
+        name = type(self).__name__
+        print(f'{name} started')
+        barrier.wait()
+        print(f'{name} done')
+        return {}
+
+    monkeypatch.setattr(FakeSnapshotRepository, 'fetch_snapshots', fetch_snapshots)
+    CombinedSnapshotRepository(branch='main', suffix='.tar.gz', opts=opts).fetch_snapshots()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1:5] == [
+        'FakeSnapshotRepository started',
+        'FakeSnapshotRepository done',
+        'OtherFakeSnapshotRepository started',
+        'OtherFakeSnapshotRepository done',
+    ]
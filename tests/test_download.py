@@ -0,0 +1,97 @@
+from pathlib import Path
+
+from server import SnapshotServer
+
+from mixxx_bisect.error import DownloadError, SnapshotIntegrityError
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.utils import request
+from mixxx_bisect.utils.request import download
+from mixxx_bisect.utils.snapshot import SnapshotCache, file_digest
+
+import os
+import pytest
+
+DATA = os.urandom(256 * 1024)
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch: pytest.MonkeyPatch):
+    # Split even small test downloads into segments
+    monkeypatch.setattr(request, 'SEGMENT_THRESHOLD', 0)
+
+def state_path(output: Path) -> Path:
+    return output.with_name(f'{output.name}.state')
+
+@pytest.mark.parametrize('segments', [1, 4])
+def test_downloads_in_segments(server: SnapshotServer, tmp_path: Path, segments: int):
+    url = server.add_file('snapshot.tar.gz', DATA)
+    output = tmp_path / 'snapshot.tar.gz.part'
+    download(url, output, progress=False, segments=segments)
+    assert output.read_bytes() == DATA
+    assert not state_path(output).exists()
+
+def test_resumes_interrupted_segments(server: SnapshotServer, tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    url = server.add_file('snapshot.tar.gz', DATA)
+    output = tmp_path / 'snapshot.tar.gz.part'
+
+    # Every segment is cut off halfway
+    server.truncate = len(DATA) // 8
+    with pytest.raises(DownloadError):
+        download(url, output, progress=False, segments=4)
+    assert output.exists()
+    assert state_path(output).exists()
+
+    server.truncate = None
+    server.bytes_sent = 0
+    capsys.readouterr()
+    download(url, output, progress=False, segments=4)
+    assert 'Resuming download...' in capsys.readouterr().out
+    assert output.read_bytes() == DATA
+    assert not state_path(output).exists()
+    # Only what is missing is downloaded again
+    assert server.bytes_sent < len(DATA)
+
+def test_restarts_stale_partial_download(server: SnapshotServer, tmp_path: Path):
+    url = server.add_file('snapshot.tar.gz', DATA)
+    output = tmp_path / 'snapshot.tar.gz.part'
+    server.truncate = len(DATA) // 8
+    with pytest.raises(DownloadError):
+        download(url, output, progress=False, segments=4)
+
+    # The file changed on the server (and thereby its ETag), so the progress is discarded
+    server.truncate = None
+    new_data = os.urandom(len(DATA))
+    server.add_file('snapshot.tar.gz', new_data)
+    download(url, output, progress=False, segments=4)
+    assert output.read_bytes() == new_data
+
+def test_falls_back_to_single_stream_without_ranges(server: SnapshotServer, tmp_path: Path):
+    url = server.add_file('snapshot.tar.gz', DATA)
+    output = tmp_path / 'snapshot.tar.gz.part'
+    server.ranges = False
+    download(url, output, progress=False, segments=4)
+    assert output.read_bytes() == DATA
+    assert not state_path(output).exists()
+    # One probe and one download
+    assert server.request_count == 2
+
+def test_cache_verifies_snapshots(server: SnapshotServer, tmp_path: Path):
+    url = server.add_file('snapshot.tar.gz', DATA)
+    (tmp_path / 'expected').write_bytes(DATA)
+    snapshot = Snapshot(url=url, name='snapshot.tar.gz', size=len(DATA), digest=file_digest(tmp_path / 'expected'))
+    cache = SnapshotCache(tmp_path / 'cache', max_size=1 << 30)
+    path = cache.fetch('abc', snapshot, progress=False)
+    assert path.read_bytes() == DATA
+    assert cache.lookup('abc', snapshot) == path
+
+@pytest.mark.parametrize('size, digest', [
+    (len(DATA) + 1, None),
+    (None, 'sha256:' + '0' * 64),
+])
+def test_cache_rejects_corrupt_snapshots(server: SnapshotServer, tmp_path: Path, size: int, digest: str):
+    url = server.add_file('snapshot.tar.gz', DATA)
+    snapshot = Snapshot(url=url, name='snapshot.tar.gz', size=size, digest=digest)
+    cache = SnapshotCache(tmp_path / 'cache', max_size=1 << 30)
+    with pytest.raises(SnapshotIntegrityError):
+        cache.fetch('abc', snapshot, progress=False)
+    assert cache.lookup('abc', snapshot) is None
+    assert not any((tmp_path / 'cache').iterdir())
@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Callable
+
+from mixxx_bisect.utils.install import COMPLETE_MARKER, InstallCache
+
+import os
+import pytest
+
+def extract_files(files: dict[str, bytes]) -> Callable[[Path], None]:
+    def extract(root: Path):
+        for name, data in files.items():
+            (root / name).write_bytes(data)
+    return extract
+
+def test_overlapping_installs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cache = InstallCache(tmp_path / 'installs', max_installs=1)
+    a = cache.install('a', extract_files({'libshared.so': b'shared', 'a.bin': b'a'}))
+    # Marks a as used before anything else, the modification times are too coarse to rely on the order of the installs
+    os.utime(a / COMPLETE_MARKER, (0, 0))
+    link = os.link
+
+    def link_with_overlap(src: Path, dst: Path):
+        if Path(src).parent.parent == cache.store_dir and 'libshared.so' in Path(dst).name and not cache.path('c').exists():
+            # Another process sets up c and evicts a right before b links to the store entry only referenced by a
+            cache.install('c', extract_files({'data.bin': b'data', 'c.bin': b'c'}))
+            cache.evict(keep=frozenset({'c'}))
+            # The incomplete b is left alone
+            assert cache.lookup('a') is None
+            assert cache.lookup('b') is None
+            assert not Path(src).exists()
+        link(src, dst)
+
+    monkeypatch.setattr(os, 'link', link_with_overlap)
+    b = cache.install('b', extract_files({'libshared.so': b'shared', 'data.bin': b'data', 'b.bin': b'b'}))
+    c = cache.lookup('c')
+    monkeypatch.undo()
+
+    assert cache.lookup('b') == b
+    assert c
+    assert {path.name for path in b.iterdir()} == {'libshared.so', 'data.bin', 'b.bin', COMPLETE_MARKER}
+    assert (b / 'libshared.so').read_bytes() == b'shared'
+    # The vanished store entry was added again
+    assert (b / 'libshared.so').stat().st_nlink == 2
+    # Identical files are shared between the installs
+    assert (b / 'data.bin').stat().st_ino == (c / 'data.bin').stat().st_ino
+    assert (b / 'data.bin').stat().st_nlink == 3
+
+    os.utime(c / COMPLETE_MARKER, (0, 0))
+    cache.evict()
+    assert cache.lookup('c') is None
+    assert cache.lookup('b') == b
+    assert (b / 'data.bin').stat().st_nlink == 2
+    assert sorted(path.name for path in cache.installs_dir.iterdir()) == ['.store', 'b']
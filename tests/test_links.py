@@ -0,0 +1,56 @@
+from typing import Iterator
+
+from mixxx_bisect.utils.links import iter_links
+
+import pytest
+import random
+
+LISTING = '''<html>\r
+<head><title>Index of /snapshots/main/</title></head>\r
+<body>\r
+<h1>Index of /snapshots/main/</h1><hr><pre><a href="../">../</a>\r
+<!-- <a href="commented-out.dmg">commented-out.dmg</a> -->\r
+<a href="mixxx-2.4-alpha-1-g0123456789-macosarm.dmg">mixxx-2.4-alpha-1-g0123456789-macosarm.dmg</a> 07-Mar-2023 12:00    100000000\r
+<A HREF='mixxx-2.4-alpha-2-gabcdef0123-macosintel.dmg'>mixxx-2.4-alpha-2-gabcdef0123-macosintel.dmg</A> 07-Mar-2023 12:01    100000001\r
+<a name="anchor">no link</a>\r
+<a href="mixxx-2.4-b&#xe9;ta-3-g0000000000-win64.msi?a=1&amp;b=2">mixxx-2.4-béta-3...&gt;</a> 07-Mar-2023 12:02    100000002\r
+<a href="mixxx-2.4-béta-4-g1111111111-win64.msi">mixxx-2.4-béta-4-g1111111111-win64.msi</a> 07-Mar-2023 12:03    100000003\r
+</pre><hr></body>\r
+</html>\r
+'''.encode()
+
+EXPECTED = [
+    '../',
+    'mixxx-2.4-alpha-1-g0123456789-macosarm.dmg',
+    'mixxx-2.4-alpha-2-gabcdef0123-macosintel.dmg',
+    'mixxx-2.4-béta-3-g0000000000-win64.msi?a=1&b=2',
+    'mixxx-2.4-béta-4-g1111111111-win64.msi',
+]
+
+def fixed_chunks(data: bytes, size: int) -> Iterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def random_chunks(data: bytes, seed: int) -> Iterator[bytes]:
+    rng = random.Random(seed)
+    start = 0
+    while start < len(data):
+        size = rng.randint(1, 7)
+        yield data[start:start + size]
+        start += size
+
+def test_parses_whole_listing():
+    assert list(iter_links([LISTING])) == EXPECTED
+
+@pytest.mark.parametrize('size', range(1, 8))
+def test_parses_listing_in_small_chunks(size: int):
+    # Tags, attributes, entities and multi-byte characters are split across chunks
+    assert list(iter_links(fixed_chunks(LISTING, size))) == list(iter_links([LISTING]))
+
+@pytest.mark.parametrize('seed', range(20))
+def test_parses_listing_in_irregular_chunks(seed: int):
+    assert list(iter_links(random_chunks(LISTING, seed))) == list(iter_links([LISTING]))
+
+def test_parses_empty_chunks():
+    assert list(iter_links([b'', LISTING, b''])) == EXPECTED
+    assert list(iter_links([])) == []
@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Iterator
+
+from fakes import make_repo
+from server import SnapshotServer
+
+from mixxx_bisect.options import Options
+from mixxx_bisect.repository import m1xxx
+from mixxx_bisect.repository.m1xxx import M1xxxSnapshotRepository
+
+import pytest
+
+@pytest.fixture
+def commits(opts: Options) -> list[str]:
+    return make_repo(opts.mixxx_dir, 600)
+
+@pytest.fixture
+def server(opts: Options, commits: list[str], monkeypatch: pytest.MonkeyPatch) -> Iterator[SnapshotServer]:
+    # 300 releases, i.e. 3 pages of 100
+    server = SnapshotServer(commits[::2], repo=opts.mixxx_dir)
+    monkeypatch.setattr(m1xxx, 'RELEASES_API_URL', server.releases_url)
+    yield server
+    server.shutdown()
+
+def fetch(opts: Options, oldest: str) -> dict[str, str]:
+    # A new repository loads the index from disk, like a new invocation of mixxx-bisect
+    snapshots = M1xxxSnapshotRepository(branch='main', suffix='.tar.gz', opts=opts).fetch_snapshots(oldest=oldest)
+    return {rev: snapshot.name for rev, snapshot in snapshots.items()}
+
+def test_bounded_walk_stops_at_good_commit(opts: Options, commits: list[str], server: SnapshotServer):
+    good = commits[500]
+    snapshots = fetch(opts, good)
+    assert good[:10] in snapshots
+    # The first page already reaches back to releases older than the good commit
+    assert len(snapshots) == 100
+    assert server.request_count <= 1 + m1xxx.BOUNDED_LOOKAHEAD
+
+def test_bounded_walk_is_reused(opts: Options, commits: list[str], server: SnapshotServer):
+    good = commits[500]
+    snapshots = fetch(opts, good)
+    server.request_count = 0
+
+    # Nothing changed, which the first page tells with a 304
+    assert fetch(opts, good) == snapshots
+    assert server.request_count == 1
+
+    # A newer good commit is covered too
+    assert fetch(opts, commits[550]) == snapshots
+    assert server.request_count == 2
+
+def test_bounded_walk_catches_up(opts: Options, commits: list[str], server: SnapshotServer):
+    good = commits[500]
+    snapshots = fetch(opts, good)
+    server.publish(commits[599])
+    server.request_count = 0
+
+    # The new release pushes the oldest known one onto the second page, which has nothing new
+    assert fetch(opts, good).keys() >= snapshots.keys() | {commits[599][:10]}
+    assert server.request_count == 2
+
+def test_bounded_walk_extends_to_older_good_commit(opts: Options, commits: list[str], server: SnapshotServer):
+    fetch(opts, commits[500])
+    server.request_count = 0
+
+    good = commits[100]
+    snapshots = fetch(opts, good)
+    assert good[:10] in snapshots
+    # The first page is unchanged, but has to be fetched again to walk back further
+    assert server.request_count >= 3
+    server.request_count = 0
+
+    assert fetch(opts, good) == snapshots
+    assert server.request_count == 1
+
+def test_walk_without_release_dates_stops_at_good_snapshot(opts: Options, commits: list[str], monkeypatch: pytest.MonkeyPatch):
+    server = SnapshotServer(commits[::2])
+    monkeypatch.setattr(m1xxx, 'RELEASES_API_URL', server.releases_url)
+    try:
+        snapshots = fetch(opts, commits[300])
+    finally:
+        server.shutdown()
+    assert commits[300][:10] in snapshots
+    assert len(snapshots) == 200
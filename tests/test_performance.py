@@ -0,0 +1,84 @@
+from pathlib import Path
+
+from fakes import FakeSnapshotRepository, FakeSnapshotRunner, bisect_argv, fake_snapshots, make_repo, run_main
+
+from mixxx_bisect.oracle import Verdict
+from mixxx_bisect.oracle.performance import Metric, PerformanceOracle
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.utils.measurements import MeasurementCache
+
+import itertools
+import pytest
+import time
+
+class FakeMetric(Metric):
+    '''Measures predefined durations per commit, with a bit of deterministic noise.'''
+
+    def __init__(self, durations: dict[str, float]):
+        self.durations = durations
+        self.noise = itertools.cycle([-0.01, 0.01, 0.0])
+        self.measured: list[str] = []
+
+    @property
+    def name(self) -> str:
+        return 'Fake duration'
+
+    def measure(self, commit: str) -> float:
+        self.measured.append(commit)
+        return self.durations[commit] + next(self.noise)
+
+def make_oracle(metric: Metric, cache: MeasurementCache, snapshots: dict[str, Snapshot]) -> PerformanceOracle:
+    return PerformanceOracle(metric, cache, snapshots, repeat=3, threshold=0.1, significance=0.05, timeout_verdict=Verdict.BAD)
+
+def test_judges_slowdowns_against_baseline(tmp_path: Path):
+    metric = FakeMetric({'good': 1.0, 'same': 1.02, 'slow': 1.5})
+    oracle = make_oracle(metric, MeasurementCache(tmp_path / 'measurements.json'), fake_snapshots(['good', 'same', 'slow']))
+    oracle.measure_baseline('good')
+    assert oracle.judge('same') == Verdict.GOOD
+    assert oracle.judge('slow') == Verdict.BAD
+    assert len(metric.measured) == 9
+
+def test_reuses_measurements_of_the_same_snapshot(tmp_path: Path):
+    snapshots = fake_snapshots(['good', 'slow'])
+    metric = FakeMetric({'good': 1.0, 'slow': 1.5})
+    oracle = make_oracle(metric, MeasurementCache(tmp_path / 'measurements.json'), snapshots)
+    oracle.measure_baseline('good')
+    oracle.judge('slow')
+
+    rerun = make_oracle(FakeMetric({}), MeasurementCache(tmp_path / 'measurements.json'), snapshots)
+    assert not rerun.needs_snapshot('good')
+    assert not rerun.needs_snapshot('slow')
+    rerun.measure_baseline('good')
+    assert rerun.judge('slow') == Verdict.BAD
+
+def test_separates_builds_of_the_same_commit(tmp_path: Path):
+    snapshots = fake_snapshots(['good', 'slow'])
+    oracle = make_oracle(FakeMetric({'good': 1.0, 'slow': 1.5}), MeasurementCache(tmp_path / 'measurements.json'), snapshots)
+    oracle.measure_baseline('good')
+    oracle.judge('slow')
+
+    # The same commits built by another repository have to be measured again
+    other_snapshots = {commit: Snapshot(url=f'https://other.invalid/{commit}.dmg', name=f'{commit}.dmg') for commit in snapshots}
+    other = make_oracle(FakeMetric({'good': 1.0, 'slow': 1.0}), MeasurementCache(tmp_path / 'measurements.json'), other_snapshots)
+    assert other.needs_snapshot('good')
+    assert other.needs_snapshot('slow')
+    other.measure_baseline('good')
+    assert other.judge('slow') == Verdict.GOOD
+
+@pytest.mark.usefixtures('fake_platform')
+def test_bisect_finds_slowdown(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    commits = make_repo(tmp_path / 'remote.git', 40)
+    snapshot_commits = commits[::2]
+    culprit = snapshot_commits[5]
+    positions = {commit: i for i, commit in enumerate(commits)}
+
+    def exit_code(commit: str) -> int:
+        # A baseline well above the timing noise keeps the relative change of good snapshots small
+        time.sleep(0.25 if positions[commit] >= positions[culprit] else 0.05)
+        return 0
+
+    monkeypatch.setattr(FakeSnapshotRepository, 'snapshots', fake_snapshots(snapshot_commits))
+    monkeypatch.setattr(FakeSnapshotRunner, 'exit_code', staticmethod(exit_code))
+    code, output = run_main(bisect_argv(tmp_path, tmp_path / 'remote.git', '--perf', 'exit', '--repeat', '3', '--threshold', '1'))
+    assert code == 0, output
+    assert f'First bad: {culprit[:10]}' in output
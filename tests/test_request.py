@@ -0,0 +1,134 @@
+from email.utils import formatdate
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from typing import Any, Callable
+
+from mixxx_bisect.error import RateLimitError
+from mixxx_bisect.utils import request
+from mixxx_bisect.utils.request import HttpClient
+
+import io
+import pytest
+import requests
+import time
+
+API_URL = 'https://api.github.com/repos/m1xxx/m1xxx/releases'
+ASSET_URL = 'https://objects.githubusercontent.com/release-asset'
+
+class StubAdapter(BaseAdapter):
+    '''Answers requests with the given statuses and headers (in order) instead of sending them.'''
+
+    def __init__(self, responses: list[tuple[int, dict[str, str]]]):
+        super().__init__()
+        self.responses = responses
+        self.requests: list[requests.PreparedRequest] = []
+
+    def send(self, request: requests.PreparedRequest, stream: bool=False, timeout: Any=None, verify: Any=True, cert: Any=None, proxies: Any=None) -> requests.Response:
+        self.requests.append(request)
+        status, headers = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.url = request.url or ''
+        response.request = request
+        response.raw = io.BytesIO()
+        response._content = b''
+        return response
+
+    def close(self):
+        pass
+
+def stub(client: HttpClient, *responses: tuple[int, dict[str, str]]) -> StubAdapter:
+    adapter = StubAdapter(list(responses))
+    client.session.mount('https://', adapter)
+    return adapter
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    '''The delays slept for instead of actually sleeping.'''
+    sleeps: list[float] = []
+    monkeypatch.setattr(request.time, 'sleep', sleeps.append)
+    return sleeps
+
+@pytest.mark.parametrize('status', [500, 502, 503, 504])
+def test_retries_with_jittered_backoff(sleeps: list[float], status: int):
+    client = HttpClient(retries=3)
+    adapter = stub(client, (status, {}), (status, {}), (status, {}), (200, {}))
+    assert client.request('GET', API_URL).status_code == 200
+    assert len(adapter.requests) == 4
+    for attempt, delay in enumerate(sleeps):
+        base = request.RETRY_BACKOFF * 2 ** attempt
+        assert 0.5 * base <= delay <= 1.5 * base
+    # Jitter keeps concurrent retries out of lockstep
+    assert sleeps != [request.RETRY_BACKOFF * 2 ** attempt for attempt in range(3)]
+
+def test_gives_up_after_retries(sleeps: list[float]):
+    client = HttpClient(retries=2)
+    adapter = stub(client, *[(503, {})] * 3)
+    with pytest.raises(requests.HTTPError):
+        client.request('GET', API_URL)
+    assert len(adapter.requests) == 3
+    assert len(sleeps) == 2
+
+@pytest.mark.parametrize('retry_after, expected', [
+    (lambda: '7', 7),
+    (lambda: formatdate(time.time() + 30, usegmt=True), 30),
+])
+@pytest.mark.parametrize('status', [429, 503])
+def test_honors_retry_after(sleeps: list[float], status: int, retry_after: Callable[[], str], expected: float):
+    client = HttpClient()
+    stub(client, (status, {'Retry-After': retry_after()}), (200, {}))
+    assert client.request('GET', API_URL).status_code == 200
+    assert len(sleeps) == 1
+    assert expected - 2 <= sleeps[0] <= expected
+
+def test_refuses_to_wait_for_long_retry_after(sleeps: list[float]):
+    client = HttpClient()
+    stub(client, (429, {'Retry-After': str(int(request.MAX_RATE_LIMIT_WAIT) + 60)}))
+    with pytest.raises(RateLimitError, match='GITHUB_TOKEN'):
+        client.request('GET', API_URL)
+    assert not sleeps
+
+def test_waits_for_exhausted_rate_limit(sleeps: list[float], capsys: pytest.CaptureFixture[str]):
+    client = HttpClient()
+    reset = str(int(time.time()) + 30)
+    adapter = stub(client, (200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset}), (200, {}))
+    client.request('GET', API_URL)
+    assert not sleeps
+
+    # The next request waits for the window to reset rather than being rejected
+    client.request('GET', API_URL)
+    assert len(adapter.requests) == 2
+    assert len(sleeps) == 1
+    assert 28 <= sleeps[0] <= 30
+    assert 'Rate limit of api.github.com exhausted' in capsys.readouterr().out
+
+def test_paces_nearly_exhausted_rate_limit(sleeps: list[float]):
+    client = HttpClient()
+    reset = str(int(time.time()) + 100)
+    stub(client, *[(200, {'X-RateLimit-Remaining': '3', 'X-RateLimit-Reset': reset})] * 3)
+    client.request('GET', API_URL)
+    client.request('GET', API_URL)
+    client.request('GET', ASSET_URL)
+    # Only requests to the limited host are paced, and no longer than necessary
+    assert sleeps == [request.MAX_PACING_DELAY]
+
+def test_refuses_to_wait_for_distant_rate_limit_reset(sleeps: list[float]):
+    client = HttpClient()
+    reset = str(int(time.time()) + int(request.MAX_RATE_LIMIT_WAIT) + 60)
+    stub(client, (200, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset}))
+    client.request('GET', API_URL)
+    with pytest.raises(RateLimitError):
+        client.request('GET', API_URL)
+    assert not sleeps
+
+def test_token_is_only_sent_to_the_api(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(request, '_client', request._client)
+    request.configure_client(github_token='secret')
+    adapter = stub(request._client, (302, {'Location': ASSET_URL}), (200, {}), (200, {}))
+
+    # Release assets are downloaded from a different host that the API redirects to
+    assert request.get(API_URL + '/assets/1', allow_redirects=True).status_code == 200
+    request.get(ASSET_URL)
+    authorizations = [prepared.headers.get('Authorization') for prepared in adapter.requests]
+    assert authorizations == ['Bearer secret', None, None]
@@ -0,0 +1,81 @@
+from typing import AbstractSet, Optional, Sequence
+
+from mixxx_bisect.search import midpoint, speculative_midpoints, split_points
+
+import pytest
+
+# Most commits were made between the first two snapshots
+FRONT_WEIGHTS = [0, 90, 91, 92, 100]
+# Most commits were made between the last two snapshots
+BACK_WEIGHTS = [0, 1, 2, 3, 4, 5, 100]
+
+@pytest.mark.parametrize('good_idx, bad_idx, skipped, weights, expected', [
+    # Empty ranges
+    (0, 0, set(), None, None),
+    (0, 1, set(), None, None),
+    # A single candidate
+    (0, 2, set(), None, 1),
+    (0, 10, set(), None, 5),
+    # Ties go to the lower index
+    (0, 10, {5}, None, 4),
+    (0, 10, {4, 5, 6}, None, 3),
+    # Every candidate skipped
+    (0, 2, {1}, None, None),
+    (0, 10, set(range(1, 10)), None, None),
+    # Weights concentrated at one end
+    (0, 4, set(), FRONT_WEIGHTS, 1),
+    (0, 6, set(), BACK_WEIGHTS, 5),
+    (0, 6, {5}, BACK_WEIGHTS, 4),
+])
+def test_midpoint(good_idx: int, bad_idx: int, skipped: AbstractSet[int], weights: Optional[Sequence[int]], expected: Optional[int]):
+    assert midpoint(good_idx, bad_idx, skipped, weights) == expected
+
+@pytest.mark.parametrize('good_idx, bad_idx, count, skipped, weights, expected', [
+    # Empty ranges
+    (0, 0, 3, set(), None, []),
+    (0, 1, 3, set(), None, []),
+    # Ties go to the lower index
+    (0, 10, 3, set(), None, [2, 5, 7]),
+    (0, 10, 1, set(), None, [5]),
+    (0, 10, 3, {5}, None, [2, 4, 7]),
+    # More points than candidates
+    (0, 3, 10, set(), None, [1, 2]),
+    (0, 10, 20, {2, 4, 6, 8}, None, [1, 3, 5, 7, 9]),
+    # Every candidate skipped
+    (0, 10, 3, set(range(1, 10)), None, []),
+    # Weights concentrated at one end
+    (0, 4, 3, set(), FRONT_WEIGHTS, [1, 2, 3]),
+    (0, 4, 1, set(), FRONT_WEIGHTS, [1]),
+    (0, 6, 2, set(), BACK_WEIGHTS, [4, 5]),
+])
+def test_split_points(good_idx: int, bad_idx: int, count: int, skipped: AbstractSet[int], weights: Optional[Sequence[int]], expected: list[int]):
+    assert split_points(good_idx, bad_idx, count, skipped, weights) == expected
+
+@pytest.mark.parametrize('good_idx, mid_idx, bad_idx, depth, skipped, weights, expected', [
+    # Nothing left to check on either side
+    (0, 1, 2, 2, set(), None, []),
+    (0, 0, 0, 2, set(), None, []),
+    # Nearest rounds first
+    (0, 8, 16, 1, set(), None, [4, 12]),
+    (0, 8, 16, 2, set(), None, [4, 12, 2, 6, 10, 14]),
+    # Deeper than the range
+    (0, 2, 4, 5, set(), None, [1, 3]),
+    (0, 4, 8, 5, set(), None, [2, 6, 1, 3, 5, 7]),
+    # Every candidate skipped
+    (0, 5, 10, 3, set(range(1, 10)) - {5}, None, []),
+    # Skipped candidates are avoided
+    (0, 8, 16, 1, {4, 12}, None, [3, 11]),
+    # Weights concentrated at one end
+    (0, 1, 6, 1, set(), BACK_WEIGHTS, [5]),
+    (0, 1, 6, 2, set(), BACK_WEIGHTS, [5, 3]),
+])
+def test_speculative_midpoints(good_idx: int, mid_idx: int, bad_idx: int, depth: int, skipped: AbstractSet[int], weights: Optional[Sequence[int]], expected: list[int]):
+    assert speculative_midpoints(good_idx, mid_idx, bad_idx, depth, skipped, weights) == expected
+
+@pytest.mark.parametrize('skipped', [set(), {5}, {1, 2, 3}, set(range(1, 10))])
+@pytest.mark.parametrize('count', [1, 3, 20])
+def test_split_points_avoid_skipped(count: int, skipped: AbstractSet[int]):
+    points = split_points(0, 10, count, skipped)
+    assert len(points) == min(count, 9 - len(skipped))
+    assert len(set(points)) == len(points)
+    assert all(0 < idx < 10 and idx not in skipped for idx in points)
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+from fakes import FakeSnapshotRepository, FakeSnapshotRunner, bisect_argv, fake_snapshots, make_repo, run_main
+
+from mixxx_bisect.oracle import Verdict
+from mixxx_bisect.utils.session import Session, oracle_spec
+
+import pytest
+
+class Interrupted(Exception):
+    pass
+
+@dataclass
+class InterruptedSearch:
+    argv: list[str]
+    culprit: str
+    # The snapshots judged before the interruption
+    judged: list[str]
+
+@pytest.fixture
+def search(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> InterruptedSearch:
+    '''A search whose first run is interrupted after checking two snapshots.'''
+    commits = make_repo(tmp_path / 'remote.git', 80)
+    snapshot_commits = commits[::2]
+    culprit = snapshot_commits[13]
+    positions = {commit: i for i, commit in enumerate(commits)}
+
+    def exit_code(commit: str) -> int:
+        if len(FakeSnapshotRunner.runs) > 2 and not resumed:
+            raise Interrupted()
+        return int(positions[commit] >= positions[culprit])
+
+    monkeypatch.setattr(FakeSnapshotRepository, 'snapshots', fake_snapshots(snapshot_commits))
+    monkeypatch.setattr(FakeSnapshotRunner, 'exit_code', staticmethod(exit_code))
+    argv = bisect_argv(tmp_path, tmp_path / 'remote.git')
+
+    resumed = False
+    with pytest.raises(Interrupted):
+        run_main([*argv, '--run'])
+    resumed = True
+    judged = FakeSnapshotRunner.runs[:2]
+    FakeSnapshotRunner.runs.clear()
+    return InterruptedSearch(argv=argv, culprit=culprit, judged=judged)
+
+@pytest.mark.usefixtures('fake_platform')
+def test_resume_reuses_verdicts(search: InterruptedSearch):
+    code, output = run_main([*search.argv, '--resume', '--run'])
+    assert code == 0, output
+    assert "Resuming session 'default'" in output
+    assert 'Reusing 2 verdict(s)' in output
+    assert f'First bad: {search.culprit[:10]}' in output
+    assert not set(search.judged) & set(FakeSnapshotRunner.runs), 'reused verdicts should not be judged again'
+
+@pytest.mark.usefixtures('fake_platform')
+def test_named_session_reuses_verdicts(search: InterruptedSearch):
+    code, output = run_main([*search.argv, '--session', 'default', '--run'])
+    assert code == 0, output
+    assert 'Reusing 2 verdict(s)' in output
+    assert f'First bad: {search.culprit[:10]}' in output
+    assert not set(search.judged) & set(FakeSnapshotRunner.runs)
+
+@pytest.mark.usefixtures('fake_platform')
+def test_new_search_starts_over(search: InterruptedSearch):
+    code, output = run_main([*search.argv, '--run'])
+    assert code == 0, output
+    assert 'Reusing' not in output
+    assert f'First bad: {search.culprit[:10]}' in output
+    assert FakeSnapshotRunner.runs[:2] == search.judged
+
+@pytest.mark.usefixtures('fake_platform')
+def test_resume_can_forget_verdicts(search: InterruptedSearch):
+    code, output = run_main([*search.argv, '--resume', '--forget-verdicts', '--run'])
+    assert code == 0, output
+    assert "Resuming session 'default'" in output
+    assert 'Reusing' not in output
+    assert f'First bad: {search.culprit[:10]}' in output
+
+@pytest.mark.usefixtures('fake_platform')
+def test_resume_requires_session(search: InterruptedSearch):
+    code, output = run_main([*search.argv, '--session', 'other', '--resume', '--forget-verdicts', '--run'])
+    assert code == 1
+    assert "No session 'other' to resume!" in output
+
+@pytest.mark.parametrize('spec', [
+    oracle_spec(run=None, perf=None, threshold=0.1),
+    oracle_spec(run='', perf=None, threshold=0.1),
+    oracle_spec(run='make test', perf=None, threshold=0.1),
+    oracle_spec(run=None, perf='exit', threshold=0.1),
+    oracle_spec(run=None, perf='exit', threshold=0.2),
+])
+def test_verdicts_are_kept_per_oracle(tmp_path: Path, spec: str):
+    path = tmp_path / 'session.json'
+    session = Session(path=path, repository='fake', branch='main', arch='x86_64', good='a', bad='c', oracle=oracle_spec(run='', perf=None, threshold=0.1))
+    session.record('b', Verdict.BAD, good='a', bad='b')
+
+    loaded = Session.load(path)
+    assert loaded
+    loaded.oracle = spec
+    assert loaded.verdicts == ({'b': Verdict.BAD} if spec == session.oracle else {})
+    # Verdicts of other oracles survive
+    loaded.save()
+    reloaded = Session.load(path)
+    assert reloaded and reloaded.verdicts_by_oracle[session.oracle] == {'b': Verdict.BAD}
@@ -0,0 +1,79 @@
+from pathlib import Path
+from typing import Iterator
+
+from server import SnapshotServer
+
+from mixxx_bisect.repository import Snapshot
+from mixxx_bisect.utils import snapshot as snapshot_module
+from mixxx_bisect.utils.snapshot import SnapshotCache
+
+import os
+import pytest
+
+SIZE = 64 * 1024
+
+def add_snapshot(server: SnapshotServer, name: str) -> Snapshot:
+    data = os.urandom(SIZE)
+    return Snapshot(url=server.add_file(name, data), name=name, size=len(data))
+
+def test_lookup_does_not_rehash(server: SnapshotServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    snapshot = add_snapshot(server, 'a.tar.gz')
+    cache = SnapshotCache(tmp_path, max_size=1 << 30)
+    path = cache.fetch('a', snapshot, progress=False)
+
+    def file_digest(path: Path) -> str:
+        raise AssertionError('the digest is only computed on insertion')
+
+    monkeypatch.setattr(snapshot_module, 'file_digest', file_digest)
+    assert cache.lookup('a', snapshot) == path
+    assert cache.fetch('a', snapshot, progress=False) == path
+
+@pytest.mark.parametrize('modify', [
+    lambda path: path.write_bytes(b'truncated'),
+    # Same size, but written after insertion
+    lambda path: os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9)),
+])
+def test_lookup_detects_modified_snapshots(server: SnapshotServer, tmp_path: Path, modify):
+    snapshot = add_snapshot(server, 'a.tar.gz')
+    cache = SnapshotCache(tmp_path, max_size=1 << 30)
+    path = cache.fetch('a', snapshot, progress=False)
+    modify(path)
+    assert cache.lookup('a', snapshot) is None
+    assert not path.exists()
+
+def test_evicts_least_recently_used(server: SnapshotServer, tmp_path: Path):
+    a, b, c = (add_snapshot(server, f'{name}.tar.gz') for name in 'abc')
+    cache = SnapshotCache(tmp_path, max_size=2 * SIZE)
+    cache.fetch('a', a, progress=False)
+    b_path = cache.fetch('b', b, progress=False)
+    # Marks a as used after b, the modification times are too coarse to rely on the order of the fetches
+    os.utime(cache._meta_path(b_path), (0, 0))
+    assert cache.lookup('a', a)
+
+    cache.fetch('c', c, progress=False)
+    assert cache.lookup('a', a)
+    assert cache.lookup('b', b) is None
+    assert cache.lookup('c', c)
+
+def test_eviction_tolerates_concurrently_removed_files(server: SnapshotServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    snapshot = add_snapshot(server, 'a.tar.gz')
+    cache = SnapshotCache(tmp_path, max_size=0)
+    iterdir = Path.iterdir
+    glob = Path.glob
+
+    # Another process removes these files between listing and inspecting them
+    def iterdir_with_ghost(self: Path) -> Iterator[Path]:
+        yield from iterdir(self)
+        yield self / 'ghost.tar.gz'
+
+    def glob_with_ghost(self: Path, pattern: str) -> Iterator[Path]:
+        yield from glob(self, pattern)
+        yield self / 'ghost.tar.gz.part'
+
+    monkeypatch.setattr(Path, 'iterdir', iterdir_with_ghost)
+    monkeypatch.setattr(Path, 'glob', glob_with_ghost)
+    with cache.pinned('a', snapshot):
+        path = cache.fetch('a', snapshot, progress=False)
+        cache.evict()
+        assert path.exists()
+    assert not path.exists()